@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.analytics import get_batch_analytics
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"], dependencies=[Depends(enforce_session_scope)])
+
+@router.get("")
+async def get_analytics(batch_id: str, manager_id: str = Depends(manager_scope)):
+    try:
+        analytics = await get_batch_analytics(manager_id, batch_id)
+        return {"batch_id": batch_id, **analytics.to_dict()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,47 +1,57 @@
+import logging
 from fastapi import APIRouter, HTTPException
 from bson import ObjectId
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo.errors import DuplicateKeyError
 from app.schemas.all_models import AuthModel
+from app.core.config import settings
 from app.core.database import managers_collection
+from app.core.security import USERNAME_COLLATION, hash_password, issue_token, normalize_username, verify_password
 
 router = APIRouter(prefix="/api", tags=["auth"])
+logger = logging.getLogger(__name__)
+
+def session_response(message, manager_id, username):
+    return {
+        "message": message,
+        "manager_id": manager_id,
+        "username": username,
+        "token": issue_token(manager_id, username),
+        "expires_in": settings.SESSION_TTL_SECONDS
+    }
 
 @router.post("/register")
 async def register(data: AuthModel):
-    if managers_collection.find_one({'username': data.username}):
+    username = normalize_username(data.username)
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+    if await managers_collection.find_one({'username': username}, {'_id': 1}, collation=USERNAME_COLLATION):
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    hashed_password = generate_password_hash(data.password)
+    hashed_password = await hash_password(data.password)
     manager_id = str(ObjectId())
-    managers_collection.insert_one({
-        'manager_id': manager_id,
-        'username': data.username,
-        'password': hashed_password
-    })
-    return {
-        "message": "Manager registered", 
-        "manager_id": manager_id,
-        "username": data.username
-    }
+    try:
+        await managers_collection.insert_one({
+            'manager_id': manager_id,
+            'username': username,
+            'password': hashed_password
+        })
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration of the same name.
+        raise HTTPException(status_code=400, detail="Username already exists")
+    return session_response("Manager registered", manager_id, username)
 
 @router.post("/login")
 async def login(data: AuthModel):
-    login_username = data.username.strip().lower()
-    print(f"[DEBUG] Login attempt for: {login_username}")
-    
-    manager = managers_collection.find_one({'username': {'$regex': f'^{login_username}$', '$options': 'i'}})
-    
-    if not manager:
-        print(f"[DEBUG] User not found: {login_username}")
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_username = normalize_username(data.username)
+    manager = await managers_collection.find_one(
+        {'username': login_username},
+        {'_id': 0, 'manager_id': 1, 'username': 1, 'password': 1},
+        collation=USERNAME_COLLATION
+    )
     
-    if not check_password_hash(manager['password'], data.password):
-        print(f"[DEBUG] Password mismatch for: {login_username}")
+    if not await verify_password(manager['password'] if manager else None, data.password) or not manager:
+        logger.info("Login failed for %s", login_username)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    print(f"[DEBUG] Login successful: {login_username}")
-    return {
-        "message": "Login successful",
-        "manager_id": manager['manager_id'],
-        "username": manager['username']
-    }
+    logger.debug("Login succeeded for %s", login_username)
+    return session_response("Login successful", manager['manager_id'], manager['username'])
@@ -1,14 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
 from bson import ObjectId
-from app.schemas.all_models import BatchModel
+from app.schemas.all_models import BatchModel, BatchCloneModel, InternMoveModel
+from app.core.config import settings
 from app.core.database import batches_collection
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.lifecycle import BatchNotFoundError, BatchStateError, archive_batch, clone_batch, move_interns, restore_batch
 
-router = APIRouter(prefix="/api/batches", tags=["batches"])
+router = APIRouter(prefix="/api/batches", tags=["batches"], dependencies=[Depends(enforce_session_scope)])
 
 @router.post("", status_code=201)
 async def create_batch(data: BatchModel):
     batch_id = str(ObjectId())
-    batches_collection.insert_one({
+    await batches_collection.insert_one({
         'batch_id': batch_id,
         'manager_id': data.manager_id,
         'name': data.name
@@ -16,6 +19,39 @@ async def create_batch(data: BatchModel):
     return {"message": "Batch created", "batch_id": batch_id, "name": data.name}
 
 @router.get("")
-async def get_batches(manager_id: str):
-    batches = list(batches_collection.find({'manager_id': manager_id}, {'_id': 0}))
+async def get_batches(manager_id: str = Depends(manager_scope), include_archived: bool = False):
+    batch_filter = {'manager_id': manager_id} if include_archived else {'manager_id': manager_id, 'archived': {'$ne': True}}
+    batches = await batches_collection.find(batch_filter, {'_id': 0}).to_list()
     return batches
+
+async def _lifecycle(operation):
+    try:
+        return await operation
+    except BatchNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BatchStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{batch_id}/clone", status_code=201)
+async def clone(batch_id: str, data: BatchCloneModel):
+    result = await _lifecycle(clone_batch(data.manager_id, batch_id, data.name))
+    return {"message": "Batch cloned", **result}
+
+@router.post("/{batch_id}/move-interns")
+async def move(batch_id: str, data: InternMoveModel):
+    if len(data.emp_ids) > settings.BATCH_MOVE_MAX_INTERNS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MOVE_MAX_INTERNS} interns per request")
+    result = await _lifecycle(move_interns(data.manager_id, batch_id, data.target_batch_id, data.emp_ids))
+    return {"message": "Interns moved", **result}
+
+@router.post("/{batch_id}/archive")
+async def archive(batch_id: str, manager_id: str = Depends(manager_scope)):
+    result = await _lifecycle(archive_batch(manager_id, batch_id))
+    return {"message": "Batch archived", **result}
+
+@router.post("/{batch_id}/restore")
+async def restore(batch_id: str, manager_id: str = Depends(manager_scope)):
+    result = await _lifecycle(restore_batch(manager_id, batch_id))
+    return {"message": "Batch restored", **result}
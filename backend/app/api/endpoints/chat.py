@@ -1,44 +1,51 @@
-from fastapi import APIRouter, HTTPException
-from groq import Groq
-import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 import json
 from app.schemas.all_models import ChatQueryModel
-from app.core.database import interns_collection, scores_collection, feedback_collection, batches_collection
+from app.services.answer_cache import cached_answer
+from app.services.llm import LLMBusyError
+from app.services.retrieval import build_context
+from app.core.security import enforce_session_scope
 
-router = APIRouter(prefix="/api", tags=["chat"])
-groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+router = APIRouter(prefix="/api", tags=["chat"], dependencies=[Depends(enforce_session_scope)])
 
-@router.post("/chat")
-async def chat(data: ChatQueryModel):
-    try:
-        interns = list(interns_collection.find({'manager_id': data.manager_id, 'batch_id': data.batch_id}, {'_id': 0}))
-        scores = list(scores_collection.find({'manager_id': data.manager_id, 'batch_id': data.batch_id}, {'_id': 0}))
-        feedbacks = list(feedback_collection.find({'manager_id': data.manager_id, 'batch_id': data.batch_id}, {'_id': 0}))
-        batch = batches_collection.find_one({'batch_id': data.batch_id})
-        batch_name = batch['name'] if batch else "Unknown Batch"
+SYSTEM_PROMPT = "You are a professional L&D Assistant."
+
+async def build_messages(data: ChatQueryModel):
+    context = await build_context(data.manager_id, data.batch_id, data.query)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context}\n\nQuery: {data.query}"}
+    ]
+
+def sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
 
-        score_map = {s['EmpID']: s.get('scores', {}) for s in scores}
-        feedback_map = {}
-        for f in feedbacks:
-            eid = f['EmpID']
-            if eid not in feedback_map: feedback_map[eid] = []
-            feedback_map[eid].append(f"{f.get('column', 'General')}: {f['text']}")
+async def sse_tokens(tokens):
+    try:
+        async for token in tokens:
+            yield sse_event({"token": token})
+        yield sse_event({}, event="done")
+    except LLMBusyError as e:
+        yield sse_event({"detail": str(e)}, event="error")
+    except Exception as e:
+        yield sse_event({"detail": str(e) or e.__class__.__name__}, event="error")
 
-        context = f"Active Batch: {batch_name}\n\nIntern Profiles:\n"
-        for i in interns:
-            eid = i['EmpID']
-            s = score_map.get(eid, {})
-            f = feedback_map.get(eid, [])
-            context += f"- {i['Name']} ({eid}):\n Scores: {json.dumps(s)}\n Feedback: {'; '.join(f)}\n\n"
-        
-        system_prompt = "You are a professional L&D Assistant."
-        completion = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuery: {data.query}"}
-            ]
-        )
-        return {"response": completion.choices[0].message.content}
+@router.post("/chat")
+async def chat(data: ChatQueryModel, request: Request, response: Response):
+    try:
+        # Identical questions on an unchanged batch share one answer; the context is only built on a miss.
+        outcome, tokens = await cached_answer(data.manager_id, data.batch_id, data.query, lambda: build_messages(data))
+        if data.stream or 'text/event-stream' in request.headers.get('accept', ''):
+            return StreamingResponse(
+                sse_tokens(tokens),
+                media_type="text/event-stream",
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Answer-Cache': outcome}
+            )
+        response.headers['X-Answer-Cache'] = outcome
+        return {"response": ''.join([token async for token in tokens])}
+    except LLMBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.summaries import load_dashboard
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"], dependencies=[Depends(enforce_session_scope)])
+
+@router.get("")
+async def get_dashboard(manager_id: str = Depends(manager_scope)):
+    try:
+        return await load_dashboard(manager_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,18 +1,66 @@
-from fastapi import APIRouter
+import asyncio
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Request
 from app.core.database import interns_collection, scores_collection, subjects_collection, batches_collection
+from app.core.indexes import ensure_indexes, audit_query_plans
+from app.core.cache import grid_cache, invalidate_batch
+from app.core.responses import encoded_response
+from app.core.revisions import batch_revision
+from app.core.security import enforce_session_scope, manager_scope, require_session
+from app.services import answer_cache
+from app.services.live import hub, publish, sync_event
+from app.services.migrations import migrate_all, migration_status
 
-router = APIRouter(prefix="/api/debug", tags=["debug"])
+# Debug routes read and rewrite every manager's data, so all of them need a session token.
+router = APIRouter(prefix="/api/debug", tags=["debug"], dependencies=[Depends(require_session), Depends(enforce_session_scope)])
 
 @router.post("/fix-orphans")
-async def fix_orphans(manager_id: str, batch_id: str):
-    res1 = interns_collection.update_many({'manager_id': manager_id, 'batch_id': {'$exists': False}}, {'$set': {'batch_id': batch_id}})
-    res2 = scores_collection.update_many({'manager_id': manager_id, 'batch_id': {'$exists': False}}, {'$set': {'batch_id': batch_id}})
-    res3 = subjects_collection.update_many({'manager_id': manager_id, 'batch_id': {'$exists': False}}, {'$set': {'batch_id': batch_id}})
+async def fix_orphans(batch_id: str, manager_id: str = Depends(manager_scope)):
+    orphan_filter = {'manager_id': manager_id, 'batch_id': {'$exists': False}}
+    async with batch_revision(manager_id, batch_id) as rev:
+        adopt = {'$set': {'batch_id': batch_id, 'rev': rev}}
+        res1, res2, res3 = await asyncio.gather(
+            interns_collection.update_many(orphan_filter, adopt),
+            scores_collection.update_many(orphan_filter, adopt),
+            subjects_collection.update_many(orphan_filter, adopt)
+        )
+    invalidate_batch(manager_id, batch_id)
+    publish(manager_id, batch_id, [sync_event(rev)])
     return {"interns_fixed": res1.modified_count, "scores_fixed": res2.modified_count, "subjects_fixed": res3.modified_count}
 
 @router.get("/inspect-db")
-async def inspect_db():
-    batches = list(batches_collection.find({}, {'_id': 0}))
-    subjects = list(subjects_collection.find({}, {'_id': 0}))
-    interns_count = interns_collection.count_documents({})
-    return {"batches": batches, "subjects": subjects, "interns_count": interns_count}
+async def inspect_db(request: Request, layout: Literal['rows', 'columnar'] = 'rows'):
+    batches, subjects, interns_count = await asyncio.gather(
+        batches_collection.find({}, {'_id': 0}).to_list(),
+        subjects_collection.find({}, {'_id': 0}).to_list(),
+        interns_collection.count_documents({})
+    )
+    return await encoded_response(request, {"batches": batches, "subjects": subjects, "interns_count": interns_count}, layout)
+
+@router.post("/ensure-indexes")
+async def ensure_all_indexes():
+    return await ensure_indexes()
+
+@router.get("/query-plans")
+async def query_plans():
+    return await audit_query_plans()
+
+@router.get("/schema-status")
+async def schema_status():
+    return await migration_status()
+
+@router.post("/migrate-schema")
+async def migrate_schema(batch_size: Optional[int] = None):
+    return await migrate_all(batch_size)
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return grid_cache.stats()
+
+@router.get("/chat-cache-stats")
+async def chat_cache_stats():
+    return await answer_cache.stats()
+
+@router.get("/live-stats")
+async def live_stats():
+    return hub.stats()
@@ -1,132 +1,74 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.responses import StreamingResponse
 import io
-import pandas as pd
+import asyncio
 from datetime import datetime
-from app.core.database import (
-    interns_collection, scores_collection, subjects_collection, 
-    feedback_collection, batches_collection
-)
+from typing import Optional
+from app.core.database import batches_collection
+from app.core.cache import invalidate_batch
+from app.services.ingest import REQUIRED_BIO, sync_subjects, ingest_rows
+from app.services.catalog import load_catalog
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.export import EXPORT_FORMATS, parquet_available, stream_csv, stream_parquet, stream_xlsx
 
-router = APIRouter(prefix="/api", tags=["excel"])
+router = APIRouter(prefix="/api", tags=["excel"], dependencies=[Depends(enforce_session_scope)])
 
 @router.post("/upload-interns")
 async def upload_interns(
     manager_id: str = Form(...),
     batch_id: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    chunk_size: Optional[int] = Form(None)
 ):
     try:
+        # pandas is imported on first upload so workers start without paying for it.
+        import pandas as pd
         contents = await file.read()
         df = pd.read_excel(io.BytesIO(contents))
         
-        required_bio = ['Name', 'Email', 'EmpID']
-        if not all(col in df.columns for col in required_bio):
-            raise HTTPException(status_code=400, detail=f"Excel must at least contain: {required_bio}")
+        if not all(col in df.columns for col in REQUIRED_BIO):
+            raise HTTPException(status_code=400, detail=f"Excel must at least contain: {REQUIRED_BIO}")
         
-        potential_subjects = [col.strip() for col in df.columns if col.strip() not in required_bio and col.strip() not in ['manager_id', 'batch_id']]
-        
-        subj_doc = subjects_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id})
-        raw_existing = []
-        if subj_doc:
-            raw_existing = subj_doc.get('list') or subj_doc.get('subjects') or []
-        
-        existing_list = []
-        existing_names = []
-        for s in raw_existing:
-            name = s['name'] if isinstance(s, dict) else s
-            if name not in existing_names:
-                existing_names.append(name)
-                existing_list.append(s if isinstance(s, dict) else {"name": s, "total_marks": 100})
-        
-        new_subjects_added = False
-        for col in potential_subjects:
-            clean_name = col.split('(')[0].strip()
-            if clean_name not in [s['name'] for s in existing_list]:
-                total = 100
-                if '(' in col and 'Total' in col:
-                    try: total = int(col.split(':')[-1].replace(')', '').strip())
-                    except: total = 100
-                
-                existing_list.append({"name": clean_name, "total_marks": total})
-                new_subjects_added = True
-        
-        if new_subjects_added or not subj_doc:
-            subjects_collection.update_one(
-                {'manager_id': manager_id, 'batch_id': batch_id},
-                {'$set': {'list': existing_list}, '$unset': {'subjects': ""}},
-                upsert=True
-            )
-
-        interns_data = df.to_dict('records')
-        for row in interns_data:
-            emp_id = str(row['EmpID']).strip()
-            intern_bio = {
-                'Name': str(row['Name']).strip(),
-                'Email': str(row['Email']).strip(),
-                'EmpID': emp_id,
-                'manager_id': manager_id,
-                'batch_id': batch_id
-            }
-            interns_collection.update_one(
-                {'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id},
-                {'$set': intern_bio},
-                upsert=True
-            )
-            
-            scores_to_save = {}
-            for col in df.columns:
-                stripped_col = col.strip()
-                clean_name = stripped_col.split('(')[0].strip()
-                if clean_name in [s['name'] for s in existing_list]:
-                    val = row[col]
-                    if pd.notnull(val) and (isinstance(val, (int, float, complex)) or hasattr(val, '__int__')):
-                        scores_to_save[f"scores.{clean_name}"] = float(val)
-            
-            if scores_to_save:
-                scores_collection.update_one(
-                    {'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id},
-                    {'$set': scores_to_save},
-                    upsert=True
-                )
+        subject_columns = await sync_subjects(manager_id, batch_id, df.columns)
+        rows = ((idx + 2, row) for idx, row in enumerate(df.to_dict('records')))
+        try:
+            summary = await ingest_rows(rows, manager_id, batch_id, subject_columns, chunk_size)
+        finally:
+            invalidate_batch(manager_id, batch_id)
                 
-        return {"message": "Success"}
+        return {"message": "Success", **summary.to_dict()}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/export-scores")
-async def export_scores(manager_id: str, batch_id: str):
+async def export_scores(batch_id: str, manager_id: str = Depends(manager_scope), export_format: str = Query("xlsx", alias="format")):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Choose one of: {list(EXPORT_FORMATS)}")
+    if export_format == 'parquet' and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed")
     try:
-        interns = list(interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        scores = list(scores_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        subjects_doc = subjects_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
-        subjects_list = subjects_doc.get('list', []) if subjects_doc else []
-        
-        scores_map = {s['EmpID']: s.get('scores', {}) for s in scores}
+        catalog, batch = await asyncio.gather(
+            load_catalog(manager_id, batch_id),
+            batches_collection.find_one({'batch_id': batch_id})
+        )
+        subjects_list = catalog.subjects
         
-        export_data = []
-        for intern in interns:
-            row = {'Name': intern['Name'], 'EmpID': intern['EmpID'], 'Email': intern['Email']}
-            intern_scores = scores_map.get(intern['EmpID'], {})
-            for s in subjects_list:
-                s_name = s['name'] if isinstance(s, dict) else s
-                s_total = s['total_marks'] if isinstance(s, dict) else 100
-                row[f"{s_name} (Total: {s_total})"] = intern_scores.get(s_name, 0)
-            export_data.append(row)
-            
-        df = pd.DataFrame(export_data)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Performance Grid')
-        output.seek(0)
+        if export_format == 'csv':
+            body = stream_csv(manager_id, batch_id, subjects_list)
+        elif export_format == 'parquet':
+            body = stream_parquet(manager_id, batch_id, subjects_list)
+        else:
+            body = stream_xlsx(manager_id, batch_id, subjects_list)
         
-        batch = batches_collection.find_one({'batch_id': batch_id})
         batch_name = batch['name'] if batch else "Batch"
-        filename = f"Scores_{batch_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        media_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"Scores_{batch_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.{extension}"
         
         return StreamingResponse(
-            output,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            body,
+            media_type=media_type,
             headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
     except Exception as e:
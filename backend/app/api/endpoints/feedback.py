@@ -1,26 +1,44 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Literal, Optional
 from datetime import datetime
-from app.schemas.all_models import FeedbackColumnModel, FeedbackCellUpdateModel
-from app.core.database import feedback_collection, feedback_columns_collection, interns_collection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.schemas.all_models import FeedbackColumnModel, FeedbackCellUpdateModel, BulkFeedbackUpdateModel
+from app.core.config import settings
+from app.core.database import ROW_PROJECTION, feedback_collection, feedback_columns_collection, interns_collection
+from app.services.grid import GridQueryError, paginated_grid, wants_page
+from app.core.cache import cached_batch_response, invalidate_batch
+from app.core.responses import encoded_response
+from app.core.revisions import UnknownRevisionError, batch_revision, add_tombstones, changed_emp_ids, check_since, tombstones_since
+from app.services.retrieval import apply_feedback_update, apply_feedback_updates
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.live import publish, feedback_event, deleted_event, sync_event
 
-router = APIRouter(prefix="/api", tags=["feedback"])
+router = APIRouter(prefix="/api", tags=["feedback"], dependencies=[Depends(enforce_session_scope)])
+
+async def load_feedback_columns(manager_id, batch_id):
+    res = await feedback_columns_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
+    return res.get('list', []) if res else []
 
 @router.get("/feedback-columns")
-async def get_feedback_columns(manager_id: str, batch_id: str):
+async def get_feedback_columns(request: Request, batch_id: str, manager_id: str = Depends(manager_scope)):
     try:
-        res = feedback_columns_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
-        return res.get('list', []) if res else []
+        return await cached_batch_response(request, 'feedback-columns', manager_id, batch_id, lambda: load_feedback_columns(manager_id, batch_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/feedback-columns", status_code=201)
 async def add_feedback_column(data: FeedbackColumnModel):
     try:
-        feedback_columns_collection.update_one(
-            {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$addToSet': {'list': data.name}},
-            upsert=True
-        )
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            await feedback_columns_collection.update_one(
+                {'manager_id': data.manager_id, 'batch_id': data.batch_id},
+                {'$addToSet': {'list': data.name}, '$set': {'rev': rev}},
+                upsert=True
+            )
+        invalidate_batch(data.manager_id, data.batch_id)
+        publish(data.manager_id, data.batch_id, [sync_event(rev)])
         return {"message": "Column added"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -28,44 +46,139 @@ async def add_feedback_column(data: FeedbackColumnModel):
 @router.delete("/feedback-columns")
 async def delete_feedback_column(data: FeedbackColumnModel):
     try:
-        feedback_columns_collection.update_one(
-            {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$pull': {'list': data.name}}
-        )
-        feedback_collection.delete_many({'manager_id': data.manager_id, 'batch_id': data.batch_id, 'column': data.name})
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            await feedback_columns_collection.update_one(
+                {'manager_id': data.manager_id, 'batch_id': data.batch_id},
+                {'$pull': {'list': data.name}, '$set': {'rev': rev}}
+            )
+            await feedback_collection.delete_many({'manager_id': data.manager_id, 'batch_id': data.batch_id, 'column': data.name})
+            await add_tombstones(data.manager_id, data.batch_id, rev, 'feedback_columns', [data.name])
+        invalidate_batch(data.manager_id, data.batch_id)
+        publish(data.manager_id, data.batch_id, [deleted_event('feedback_columns', data.name, rev)])
         return {"message": "Column deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/feedback-grid")
-async def get_feedback_grid(manager_id: str, batch_id: str):
-    try:
-        interns = list(interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        feedbacks = list(feedback_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
+async def load_feedback_grid(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    interns, feedbacks = await asyncio.gather(
+        interns_collection.find(batch_filter, ROW_PROJECTION).to_list(),
+        feedback_collection.find(batch_filter, {'_id': 0}).to_list()
+    )
+    
+    feedback_map = {}
+    for f in feedbacks:
+        eid = f['EmpID']
+        col = f.get('column', 'General')
+        if eid not in feedback_map: feedback_map[eid] = {}
+        feedback_map[eid][col] = f['text']
         
+    combined = []
+    for intern in interns:
+        combined.append({**intern, 'feedbacks': feedback_map.get(intern['EmpID'], {})})
+    return combined
+
+async def load_feedback_delta(manager_id, batch_id, since):
+    revision = await check_since(manager_id, batch_id, since)
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    emp_ids, deleted, columns_doc = await asyncio.gather(
+        changed_emp_ids(manager_id, batch_id, since, interns_collection, feedback_collection),
+        tombstones_since(manager_id, batch_id, since),
+        feedback_columns_collection.find_one({**batch_filter, 'rev': {'$gt': since}}, {'_id': 0, 'list': 1})
+    )
+    
+    rows = []
+    if emp_ids:
+        row_filter = {**batch_filter, 'EmpID': {'$in': emp_ids}}
+        interns, feedbacks = await asyncio.gather(
+            interns_collection.find(row_filter, ROW_PROJECTION).to_list(),
+            feedback_collection.find(row_filter, {'_id': 0, 'EmpID': 1, 'column': 1, 'text': 1}).to_list()
+        )
         feedback_map = {}
         for f in feedbacks:
-            eid = f['EmpID']
-            col = f.get('column', 'General')
-            if eid not in feedback_map: feedback_map[eid] = {}
-            feedback_map[eid][col] = f['text']
-            
-        combined = []
-        for intern in interns:
-            combined.append({**intern, 'feedbacks': feedback_map.get(intern['EmpID'], {})})
-            
-        return combined
+            feedback_map.setdefault(f['EmpID'], {})[f.get('column', 'General')] = f['text']
+        rows = [{**intern, 'feedbacks': feedback_map.get(intern['EmpID'], {})} for intern in interns]
+    
+    # Rows carry each intern's full feedback map, so they replace the client's copy after `deleted` is applied.
+    return {
+        'revision': revision,
+        'since': since,
+        'rows': rows,
+        'columns': columns_doc.get('list', []) if columns_doc else None,
+        'deleted': deleted
+    }
+
+@router.get("/feedback-grid")
+async def get_feedback_grid(request: Request, batch_id: str, manager_id: str = Depends(manager_scope),
+    since: Optional[int] = None,
+    limit: Optional[int] = None, cursor: Optional[str] = None, sort: Optional[str] = None,
+    order: str = 'asc', q: Optional[str] = None, fields: Optional[str] = None,
+    layout: Literal['rows', 'columnar'] = 'rows'
+):
+    try:
+        if since is not None:
+            return await encoded_response(request, await load_feedback_delta(manager_id, batch_id, since), layout)
+        if wants_page(limit, cursor, sort, q, fields):
+            return await encoded_response(request, await paginated_grid('feedback', manager_id, batch_id, limit, cursor, sort, order, q, fields), layout)
+        return await cached_batch_response(request, 'feedback-grid', manager_id, batch_id, lambda: load_feedback_grid(manager_id, batch_id), layout)
+    except UnknownRevisionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except GridQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/update-feedback-cell")
 async def update_feedback_cell(data: FeedbackCellUpdateModel):
     try:
-        feedback_collection.update_one(
-            {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id, 'column': data.column},
-            {'$set': {'text': data.text, 'date': datetime.now().isoformat()}},
-            upsert=True
-        )
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            await feedback_collection.update_one(
+                {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id, 'column': data.column},
+                {'$set': {'text': data.text, 'date': datetime.now().isoformat(), 'rev': rev}},
+                upsert=True
+            )
+        invalidate_batch(data.manager_id, data.batch_id)
+        publish(data.manager_id, data.batch_id, [feedback_event(data.EmpID, data.column, data.text, rev)])
+        apply_feedback_update(data.manager_id, data.batch_id, data.EmpID, data.column, data.text, rev)
         return {"message": "Feedback updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/update-feedback-cells")
+async def update_feedback_cells(data: BulkFeedbackUpdateModel):
+    if len(data.cells) > settings.BULK_UPDATE_MAX_CELLS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_UPDATE_MAX_CELLS} cells per request")
+    try:
+        now = datetime.now().isoformat()
+        failed = {}
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            ops = [
+                UpdateOne(
+                    {'EmpID': cell.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id, 'column': cell.column},
+                    {'$set': {'text': cell.text, 'date': now, 'rev': rev}},
+                    upsert=True
+                )
+                for cell in data.cells
+            ]
+            
+            if ops:
+                try:
+                    await feedback_collection.bulk_write(ops, ordered=False)
+                except BulkWriteError as e:
+                    failed = {err['index']: err.get('errmsg', 'Write failed') for err in e.details.get('writeErrors', [])}
+        
+        results = []
+        applied = []
+        for idx, cell in enumerate(data.cells):
+            if idx in failed:
+                results.append({'index': idx, 'EmpID': cell.EmpID, 'column': cell.column, 'status': 'error', 'error': failed[idx]})
+            else:
+                results.append({'index': idx, 'EmpID': cell.EmpID, 'column': cell.column, 'status': 'ok'})
+                applied.append((cell.EmpID, cell.column, cell.text))
+        
+        invalidate_batch(data.manager_id, data.batch_id)
+        publish(data.manager_id, data.batch_id, [feedback_event(emp_id, column, text, rev) for emp_id, column, text in applied])
+        apply_feedback_updates(data.manager_id, data.batch_id, applied, rev)
+        return {"message": "Feedback updated", "updated": len(applied), "failed": len(failed), "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
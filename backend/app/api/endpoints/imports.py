@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+from typing import Optional
+from app.services import import_jobs
+from app.core.security import enforce_session_scope, manager_scope, session_manager_id
+
+router = APIRouter(prefix="/api/import-jobs", tags=["imports"], dependencies=[Depends(enforce_session_scope)])
+
+@router.post("", status_code=202)
+async def create_import_job(
+    manager_id: str = Form(...),
+    batch_id: str = Form(...),
+    file: UploadFile = File(...),
+    chunk_size: Optional[int] = Form(None)
+):
+    try:
+        job = await import_jobs.create_job(manager_id, batch_id, file, chunk_size)
+        return {"message": "Import queued", "job_id": job['job_id'], "status": job['status']}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("")
+async def list_import_jobs(manager_id: str = Depends(manager_scope), batch_id: Optional[str] = None, limit: int = 20):
+    try:
+        return await import_jobs.list_jobs(manager_id, batch_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def owned_job(request: Request, job_id: str):
+    job = await import_jobs.get_job(job_id)
+    manager_id = session_manager_id(request)
+    # Another manager's job is reported as missing rather than forbidden.
+    if not job or (manager_id and job.get('manager_id') != manager_id):
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/{job_id}")
+async def get_import_job(job: dict = Depends(owned_job)):
+    return job
+
+@router.post("/{job_id}/cancel")
+async def cancel_import_job(job_id: str, _: dict = Depends(owned_job)):
+    job = await import_jobs.cancel_job(job_id)
+    if not job:
+        existing = await import_jobs.get_job(job_id)
+        raise HTTPException(status_code=409, detail=f"Import job already {existing['status']}")
+    return {"message": "Cancellation requested", "job_id": job_id, "status": job['status']}
@@ -1,37 +1,67 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Literal, Optional
 from app.schemas.all_models import InternModel
-from app.core.database import interns_collection, scores_collection, feedback_collection
+from app.core.database import ROW_PROJECTION, interns_collection, scores_collection, feedback_collection
+from app.core.cache import invalidate_batch
+from app.core.responses import encoded_response
+from app.core.revisions import batch_revision, add_tombstones
+from app.services.live import publish, intern_event, deleted_event
+from app.services.grid import GridQueryError, paginated_grid, wants_page
+from app.core.security import enforce_session_scope, manager_scope
 
-router = APIRouter(prefix="/api/interns", tags=["interns"])
+router = APIRouter(prefix="/api/interns", tags=["interns"], dependencies=[Depends(enforce_session_scope)])
 
 @router.post("", status_code=201)
 async def create_intern(data: InternModel):
-    interns_collection.update_one(
-        {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
-        {'$set': data.model_dump()},
-        upsert=True
-    )
+    async with batch_revision(data.manager_id, data.batch_id) as rev:
+        await interns_collection.update_one(
+            {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
+            {'$set': {**data.model_dump(), 'rev': rev}, '$unset': {'bio_hash': ""}},
+            upsert=True
+        )
+    invalidate_batch(data.manager_id, data.batch_id)
+    publish(data.manager_id, data.batch_id, [intern_event(data.model_dump(), rev)])
     return {"message": "Intern saved"}
 
 @router.put("")
 async def update_intern(data: InternModel):
-    interns_collection.update_one(
-        {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
-        {'$set': {'Name': data.Name, 'Email': data.Email}}
-    )
+    async with batch_revision(data.manager_id, data.batch_id) as rev:
+        await interns_collection.update_one(
+            {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
+            {'$set': {'Name': data.Name, 'Email': data.Email, 'rev': rev}, '$unset': {'bio_hash': ""}}
+        )
+    invalidate_batch(data.manager_id, data.batch_id)
+    publish(data.manager_id, data.batch_id, [intern_event(data.model_dump(), rev)])
     return {"message": "Intern bio updated"}
 
 @router.delete("")
-async def delete_intern(emp_id: str, manager_id: str, batch_id: str):
-    interns_collection.delete_one({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id})
-    scores_collection.delete_one({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id})
-    feedback_collection.delete_many({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id})
+async def delete_intern(emp_id: str, batch_id: str, manager_id: str = Depends(manager_scope)):
+    intern_filter = {'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}
+    async with batch_revision(manager_id, batch_id) as rev:
+        await asyncio.gather(
+            interns_collection.delete_one(intern_filter),
+            scores_collection.delete_one(intern_filter),
+            feedback_collection.delete_many(intern_filter),
+            add_tombstones(manager_id, batch_id, rev, 'interns', [emp_id])
+        )
+    invalidate_batch(manager_id, batch_id)
+    publish(manager_id, batch_id, [deleted_event('interns', emp_id, rev)])
     return {"message": "Intern deleted"}
 
 @router.get("")
-async def get_interns(manager_id: str, batch_id: str):
+async def get_interns(
+    request: Request, batch_id: str, manager_id: str = Depends(manager_scope),
+    limit: Optional[int] = None, cursor: Optional[str] = None, sort: Optional[str] = None,
+    order: str = 'asc', q: Optional[str] = None, fields: Optional[str] = None,
+    layout: Literal['rows', 'columnar'] = 'rows'
+):
     try:
-        interns = list(interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        return interns
+        if wants_page(limit, cursor, sort, q, fields):
+            return await encoded_response(request, await paginated_grid('interns', manager_id, batch_id, limit, cursor, sort, order, q, fields), layout)
+        interns = await interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, ROW_PROJECTION).to_list()
+        return await encoded_response(request, interns, layout)
+    except GridQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.revisions import UnknownRevisionError, current_revision
+from app.core.security import InvalidTokenError, verify_token
+from app.services.live import hub
+from app.api.endpoints.scores import load_scores_delta
+from app.api.endpoints.feedback import load_feedback_delta
+
+router = APIRouter(prefix="/api", tags=["live"])
+
+async def forward_events(websocket: WebSocket, subscriber):
+    while True:
+        event = await subscriber.queue.get()
+        await websocket.send_json(event)
+
+@router.websocket("/live")
+async def live_updates(websocket: WebSocket, manager_id: str, batch_id: str, since: Optional[int] = None, token: Optional[str] = None):
+    # Browsers cannot set headers on a WebSocket handshake, so the session token rides in the query.
+    try:
+        session_manager = verify_token(token)['sub'] if token else None
+    except InvalidTokenError:
+        session_manager = None
+    if (token or settings.AUTH_REQUIRED) and session_manager != manager_id:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    # Subscribe before reading the revision so nothing written in between is missed.
+    subscriber = hub.subscribe(manager_id, batch_id)
+    sender = None
+    try:
+        await websocket.send_json({'type': 'ready', 'revision': await current_revision(manager_id, batch_id)})
+        if since is not None:
+            try:
+                scores_delta, feedback_delta = await asyncio.gather(
+                    load_scores_delta(manager_id, batch_id, since),
+                    load_feedback_delta(manager_id, batch_id, since)
+                )
+                await websocket.send_json(jsonable_encoder({'type': 'resume', 'scores': scores_delta, 'feedback': feedback_delta}))
+            except UnknownRevisionError as e:
+                await websocket.send_json({'type': 'reload', 'detail': str(e)})
+
+        sender = asyncio.create_task(forward_events(websocket, subscriber))
+        while True:
+            # Clients only send keepalives; reading surfaces the disconnect.
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if sender:
+            sender.cancel()
+        await hub.unsubscribe(manager_id, batch_id, subscriber)
@@ -1,23 +1,51 @@
-from fastapi import APIRouter, HTTPException
-from app.core.database import interns_collection, scores_collection, feedback_collection, subjects_collection
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.database import ROW_PROJECTION, interns_collection, scores_collection, feedback_collection, batches_collection
+from app.services.catalog import load_catalog
+from app.services.report_bundle import REPORT_BUNDLE_FORMATS, stream_bundle
+from app.core.security import enforce_session_scope, manager_scope
 
-router = APIRouter(prefix="/api/reports", tags=["reports"])
+router = APIRouter(prefix="/api/reports", tags=["reports"], dependencies=[Depends(enforce_session_scope)])
+
+# Declared before /{emp_id} so "bundle" is not taken for an EmpID.
+@router.get("/bundle")
+async def get_report_bundle(batch_id: str, manager_id: str = Depends(manager_scope), export_format: str = Query("html", alias="format")):
+    if export_format not in REPORT_BUNDLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Choose one of: {REPORT_BUNDLE_FORMATS}")
+    try:
+        catalog, batch = await asyncio.gather(
+            load_catalog(manager_id, batch_id),
+            batches_collection.find_one({'batch_id': batch_id})
+        )
+        batch_name = batch['name'] if batch else "Batch"
+        filename = f"Reports_{batch_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.zip"
+
+        return StreamingResponse(
+            stream_bundle(manager_id, batch_id, batch_name, catalog, export_format),
+            media_type='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{emp_id}")
-async def get_report(emp_id: str, manager_id: str, batch_id: str):
+async def get_report(emp_id: str, batch_id: str, manager_id: str = Depends(manager_scope)):
     try:
-        intern = interns_collection.find_one({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
-        score_doc = scores_collection.find_one({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
-        feedbacks = list(feedback_collection.find({'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        
-        subjects_doc = subjects_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
-        subjects_list = subjects_doc.get('list', []) if subjects_doc else []
+        intern_filter = {'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}
+        intern, score_doc, feedbacks, catalog = await asyncio.gather(
+            interns_collection.find_one(intern_filter, ROW_PROJECTION),
+            scores_collection.find_one(intern_filter, ROW_PROJECTION),
+            feedback_collection.find(intern_filter, ROW_PROJECTION).to_list(),
+            load_catalog(manager_id, batch_id)
+        )
         
         return {
             "intern": intern,
-            "scores": score_doc.get('scores', {}) if score_doc else {},
+            "scores": catalog.scores_by_name(score_doc.get('scores')) if score_doc else {},
             "feedbacks": feedbacks,
-            "subjects": subjects_list
+            "subjects": catalog.subjects
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
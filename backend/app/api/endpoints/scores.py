@@ -1,62 +1,165 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.all_models import ScoreUpdateModel
-from app.core.database import interns_collection, scores_collection, subjects_collection
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Literal, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.schemas.all_models import ScoreUpdateModel, BulkScoreUpdateModel
+from app.core.config import settings
+from app.core.database import ROW_PROJECTION, interns_collection, scores_collection, subjects_collection
+from app.services.grid import GridQueryError, paginated_grid, wants_page
+from app.core.cache import cached_batch_response, invalidate_batch
+from app.core.responses import encoded_response
+from app.core.revisions import UnknownRevisionError, batch_revision, changed_emp_ids, check_since, tombstones_since
+from app.services import analytics, retrieval
+from app.services.catalog import SCHEMA_VERSION, load_catalog, ensure_subjects
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.live import publish, score_event, list_event
 
-router = APIRouter(prefix="/api", tags=["scores"])
+router = APIRouter(prefix="/api", tags=["scores"], dependencies=[Depends(enforce_session_scope)])
+
+async def load_scores_grid(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    interns, scores, catalog = await asyncio.gather(
+        interns_collection.find(batch_filter, ROW_PROJECTION).to_list(),
+        scores_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'scores': 1}).to_list(),
+        load_catalog(manager_id, batch_id)
+    )
+    
+    scores_map = {s['EmpID']: catalog.scores_by_name(s.get('scores')) for s in scores}
+    
+    combined_data = []
+    for intern in interns:
+        intern_scores = scores_map.get(intern['EmpID'], {})
+        combined_data.append({**intern, **intern_scores})
+    return combined_data
+
+async def load_scores_delta(manager_id, batch_id, since):
+    revision = await check_since(manager_id, batch_id, since)
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    emp_ids, deleted, subjects_doc = await asyncio.gather(
+        changed_emp_ids(manager_id, batch_id, since, interns_collection, scores_collection),
+        tombstones_since(manager_id, batch_id, since),
+        subjects_collection.find_one({**batch_filter, 'rev': {'$gt': since}}, {'_id': 0, 'list': 1})
+    )
+    
+    rows = []
+    if emp_ids:
+        row_filter = {**batch_filter, 'EmpID': {'$in': emp_ids}}
+        interns, scores, catalog = await asyncio.gather(
+            interns_collection.find(row_filter, ROW_PROJECTION).to_list(),
+            scores_collection.find(row_filter, {'_id': 0, 'EmpID': 1, 'scores': 1}).to_list(),
+            load_catalog(manager_id, batch_id)
+        )
+        scores_map = {s['EmpID']: catalog.scores_by_name(s.get('scores')) for s in scores}
+        rows = [{**intern, **scores_map.get(intern['EmpID'], {})} for intern in interns]
+    
+    # Clients apply `deleted` before `rows`, so an intern deleted and re-added since the last poll survives.
+    return {
+        'revision': revision,
+        'since': since,
+        'rows': rows,
+        'subjects': subjects_doc.get('list', []) if subjects_doc else None,
+        'deleted': deleted
+    }
 
 @router.get("/scores")
-async def get_scores(manager_id: str, batch_id: str):
+async def get_scores(request: Request, batch_id: str, manager_id: str = Depends(manager_scope),
+    since: Optional[int] = None,
+    limit: Optional[int] = None, cursor: Optional[str] = None, sort: Optional[str] = None,
+    order: str = 'asc', q: Optional[str] = None, fields: Optional[str] = None,
+    layout: Literal['rows', 'columnar'] = 'rows'
+):
     try:
-        interns = list(interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        scores = list(scores_collection.find({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0}))
-        
-        scores_map = {s['EmpID']: s.get('scores', {}) for s in scores}
-        
-        combined_data = []
-        for intern in interns:
-            intern_scores = scores_map.get(intern['EmpID'], {})
-            combined_data.append({**intern, **intern_scores})
-            
-        return combined_data
+        if since is not None:
+            return await encoded_response(request, await load_scores_delta(manager_id, batch_id, since), layout)
+        if wants_page(limit, cursor, sort, q, fields):
+            return await encoded_response(request, await paginated_grid('scores', manager_id, batch_id, limit, cursor, sort, order, q, fields), layout)
+        return await cached_batch_response(request, 'scores', manager_id, batch_id, lambda: load_scores_grid(manager_id, batch_id), layout)
+    except UnknownRevisionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except GridQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/update-score")
 async def update_score(data: ScoreUpdateModel):
     try:
-        # 1. Update the actual score
-        scores_collection.update_one(
-            {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$set': {f'scores.{data.subject}': data.score}},
-            upsert=True
-        )
-        
-        # 2. Sync subjects list
-        if data.total_marks is not None:
-            subj_doc = subjects_collection.find_one({'manager_id': data.manager_id, 'batch_id': data.batch_id})
-            existing_list = []
-            if subj_doc:
-                existing_list = subj_doc.get('list') or subj_doc.get('subjects') or []
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            # 1. Resolve (or add) the subject and sync its total
+            catalog, subjects_changed = await ensure_subjects(data.manager_id, data.batch_id, {data.subject: data.total_marks}, rev)
             
-            new_list = []
-            found = False
-            for item in existing_list:
-                iname = item['name'] if isinstance(item, dict) else item
-                if iname == data.subject:
-                    found = True
-                    new_list.append({"name": data.subject, "total_marks": int(data.total_marks)})
-                else:
-                    new_list.append(item if isinstance(item, dict) else {"name": item, "total_marks": 100})
-            
-            if not found:
-                new_list.append({"name": data.subject, "total_marks": int(data.total_marks)})
-                
-            subjects_collection.update_one(
-                {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-                {'$set': {'list': new_list}, '$unset': {'subjects': ""}},
+            # 2. Update the actual score
+            await scores_collection.update_one(
+                {'EmpID': data.EmpID, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
+                # Manual edits drop the upload hash so the next re-upload rewrites this row.
+                {'$set': {f'scores.{catalog.subject_id(data.subject)}': data.score, 'schema_version': SCHEMA_VERSION, 'rev': rev}, '$unset': {'scores_hash': ""}},
                 upsert=True
             )
+            
+            events = [score_event(data.EmpID, data.subject, data.score, rev)]
+            if subjects_changed:
+                events.append(list_event('subjects', catalog.subjects, rev))
         
+        invalidate_batch(data.manager_id, data.batch_id)
+        publish(data.manager_id, data.batch_id, events)
+        analytics.apply_score_update(data.manager_id, data.batch_id, data.EmpID, data.subject, data.score, data.total_marks, rev)
+        retrieval.apply_score_update(data.manager_id, data.batch_id, data.EmpID, data.subject, data.score, rev)
         return {"message": "Score updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/update-scores")
+async def update_scores(data: BulkScoreUpdateModel):
+    if len(data.cells) > settings.BULK_UPDATE_MAX_CELLS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_UPDATE_MAX_CELLS} cells per request")
+    try:
+        failed = {}
+        async with batch_revision(data.manager_id, data.batch_id) as rev:
+            totals = {}
+            for cell in data.cells:
+                if cell.total_marks is not None or cell.subject not in totals:
+                    totals[cell.subject] = cell.total_marks
+            catalog, subjects_changed = await ensure_subjects(data.manager_id, data.batch_id, totals, rev)
+            
+            # One upsert per intern carrying every edited subject; later cells win on duplicates.
+            per_intern = {}
+            for cell in data.cells:
+                per_intern.setdefault(cell.EmpID, {})[f'scores.{catalog.subject_id(cell.subject)}'] = cell.score
+            
+            emp_ids = list(per_intern)
+            ops = [
+                UpdateOne(
+                    {'EmpID': emp_id, 'manager_id': data.manager_id, 'batch_id': data.batch_id},
+                    {'$set': {**per_intern[emp_id], 'schema_version': SCHEMA_VERSION, 'rev': rev}, '$unset': {'scores_hash': ""}},
+                    upsert=True
+                )
+                for emp_id in emp_ids
+            ]
+            
+            if ops:
+                try:
+                    await scores_collection.bulk_write(ops, ordered=False)
+                except BulkWriteError as e:
+                    for err in e.details.get('writeErrors', []):
+                        failed[emp_ids[err['index']]] = err.get('errmsg', 'Write failed')
+        
+        results = []
+        applied = []
+        for idx, cell in enumerate(data.cells):
+            if cell.EmpID in failed:
+                results.append({'index': idx, 'EmpID': cell.EmpID, 'subject': cell.subject, 'status': 'error', 'error': failed[cell.EmpID]})
+            else:
+                results.append({'index': idx, 'EmpID': cell.EmpID, 'subject': cell.subject, 'status': 'ok'})
+                applied.append(cell)
+        
+        invalidate_batch(data.manager_id, data.batch_id)
+        events = [score_event(c.EmpID, c.subject, c.score, rev) for c in applied]
+        if subjects_changed:
+            events.append(list_event('subjects', catalog.subjects, rev))
+        publish(data.manager_id, data.batch_id, events)
+        analytics.apply_score_updates(data.manager_id, data.batch_id, [(c.EmpID, c.subject, c.score, c.total_marks) for c in applied], rev)
+        retrieval.apply_score_updates(data.manager_id, data.batch_id, [(c.EmpID, c.subject, c.score) for c in applied], rev)
+        return {"message": "Scores updated", "updated": len(applied), "failed": len(data.cells) - len(applied), "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
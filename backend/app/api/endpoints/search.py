@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Literal, Optional
+from app.core.responses import encoded_response
+from app.core.security import enforce_session_scope, manager_scope
+from app.services.search import SearchQueryError, search
+
+router = APIRouter(prefix="/api/search", tags=["search"], dependencies=[Depends(enforce_session_scope)])
+
+@router.get("")
+async def search_batches(
+    request: Request, q: str = Query(..., min_length=1, max_length=200), manager_id: str = Depends(manager_scope),
+    kind: Literal['all', 'interns', 'feedback'] = 'all', batch_id: Optional[str] = None,
+    limit: Optional[int] = None, cursor: Optional[str] = None, layout: Literal['rows', 'columnar'] = 'rows'
+):
+    try:
+        return await encoded_response(request, await search(manager_id, q, kind, batch_id, limit, cursor), layout)
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,43 +1,40 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.all_models import ScoreUpdateModel, SubjectDeleteModel, SubjectUpdateModel
-from app.core.database import subjects_collection, scores_collection, interns_collection
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.schemas.all_models import SubjectDeleteModel, SubjectUpdateModel
+from app.core.database import subjects_collection
+from app.core.cache import cached_batch_response, invalidate_batch
+from app.core.revisions import batch_revision, add_tombstones
+from app.services.catalog import load_catalog
+from app.services.live import publish, deleted_event, list_event
+from app.core.security import enforce_session_scope, manager_scope
 
-router = APIRouter(prefix="/api/subjects", tags=["subjects"])
+router = APIRouter(prefix="/api/subjects", tags=["subjects"], dependencies=[Depends(enforce_session_scope)])
+
+async def load_subjects(manager_id, batch_id):
+    catalog = await load_catalog(manager_id, batch_id)
+    return catalog.subjects
 
 @router.get("")
-async def get_subjects(manager_id: str, batch_id: str):
+async def get_subjects(request: Request, batch_id: str, manager_id: str = Depends(manager_scope)):
     try:
-        doc = subjects_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id})
-        if not doc: return []
-        
-        raw_list = doc.get('list') or doc.get('subjects') or []
-        standardized = []
-        for item in raw_list:
-            if isinstance(item, dict):
-                standardized.append(item)
-            else:
-                standardized.append({"name": str(item), "total_marks": 100})
-        return standardized
+        return await cached_batch_response(request, 'subjects', manager_id, batch_id, lambda: load_subjects(manager_id, batch_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("")
 async def delete_subject(data: SubjectDeleteModel):
     try:
-        # Pull matching object or raw string
-        subjects_collection.update_one(
-            {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$pull': {'list': {'name': data.subject}}}
-        )
-        subjects_collection.update_one(
-            {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$pull': {'list': data.subject}}
-        )
-        # Clean up scores
-        scores_collection.update_many(
-            {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-            {'$unset': {f'scores.{data.subject}': ""}}
-        )
+        catalog = await load_catalog(data.manager_id, data.batch_id)
+        subject = catalog.by_name.get(data.subject)
+        if subject:
+            # Scores stay under the retired id and are no longer surfaced, so no score document is touched.
+            async with batch_revision(data.manager_id, data.batch_id) as rev:
+                await subjects_collection.update_one(
+                    {'manager_id': data.manager_id, 'batch_id': data.batch_id},
+                    {'$pull': {'list': {'id': subject['id']}}, '$set': {'rev': rev}}
+                )
+                await add_tombstones(data.manager_id, data.batch_id, rev, 'subjects', [data.subject])
+            invalidate_batch(data.manager_id, data.batch_id)
+            publish(data.manager_id, data.batch_id, [deleted_event('subjects', data.subject, rev)])
         return {"message": f"Subject {data.subject} deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -45,33 +42,34 @@ async def delete_subject(data: SubjectDeleteModel):
 @router.put("")
 async def update_subject(data: SubjectUpdateModel):
     try:
-        subjects_doc = subjects_collection.find_one({'manager_id': data.manager_id, 'batch_id': data.batch_id})
-        if subjects_doc:
-            new_list = []
-            found = False
-            raw_list = subjects_doc.get('list') or subjects_doc.get('subjects') or []
-            for item in raw_list:
-                item_name = item['name'] if isinstance(item, dict) else item
-                if item_name == data.old_name:
-                    found = True
-                    new_item = {
-                        'name': data.new_name if data.new_name else data.old_name,
-                        'total_marks': int(data.total_marks) if data.total_marks is not None else (item.get('total_marks', 100) if isinstance(item, dict) else 100)
-                    }
-                    new_list.append(new_item)
-                else:
-                    new_list.append(item if isinstance(item, dict) else {"name": item, "total_marks": 100})
+        catalog = await load_catalog(data.manager_id, data.batch_id)
+        subject = catalog.by_name.get(data.old_name)
+        if subject:
+            new_name = data.new_name or data.old_name
+            if new_name != data.old_name and new_name in catalog.by_name:
+                raise HTTPException(status_code=409, detail=f"Subject {new_name} already exists")
             
-            if found:
-                subjects_collection.update_one(
-                    {'_id': subjects_doc['_id']},
-                    {'$set': {'list': new_list}, '$unset': {'subjects': ""}}
+            changes = {'list.$.name': new_name}
+            if data.total_marks is not None:
+                changes['list.$.total_marks'] = int(data.total_marks)
+            async with batch_revision(data.manager_id, data.batch_id) as rev:
+                # Scores are keyed by subject id, so a rename only touches the subjects document.
+                await subjects_collection.update_one(
+                    {'manager_id': data.manager_id, 'batch_id': data.batch_id, 'list.id': subject['id']},
+                    {'$set': {**changes, 'rev': rev}}
                 )
-                if data.new_name and data.new_name != data.old_name:
-                    scores_collection.update_many(
-                        {'manager_id': data.manager_id, 'batch_id': data.batch_id},
-                        {'$rename': {f'scores.{data.old_name}': f'scores.{data.new_name}'}}
-                    )
+                renamed = {'from': data.old_name, 'to': new_name}
+                if new_name != data.old_name:
+                    await add_tombstones(data.manager_id, data.batch_id, rev, 'renamed_subjects', [renamed])
+            invalidate_batch(data.manager_id, data.batch_id)
+            
+            subjects = (await load_catalog(data.manager_id, data.batch_id)).subjects
+            events = [list_event('subjects', subjects, rev)]
+            if new_name != data.old_name:
+                events.insert(0, deleted_event('renamed_subjects', renamed, rev))
+            publish(data.manager_id, data.batch_id, events)
         return {"message": "Subject updated"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,110 @@
+import hashlib
+import time
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.responses import Response
+from .config import settings
+from .responses import encoded_response, negotiate
+from .revisions import current_revision
+
+class LRUCache:
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+grid_cache = LRUCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+# Called with (manager_id, batch_id) after every write to a batch in this process.
+invalidation_listeners = []
+
+
+def invalidate_batch(manager_id, batch_id):
+    # Entries are keyed on the batch revision in MongoDB, so other workers miss on their next read;
+    # this only frees the local entries early.
+    for key in [k for k in grid_cache.entries if k[1:3] == (manager_id, batch_id)]:
+        grid_cache.pop(key)
+    for listener in invalidation_listeners:
+        listener(manager_id, batch_id)
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def batch_etag(endpoint, manager_id, batch_id, revision, variant):
+    # Revisions count per batch, so the batch is part of the tag, and so is every encoded variant.
+    media_type, layout, coding = variant
+    scope = hashlib.sha1(f'{manager_id}/{batch_id}'.encode()).hexdigest()[:12]
+    return f'W/"{endpoint}-{scope}-{revision}-{layout}-{media_type.rsplit("/", 1)[-1]}-{coding or "identity"}"'
+
+
+async def cached_batch_response(request: Request, endpoint, manager_id, batch_id, loader, layout='rows'):
+    # Read before loading so the data covers at least this revision; clients use it as `since`.
+    # The revision lives in MongoDB, so every worker agrees on the key and the ETag.
+    revision = await current_revision(manager_id, batch_id)
+    key = (endpoint, manager_id, batch_id, revision)
+    entry = grid_cache.get(key)
+    if entry is None:
+        data = await loader()
+        entry = {'data': data, 'revision': revision, 'bodies': {}}
+        grid_cache.set(key, entry)
+
+    etag = batch_etag(endpoint, manager_id, batch_id, revision, negotiate(request, layout))
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'X-Batch-Revision': str(entry['revision'])}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return await encoded_response(request, entry['data'], layout, headers, entry['bodies'])
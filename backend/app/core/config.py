@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,5 +8,109 @@ class Settings:
     MONGO_URI = os.getenv("MONGO_URI")
     DATABASE_NAME = os.getenv("DATABASE_NAME", "ld_platform")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+
+    # Mongo connection pool
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+    MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "10"))
+
+    # Production server (serve.py)
+    HOST = os.getenv("HOST", "0.0.0.0")
+    PORT = int(os.getenv("PORT", "5000"))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))
+    GRACEFUL_SHUTDOWN_SECONDS = float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+    KEEPALIVE_SECONDS = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+
+    # Sessions (set SESSION_SECRET to the same value on every worker)
+    SESSION_SECRET = os.getenv("SESSION_SECRET")
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "43200"))
+    AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() in ("1", "true", "on")
+    AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+
+    # Excel ingestion
+    UPLOAD_BULK_CHUNK_SIZE = int(os.getenv("UPLOAD_BULK_CHUNK_SIZE", "1000"))
+    IMPORT_SPOOL_DIR = os.getenv("IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "ld_imports"))
+    IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+    IMPORT_MAX_STORED_ERRORS = int(os.getenv("IMPORT_MAX_STORED_ERRORS", "1000"))
+    IMPORT_STALE_JOB_SECONDS = float(os.getenv("IMPORT_STALE_JOB_SECONDS", "3600"))
+    BULK_UPDATE_MAX_CELLS = int(os.getenv("BULK_UPDATE_MAX_CELLS", "5000"))
+    GRID_PAGE_DEFAULT_LIMIT = int(os.getenv("GRID_PAGE_DEFAULT_LIMIT", "100"))
+    GRID_PAGE_MAX_LIMIT = int(os.getenv("GRID_PAGE_MAX_LIMIT", "1000"))
+
+    # Batch lifecycle (clone, move, archive; transactions are used on replica sets and sharded clusters)
+    BATCH_MOVE_MAX_INTERNS = int(os.getenv("BATCH_MOVE_MAX_INTERNS", "5000"))
+    BATCH_TRANSACTIONS = os.getenv("BATCH_TRANSACTIONS", "true").lower() not in ("0", "false", "off")
+
+    # Exports
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+
+    # Report bundles
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+    REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "50"))
+
+    # Response encoding (orjson, brotli and msgpack are used when installed)
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+    # In-process read cache
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+
+    # Batch revisions (a write still pending after this long is treated as abandoned)
+    REVISION_PENDING_TIMEOUT_SECONDS = float(os.getenv("REVISION_PENDING_TIMEOUT_SECONDS", "300"))
+
+    # Batch analytics
+    ANALYTICS_PASS_RATIO = float(os.getenv("ANALYTICS_PASS_RATIO", "0.4"))
+    ANALYTICS_HISTOGRAM_BUCKETS = int(os.getenv("ANALYTICS_HISTOGRAM_BUCKETS", "10"))
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "64"))
+    ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "1800"))
+
+    # Manager dashboard
+    DASHBOARD_TOP_K = int(os.getenv("DASHBOARD_TOP_K", "5"))
+    DASHBOARD_REFRESH_DEBOUNCE_SECONDS = float(os.getenv("DASHBOARD_REFRESH_DEBOUNCE_SECONDS", "2"))
+
+    # Search
+    SEARCH_PAGE_DEFAULT_LIMIT = int(os.getenv("SEARCH_PAGE_DEFAULT_LIMIT", "20"))
+    SEARCH_PAGE_MAX_LIMIT = int(os.getenv("SEARCH_PAGE_MAX_LIMIT", "100"))
+    SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "160"))
+
+    # LLM upstream
+    LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+    # Chat context retrieval
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+    CHAT_RETRIEVAL_TOP_K = int(os.getenv("CHAT_RETRIEVAL_TOP_K", "20"))
+    CHAT_SUBJECT_EXTREMES = int(os.getenv("CHAT_SUBJECT_EXTREMES", "5"))
+    CHAT_INDEX_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_INDEX_CACHE_MAX_ENTRIES", "64"))
+    CHAT_INDEX_CACHE_TTL_SECONDS = float(os.getenv("CHAT_INDEX_CACHE_TTL_SECONDS", "1800"))
+
+    # Chat answer cache (CHAT_CACHE_PATH enables the SQLite disk tier)
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "256"))
+    CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+    CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", "")
+    CHAT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+    # Schema migration
+    MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+
+    # Instrumentation (profiling needs `pip install pyinstrument`; 0 disables it)
+    PROFILE_SLOW_REQUESTS_MS = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", "0"))
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ld_profiles"))
+
+    # Live grid updates
+    LIVE_CHANGE_STREAMS = os.getenv("LIVE_CHANGE_STREAMS", "true").lower() not in ("0", "false", "off")
+    LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+    LIVE_RETRY_SECONDS = float(os.getenv("LIVE_RETRY_SECONDS", "5"))
 
 settings = Settings()
@@ -1,7 +1,20 @@
-from pymongo import MongoClient
+import asyncio
+from pymongo import AsyncMongoClient
 from .config import settings
+from .metrics import mongo_listener
 
-client = MongoClient(settings.MONGO_URI, tlsAllowInvalidCertificates=True)
+client = AsyncMongoClient(
+    settings.MONGO_URI,
+    tlsAllowInvalidCertificates=True,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+    event_listeners=[mongo_listener],
+)
 db = client[settings.DATABASE_NAME]
 
 managers_collection = db.managers
@@ -11,3 +24,43 @@ feedback_collection = db.feedback
 subjects_collection = db.subjects
 batches_collection = db.batches
 feedback_columns_collection = db.feedback_columns
+import_jobs_collection = db.import_jobs
+revisions_collection = db.batch_revisions
+tombstones_collection = db.tombstones
+summaries_collection = db.batch_summaries
+
+# Per-batch data and the key that identifies a document within a batch (its unique index).
+BATCH_DATA_KEYS = {
+    'interns': ['manager_id', 'batch_id', 'EmpID'],
+    'scores': ['manager_id', 'batch_id', 'EmpID'],
+    'feedback': ['manager_id', 'batch_id', 'EmpID', 'column'],
+    'subjects': ['manager_id', 'batch_id'],
+    'feedback_columns': ['manager_id', 'batch_id'],
+}
+# Upload content hashes and the write revision are bookkeeping, kept out of the rows the API returns.
+ROW_PROJECTION = {'_id': 0, 'bio_hash': 0, 'scores_hash': 0, 'rev': 0}
+ARCHIVE_PREFIX = 'archived_'
+# Cold copies of archived batches, kept out of the hot collections and their indexes.
+archive_collections = {name: db[ARCHIVE_PREFIX + name] for name in BATCH_DATA_KEYS}
+# Multi-document transactions need a replica set or sharded cluster.
+TRANSACTION_TOPOLOGIES = {'ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced'}
+
+
+async def warm_pool(connections):
+    # Concurrent pings each check out their own socket, so the pool already holds
+    # that many authenticated connections when the first requests arrive.
+    connections = max(1, min(connections, settings.MONGO_MAX_POOL_SIZE))
+    await asyncio.gather(*(client.admin.command('ping') for _ in range(connections)))
+
+
+def transactions_supported():
+    return settings.BATCH_TRANSACTIONS and client.topology_description.topology_type_name in TRANSACTION_TOPOLOGIES
+
+
+async def run_in_transaction(callback):
+    # callback(session) may run more than once: with_transaction retries transient errors.
+    # On a standalone server it runs once with session=None and its writes are not atomic.
+    if not transactions_supported():
+        return await callback(None)
+    async with client.start_session() as session:
+        return await session.with_transaction(callback)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import sys
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+from .database import ARCHIVE_PREFIX, BATCH_DATA_KEYS, db
+from .security import USERNAME_COLLATION
+
+logger = logging.getLogger(__name__)
+
+BATCH_KEY = [('manager_id', ASCENDING), ('batch_id', ASCENDING)]
+INTERN_KEY = BATCH_KEY + [('EmpID', ASCENDING)]
+
+INDEXES = {
+    'managers': [
+        IndexModel([('username', ASCENDING)], unique=True, collation=USERNAME_COLLATION, name='username_ci_unique'),
+    ],
+    'batches': [
+        IndexModel([('batch_id', ASCENDING)], unique=True, name='batch_id_unique'),
+        IndexModel([('manager_id', ASCENDING)], name='manager_id'),
+    ],
+    'interns': [
+        IndexModel(INTERN_KEY, unique=True, name='batch_intern_unique'),
+        IndexModel(BATCH_KEY + [('Name', ASCENDING), ('EmpID', ASCENDING)], name='batch_name_empid'),
+        IndexModel(BATCH_KEY + [('rev', ASCENDING)], name='batch_rev'),
+        # manager_id is an equality prefix, so a search only walks that manager's postings.
+        IndexModel(
+            [('manager_id', ASCENDING), ('Name', TEXT), ('EmpID', TEXT), ('Email', TEXT)],
+            weights={'Name': 10, 'EmpID': 10, 'Email': 4}, default_language='english', name='manager_text'
+        ),
+    ],
+    'scores': [
+        IndexModel(INTERN_KEY, unique=True, name='batch_intern_unique'),
+        IndexModel(BATCH_KEY + [('rev', ASCENDING)], name='batch_rev'),
+    ],
+    'feedback': [
+        IndexModel(INTERN_KEY + [('column', ASCENDING)], unique=True, name='batch_intern_column_unique'),
+        IndexModel(BATCH_KEY + [('column', ASCENDING)], name='batch_column'),
+        IndexModel(BATCH_KEY + [('rev', ASCENDING)], name='batch_rev'),
+        IndexModel([('manager_id', ASCENDING), ('text', TEXT)], default_language='english', name='manager_text'),
+    ],
+    'subjects': [
+        IndexModel(BATCH_KEY, unique=True, name='batch_unique'),
+    ],
+    'feedback_columns': [
+        IndexModel(BATCH_KEY, unique=True, name='batch_unique'),
+    ],
+    'batch_revisions': [
+        IndexModel(BATCH_KEY, unique=True, name='batch_unique'),
+    ],
+    'batch_summaries': [
+        # Also the `on` key of the summary pipeline's $merge, which requires a unique index.
+        IndexModel(BATCH_KEY, unique=True, name='batch_unique'),
+    ],
+    'tombstones': [
+        IndexModel(BATCH_KEY + [('rev', ASCENDING)], name='batch_rev'),
+    ],
+    # Archived batches are only read back whole, so each cold collection keeps just the
+    # unique key that the archive and restore $merge stages match on.
+    **{
+        ARCHIVE_PREFIX + name: [IndexModel([(field, ASCENDING) for field in key], unique=True, name='batch_key_unique')]
+        for name, key in BATCH_DATA_KEYS.items()
+    },
+    'import_jobs': [
+        IndexModel([('job_id', ASCENDING)], unique=True, name='job_id_unique'),
+        IndexModel(BATCH_KEY + [('created_at', DESCENDING)], name='batch_created_at'),
+        IndexModel([('manager_id', ASCENDING), ('created_at', DESCENDING)], name='manager_created_at'),
+        IndexModel([('status', ASCENDING)], name='status'),
+    ],
+}
+
+# Every filter/sort the routers send, with placeholder values. Used by the plan audit.
+QUERY_SHAPES = [
+    {'name': 'login', 'collection': 'managers', 'filter': {'username': 'manager'}, 'collation': USERNAME_COLLATION},
+    {'name': 'batches_by_manager', 'collection': 'batches', 'filter': {'manager_id': 'm'}},
+    {'name': 'active_batches_by_manager', 'collection': 'batches', 'filter': {'manager_id': 'm', 'archived': {'$ne': True}}},
+    {'name': 'batch_by_id', 'collection': 'batches', 'filter': {'batch_id': 'b'}},
+    {'name': 'interns_by_batch', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'intern_by_emp', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'EmpID': 'e'}},
+    {'name': 'interns_page_by_name', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'Name': {'$gt': 'n'}}, 'sort': {'Name': 1, 'EmpID': 1}},
+    {'name': 'interns_page_by_empid', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'EmpID': {'$gt': 'e'}}, 'sort': {'EmpID': 1}},
+    {'name': 'orphan_interns', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': {'$exists': False}}},
+    {'name': 'scores_by_batch', 'collection': 'scores', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'score_by_emp', 'collection': 'scores', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'EmpID': 'e'}},
+    {'name': 'feedback_by_batch', 'collection': 'feedback', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'feedback_by_emp', 'collection': 'feedback', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'EmpID': 'e'}},
+    {'name': 'feedback_cell', 'collection': 'feedback', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'EmpID': 'e', 'column': 'c'}},
+    {'name': 'feedback_by_column', 'collection': 'feedback', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'column': 'c'}},
+    {'name': 'subjects_by_batch', 'collection': 'subjects', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'feedback_columns_by_batch', 'collection': 'feedback_columns', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'batch_revision', 'collection': 'batch_revisions', 'filter': {'manager_id': 'm', 'batch_id': 'b'}},
+    {'name': 'revisions_by_manager', 'collection': 'batch_revisions', 'filter': {'manager_id': 'm'}},
+    {'name': 'summaries_by_manager', 'collection': 'batch_summaries', 'filter': {'manager_id': 'm'}},
+    {'name': 'search_interns', 'collection': 'interns', 'filter': {'manager_id': 'm', '$text': {'$search': 'q'}}},
+    {'name': 'search_feedback', 'collection': 'feedback', 'filter': {'manager_id': 'm', '$text': {'$search': 'q'}}},
+    {'name': 'interns_changed_since', 'collection': 'interns', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'rev': {'$gt': 0}}},
+    {'name': 'scores_changed_since', 'collection': 'scores', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'rev': {'$gt': 0}}},
+    {'name': 'feedback_changed_since', 'collection': 'feedback', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'rev': {'$gt': 0}}},
+    {'name': 'tombstones_since', 'collection': 'tombstones', 'filter': {'manager_id': 'm', 'batch_id': 'b', 'rev': {'$gt': 0}}},
+    *[
+        {'name': f'{ARCHIVE_PREFIX}{name}_by_batch', 'collection': ARCHIVE_PREFIX + name, 'filter': {'manager_id': 'm', 'batch_id': 'b'}}
+        for name in BATCH_DATA_KEYS
+    ],
+    {'name': 'import_job', 'collection': 'import_jobs', 'filter': {'job_id': 'j'}},
+    {'name': 'import_jobs_by_manager', 'collection': 'import_jobs', 'filter': {'manager_id': 'm'}, 'sort': {'created_at': -1}},
+    {'name': 'import_jobs_by_batch', 'collection': 'import_jobs', 'filter': {'manager_id': 'm', 'batch_id': 'b'}, 'sort': {'created_at': -1}},
+    {'name': 'import_jobs_active', 'collection': 'import_jobs', 'filter': {'status': {'$in': ['queued', 'running']}}},
+]
+
+
+async def _ensure_collection_indexes(collection, models):
+    try:
+        return await db[collection].create_indexes(models)
+    except ConnectionFailure:
+        raise
+    except PyMongoError as e:
+        logger.error("Could not create indexes on %s: %s", collection, e)
+        return []
+
+
+async def ensure_indexes():
+    # Collections are independent, so every worker issues all of them at once.
+    try:
+        results = await asyncio.gather(*(_ensure_collection_indexes(c, m) for c, m in INDEXES.items()))
+    except ConnectionFailure as e:
+        logger.error("Skipping index bootstrap, MongoDB is unreachable: %s", e)
+        return {}
+    return dict(zip(INDEXES, results))
+
+
+def _plan_stages(plan):
+    stages = []
+    if not isinstance(plan, dict):
+        return stages
+    if 'stage' in plan:
+        stages.append((plan['stage'], plan.get('indexName')))
+    for key in ('inputStage', 'queryPlan', 'outerStage', 'innerStage'):
+        stages.extend(_plan_stages(plan.get(key)))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def explain_shape(shape):
+    command = {'find': shape['collection'], 'filter': shape['filter']}
+    if shape.get('sort'):
+        command['sort'] = shape['sort']
+    if shape.get('collation'):
+        command['collation'] = shape['collation']
+    result = await db.command({'explain': command, 'verbosity': 'queryPlanner'})
+    stages = _plan_stages(result.get('queryPlanner', {}).get('winningPlan', {}))
+    stage_names = [name for name, _ in stages]
+    indexes = [index for _, index in stages if index]
+    return {
+        'name': shape['name'],
+        'collection': shape['collection'],
+        'filter': shape['filter'],
+        'sort': shape.get('sort'),
+        'stages': stage_names,
+        'indexes': indexes,
+        'collection_scan': 'COLLSCAN' in stage_names,
+        'in_memory_sort': 'SORT' in stage_names,
+    }
+
+
+async def audit_query_plans():
+    report = []
+    for shape in QUERY_SHAPES:
+        try:
+            report.append(await explain_shape(shape))
+        except PyMongoError as e:
+            report.append({'name': shape['name'], 'collection': shape['collection'], 'error': str(e)})
+    flagged = [r['name'] for r in report if r.get('error') or r.get('collection_scan') or r.get('in_memory_sort')]
+    return {'shapes': report, 'flagged': flagged}
+
+
+async def _main(command):
+    if command == 'ensure':
+        result = await ensure_indexes()
+    else:
+        result = await audit_query_plans()
+    print(json.dumps(result, indent=2))
+    return 1 if command == 'audit' and result['flagged'] else 0
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'audit'
+    if command not in ('ensure', 'audit'):
+        sys.exit("usage: python -m app.core.indexes [ensure|audit]")
+    sys.exit(asyncio.run(_main(command)))
@@ -0,0 +1,248 @@
+import logging
+import os
+import random
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pymongo import monitoring
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self.values[tuple(labels.get(n, '') for n in self.label_names)] = value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in self.series.items():
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', {**labels, 'le': repr(float(bound))}, cumulative
+            yield f'{self.name}_bucket', {**labels, 'le': '+Inf'}, count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_label_text(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter('http_requests_total', 'HTTP requests by route and status.', ('method', 'route', 'status')))
+http_latency = registry.register(Histogram('http_request_duration_seconds', 'Time to the last response byte.', ('method', 'route')))
+http_request_size = registry.register(Histogram('http_request_size_bytes', 'Request body size.', ('method', 'route'), SIZE_BUCKETS))
+http_response_size = registry.register(Histogram('http_response_size_bytes', 'Response body size.', ('method', 'route'), SIZE_BUCKETS))
+http_in_flight = registry.register(Gauge('http_requests_in_flight', 'Requests currently being served.', ('method',)))
+mongo_commands = registry.register(Counter('mongo_commands_total', 'MongoDB commands by name and outcome.', ('command', 'outcome')))
+mongo_latency = registry.register(Histogram('mongo_command_duration_seconds', 'MongoDB command round-trip time.', ('command',)))
+mongo_per_request = registry.register(Histogram('mongo_commands_per_request', 'MongoDB round trips made while serving one request.', ('route',), COUNT_BUCKETS))
+llm_latency = registry.register(Histogram('llm_request_duration_seconds', 'Groq call time, including streaming.', ('mode', 'outcome')))
+llm_first_token = registry.register(Histogram('llm_time_to_first_token_seconds', 'Time until the first streamed token.'))
+chat_answers = registry.register(Counter('chat_answers_total', 'Chat answers by cache outcome (memory_hit, disk_hit, coalesced, miss).', ('outcome',)))
+startup_seconds = registry.register(Gauge('app_startup_seconds', 'Time the lifespan hook spent warming the Mongo pool and indexes.'))
+slow_profiles = registry.register(Counter('http_slow_request_profiles_total', 'Slow requests written to the profile directory.', ('route',)))
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_count = 0
+        self.mongo_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    def server_timing(self):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        parts = [f'app;dur={total_ms:.1f}', f'db;dur={self.mongo_seconds * 1000:.1f};desc="{self.mongo_count} queries"']
+        if self.llm_seconds:
+            parts.append(f'llm;dur={self.llm_seconds * 1000:.1f}')
+        return ', '.join(parts)
+
+
+# asyncio.gather copies the context, so tasks spawned by a request still see its timings.
+current_timings = ContextVar('current_timings', default=None)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1_000_000
+        mongo_commands.inc(command=event.command_name, outcome=outcome)
+        mongo_latency.observe(seconds, command=event.command_name)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.mongo_count += 1
+            timings.mongo_seconds += seconds
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+
+mongo_listener = MongoCommandListener()
+
+
+def record_llm_call(mode, seconds, outcome='ok'):
+    llm_latency.observe(seconds, mode=mode, outcome=outcome)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.llm_seconds += seconds
+
+
+def _start_profiler():
+    if settings.PROFILE_SLOW_REQUESTS_MS <= 0 or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return None
+    profiler = Profiler(async_mode='enabled')
+    try:
+        profiler.start()
+    except RuntimeError:
+        # Another sampled request is already being profiled on this thread.
+        return None
+    return profiler
+
+
+def _finish_profiler(profiler, route, elapsed):
+    profiler.stop()
+    if elapsed * 1000 < settings.PROFILE_SLOW_REQUESTS_MS:
+        return
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    safe_route = route.strip('/').replace('/', '_').replace('{', '').replace('}', '') or 'root'
+    path = os.path.join(settings.PROFILE_DIR, f'{int(time.time() * 1000)}_{safe_route}.html')
+    with open(path, 'w') as f:
+        f.write(profiler.output_html())
+    slow_profiles.inc(route=route)
+    logger.warning("Slow request %s took %.0f ms; profile written to %s", route, elapsed * 1000, path)
+
+
+def _route_label(scope):
+    route = scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        method = scope['method']
+        sizes = {'request': 0, 'response': 0}
+        status = {'code': 500}
+        profiler = _start_profiler()
+        http_in_flight.inc(method=method)
+
+        async def receive_wrapper():
+            message = await receive()
+            if message['type'] == 'http.request':
+                sizes['request'] += len(message.get('body', b''))
+            return message
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+                # Streaming responses report time to headers; /metrics has the full duration.
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timings.server_timing().encode()))
+                message = {**message, 'headers': headers}
+            elif message['type'] == 'http.response.body':
+                sizes['response'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - timings.started
+            route = _route_label(scope)
+            http_in_flight.dec(method=method)
+            http_requests.inc(method=method, route=route, status=str(status['code']))
+            http_latency.observe(elapsed, method=method, route=route)
+            http_request_size.observe(sizes['request'], method=method, route=route)
+            http_response_size.observe(sizes['response'], method=method, route=route)
+            mongo_per_request.observe(timings.mongo_count, route=route)
+            if profiler is not None:
+                _finish_profiler(profiler, route, elapsed)
+            current_timings.reset(token)
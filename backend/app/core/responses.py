@@ -0,0 +1,124 @@
+import gzip
+import json
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+
+# orjson, brotli and msgpack are optional; without them responses fall back to
+# stdlib JSON and gzip, and msgpack is simply never negotiated.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_ACCEPT = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def _default(value):
+    # Datetimes and ObjectIds, the only non-JSON types stored in these collections.
+    isoformat = getattr(value, 'isoformat', None)
+    return isoformat() if isoformat else str(value)
+
+
+def dumps_json(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps_json(content)
+
+
+def _is_rows(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+def columnar(rows):
+    # Field names are sent once; each row becomes an array in that order, with null for absent fields.
+    fields = {}
+    for row in rows:
+        for key in row:
+            fields.setdefault(key, None)
+    fields = list(fields)
+    return {'fields': fields, 'rows': [[row.get(field) for field in fields] for row in rows]}
+
+
+def to_layout(data, layout):
+    if layout != 'columnar':
+        return data
+    if _is_rows(data):
+        return columnar(data)
+    if isinstance(data, dict):
+        return {key: columnar(value) if _is_rows(value) else value for key, value in data.items()}
+    return data
+
+
+def _accepted_codings(header):
+    codings = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q=') and q[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if name:
+            codings.add(name.strip().lower())
+    return codings
+
+
+def negotiate(request: Request, layout='rows'):
+    accept = request.headers.get('accept', '').lower()
+    media_type = MSGPACK_MEDIA_TYPE if msgpack is not None and any(t in accept for t in MSGPACK_ACCEPT) else JSON_MEDIA_TYPE
+    codings = _accepted_codings(request.headers.get('accept-encoding', ''))
+    if brotli is not None and 'br' in codings:
+        coding = 'br'
+    elif 'gzip' in codings:
+        coding = 'gzip'
+    else:
+        coding = None
+    return media_type, layout, coding
+
+
+def compress(body, coding):
+    if coding == 'br':
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def encode_body(data, variant):
+    media_type, layout, coding = variant
+    data = to_layout(data, layout)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(data, default=_default, use_bin_type=True)
+    else:
+        body = dumps_json(data)
+    if coding is None or len(body) < settings.RESPONSE_COMPRESS_MIN_BYTES:
+        return body, None
+    return compress(body, coding), coding
+
+
+async def encoded_response(request: Request, data, layout='rows', headers=None, bodies=None):
+    # `bodies` memoizes encoded variants, so a cached grid is serialized and compressed once per variant.
+    variant = negotiate(request, layout)
+    encoded = bodies.get(variant) if bodies is not None else None
+    if encoded is None:
+        encoded = await run_in_threadpool(encode_body, data, variant)
+        if bodies is not None:
+            bodies[variant] = encoded
+    body, coding = encoded
+    headers = {**(headers or {}), 'Vary': 'Accept, Accept-Encoding'}
+    if coding:
+        headers['Content-Encoding'] = coding
+    return Response(body, media_type=variant[0], headers=headers)
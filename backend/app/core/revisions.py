@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from .config import settings
+from .database import revisions_collection, tombstones_collection
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownRevisionError(ValueError):
+    pass
+
+
+async def next_revision(manager_id, batch_id):
+    # The new revision is recorded as pending on the batch's revision document until its write
+    # lands, so every worker can see it. Entries older than the timeout belong to crashed writers
+    # and are dropped here and ignored by readers.
+    cutoff = {'$subtract': ['$$NOW', int(settings.REVISION_PENDING_TIMEOUT_SECONDS * 1000)]}
+    doc = await revisions_collection.find_one_and_update(
+        {'manager_id': manager_id, 'batch_id': batch_id},
+        [
+            {'$set': {'rev': {'$add': [{'$ifNull': ['$rev', 0]}, 1]}}},
+            {'$set': {'pending': {'$concatArrays': [
+                {'$filter': {'input': {'$ifNull': ['$pending', []]}, 'cond': {'$gt': ['$$this.at', cutoff]}}},
+                [{'rev': '$rev', 'at': '$$NOW'}]
+            ]}}}
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc['rev']
+
+
+@asynccontextmanager
+async def batch_revision(manager_id, batch_id):
+    rev = await next_revision(manager_id, batch_id)
+    try:
+        yield rev
+    finally:
+        try:
+            await revisions_collection.update_one({'manager_id': manager_id, 'batch_id': batch_id}, {'$pull': {'pending': {'rev': rev}}})
+        except PyMongoError as e:
+            # Readers stop waiting for the entry once it times out.
+            logger.warning("Could not clear pending revision %s of %s/%s: %s", rev, manager_id, batch_id, e)
+
+
+async def _revision_doc(manager_id, batch_id):
+    return await revisions_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0, 'rev': 1, 'pending': 1})
+
+
+def settled_revision(doc):
+    # A write on any worker may hold a lower revision that has not landed yet. Report the revision
+    # just below it so a client polling with `since`, or a cache keyed on the revision, does not
+    # move past that write.
+    if not doc:
+        return 0
+    # Dates come back from the server as naive UTC.
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=settings.REVISION_PENDING_TIMEOUT_SECONDS)
+    pending = [entry['rev'] for entry in doc.get('pending', []) if entry['at'] > cutoff]
+    return min(doc['rev'], min(pending) - 1) if pending else doc['rev']
+
+
+async def current_revision(manager_id, batch_id):
+    return settled_revision(await _revision_doc(manager_id, batch_id))
+
+
+async def add_tombstones(manager_id, batch_id, rev, kind, keys, session=None):
+    if not keys:
+        return
+    await tombstones_collection.insert_many([
+        {'manager_id': manager_id, 'batch_id': batch_id, 'kind': kind, 'key': key, 'rev': rev}
+        for key in keys
+    ], session=session)
+
+
+async def tombstones_since(manager_id, batch_id, since):
+    docs = await tombstones_collection.find(
+        {'manager_id': manager_id, 'batch_id': batch_id, 'rev': {'$gt': since}},
+        {'_id': 0, 'kind': 1, 'key': 1}
+    ).to_list()
+    deleted = {}
+    for doc in docs:
+        keys = deleted.setdefault(doc['kind'], [])
+        if doc['key'] not in keys:
+            keys.append(doc['key'])
+    return deleted
+
+
+async def changed_emp_ids(manager_id, batch_id, since, *collections):
+    rev_filter = {'manager_id': manager_id, 'batch_id': batch_id, 'rev': {'$gt': since}}
+    results = await asyncio.gather(*(collection.distinct('EmpID', rev_filter) for collection in collections))
+    return sorted(set().union(*results))
+
+
+async def check_since(manager_id, batch_id, since):
+    doc = await _revision_doc(manager_id, batch_id)
+    if since < 0 or since > (doc['rev'] if doc else 0):
+        raise UnknownRevisionError(f"since={since} is not a revision of this batch; reload the full grid")
+    return settled_revision(doc)
@@ -0,0 +1,148 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, Request
+from werkzeug.security import generate_password_hash, check_password_hash
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Usernames match case-insensitively through this collation, so the unique
+# index on `username` serves both the login lookup and the duplicate check.
+USERNAME_COLLATION = {'locale': 'en', 'strength': 2}
+
+# Hashing is deliberately slow; a small pool keeps a login storm from
+# starving the event loop or every core on the host.
+_hash_pool = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+_dummy_hash = None
+
+if settings.SESSION_SECRET:
+    _secret = settings.SESSION_SECRET.encode()
+else:
+    _secret = secrets.token_bytes(32)
+    logger.warning("SESSION_SECRET is not set; session tokens are only valid in this process")
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+def normalize_username(username):
+    return username.strip()
+
+
+async def hash_password(password):
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, generate_password_hash, password)
+
+
+def _check_password(password_hash, password):
+    global _dummy_hash
+    if password_hash is None:
+        # Unknown usernames still pay for a hash check, so they take as long as a wrong password.
+        if _dummy_hash is None:
+            _dummy_hash = generate_password_hash(secrets.token_hex(8))
+        password_hash = _dummy_hash
+    return check_password_hash(password_hash, password)
+
+
+async def verify_password(password_hash, password):
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, _check_password, password_hash, password)
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_secret, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(manager_id, username, ttl=None):
+    claims = {'sub': manager_id, 'usr': username, 'exp': int(time.time() + (ttl or settings.SESSION_TTL_SECONDS))}
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    return f'{payload}.{_sign(payload)}'
+
+
+def verify_token(token):
+    payload, _, signature = token.partition('.')
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidTokenError("Invalid session token")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidTokenError("Invalid session token")
+    if claims.get('exp', 0) < time.time():
+        raise InvalidTokenError("Session expired")
+    return claims
+
+
+def session_manager_id(request: Request):
+    # Verified once per request; the claims carry the manager id, so no lookup is needed.
+    if hasattr(request.state, 'manager_id'):
+        return request.state.manager_id
+    header = request.headers.get('authorization', '')
+    manager_id = None
+    if header[:7].lower() == 'bearer ':
+        try:
+            manager_id = verify_token(header[7:].strip())['sub']
+        except InvalidTokenError as e:
+            raise HTTPException(status_code=401, detail=str(e), headers={'WWW-Authenticate': 'Bearer'})
+    request.state.manager_id = manager_id
+    return manager_id
+
+
+async def _body_manager_id(request: Request):
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith('application/json'):
+            body = json.loads(await request.body() or b'null')
+            return body.get('manager_id') if isinstance(body, dict) else None
+        if content_type.startswith(('multipart/form-data', 'application/x-www-form-urlencoded')):
+            return (await request.form()).get('manager_id')
+    except ValueError:
+        # Malformed bodies are left for request validation to reject.
+        return None
+    return None
+
+
+async def enforce_session_scope(request: Request):
+    # Router-level guard: a signed-in manager can only address their own data.
+    manager_id = session_manager_id(request)
+    if manager_id is None:
+        if settings.AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Missing session token", headers={'WWW-Authenticate': 'Bearer'})
+        return
+    claimed = {request.query_params.get('manager_id'), await _body_manager_id(request)} - {None}
+    if claimed - {manager_id}:
+        raise HTTPException(status_code=403, detail="Session does not match manager_id")
+
+
+async def require_session(request: Request):
+    # For routes that reach across managers: a signed-in caller is needed even without AUTH_REQUIRED.
+    manager_id = session_manager_id(request)
+    if manager_id is None:
+        raise HTTPException(status_code=401, detail="Missing session token", headers={'WWW-Authenticate': 'Bearer'})
+    return manager_id
+
+
+async def manager_scope(request: Request, manager_id: Optional[str] = None):
+    # Query-string endpoints take the manager from the session when it is omitted.
+    resolved = manager_id or session_manager_id(request)
+    if not resolved:
+        raise HTTPException(status_code=422, detail="manager_id is required without a session token")
+    return resolved
+
+
+def shutdown():
+    _hash_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,53 @@
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.core.database import client, warm_pool
+from app.core.metrics import MetricsMiddleware, startup_seconds
+from app.core.responses import FastJSONResponse
+from app.core import security
+from app.core.indexes import ensure_indexes
 from app.api.endpoints import (
-    auth, batches, interns, subjects, scores, feedback, reports, excel, chat, debug
+    auth, batches, interns, subjects, scores, feedback, reports, analytics, dashboard, search, excel, imports, chat, live, metrics, debug
 )
+from app.services import answer_cache, import_jobs, report_bundle, summaries
+from app.services.live import hub
 
-app = FastAPI(title="L&D Platform API", version="2.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    try:
+        await warm_pool(settings.MONGO_WARMUP_CONNECTIONS)
+        await ensure_indexes()
+        await import_jobs.reconcile_jobs()
+    except PyMongoError as e:
+        logger.error("Starting without a warm MongoDB pool: %s", e)
+    startup_seconds.set(time.perf_counter() - started)
+    logger.info("Startup warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+    yield
+    await hub.shutdown()
+    await import_jobs.shutdown()
+    await report_bundle.shutdown()
+    await answer_cache.shutdown()
+    await summaries.shutdown()
+    security.shutdown()
+    await client.close()
+
+app = FastAPI(title="L&D Platform API", version="2.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Batch-Revision", "Server-Timing", "X-Answer-Cache"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router)
@@ -21,8 +57,14 @@ app.include_router(subjects.router)
 app.include_router(scores.router)
 app.include_router(feedback.router)
 app.include_router(reports.router)
+app.include_router(analytics.router)
+app.include_router(dashboard.router)
+app.include_router(search.router)
 app.include_router(excel.router)
+app.include_router(imports.router)
 app.include_router(chat.router)
+app.include_router(live.router)
+app.include_router(metrics.router)
 app.include_router(debug.router)
 
 @app.get("/")
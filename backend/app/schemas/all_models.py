@@ -9,6 +9,15 @@ class BatchModel(BaseModel):
     name: str
     manager_id: str
 
+class BatchCloneModel(BaseModel):
+    name: Optional[str] = None
+    manager_id: str
+
+class InternMoveModel(BaseModel):
+    emp_ids: List[str]
+    target_batch_id: str
+    manager_id: str
+
 class InternModel(BaseModel):
     Name: str
     Email: EmailStr
@@ -24,6 +33,17 @@ class ScoreUpdateModel(BaseModel):
     manager_id: str
     batch_id: str
 
+class ScoreCellModel(BaseModel):
+    EmpID: str
+    subject: str
+    score: float
+    total_marks: Optional[int] = None
+
+class BulkScoreUpdateModel(BaseModel):
+    cells: List[ScoreCellModel]
+    manager_id: str
+    batch_id: str
+
 class SubjectDeleteModel(BaseModel):
     subject: str
     manager_id: str
@@ -48,7 +68,18 @@ class FeedbackCellUpdateModel(BaseModel):
     manager_id: str
     batch_id: str
 
+class FeedbackCellModel(BaseModel):
+    EmpID: str
+    column: str
+    text: str
+
+class BulkFeedbackUpdateModel(BaseModel):
+    cells: List[FeedbackCellModel]
+    manager_id: str
+    batch_id: str
+
 class ChatQueryModel(BaseModel):
     query: str
     manager_id: str
     batch_id: str
+    stream: bool = False
@@ -0,0 +1,190 @@
+import asyncio
+import math
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import interns_collection, scores_collection
+from app.core.revisions import current_revision
+from app.services.catalog import load_catalog
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+analytics_cache = LRUCache(settings.ANALYTICS_CACHE_MAX_ENTRIES, settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+def _round(value):
+    return None if value is None or math.isnan(value) else round(float(value), 4)
+
+
+def _quantiles(sorted_vals, qs):
+    n = len(sorted_vals)
+    if n == 0:
+        return [None] * len(qs)
+    positions = np.asarray(qs, dtype=float) / 100 * (n - 1)
+    lo = np.floor(positions).astype(int)
+    hi = np.ceil(positions).astype(int)
+    frac = positions - lo
+    return list(sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * frac)
+
+
+class BatchAnalytics:
+    def __init__(self, version, interns, subjects, matrix):
+        self.version = version
+        self.interns = interns
+        self.emp_index = {emp_id: i for i, (emp_id, _) in enumerate(interns)}
+        self.subjects = [s['name'] for s in subjects]
+        self.subject_index = {name: j for j, name in enumerate(self.subjects)}
+        self.totals = np.array([float(s['total_marks']) for s in subjects])
+        self.matrix = matrix
+        self.buckets = settings.ANALYTICS_HISTOGRAM_BUCKETS
+        self.sorted_columns = []
+        self.histograms = np.zeros((len(self.subjects), self.buckets), dtype=np.int64)
+        self.pass_counts = np.zeros(len(self.subjects), dtype=np.int64)
+        for j in range(len(self.subjects)):
+            column = matrix[:, j]
+            self.sorted_columns.append(np.sort(column[~np.isnan(column)]))
+            self._rebuild_distribution(j)
+        self._payload = None
+
+    def _bucket(self, values, j):
+        total = self.totals[j] or 1.0
+        return np.clip(np.floor(np.asarray(values) / total * self.buckets).astype(int), 0, self.buckets - 1)
+
+    def _passes(self, values, j):
+        return np.asarray(values) >= self.totals[j] * settings.ANALYTICS_PASS_RATIO
+
+    def _rebuild_distribution(self, j):
+        values = self.sorted_columns[j]
+        self.histograms[j] = np.bincount(self._bucket(values, j), minlength=self.buckets)
+        self.pass_counts[j] = int(np.count_nonzero(self._passes(values, j)))
+
+    def apply_score(self, emp_id, subject, score, total_marks=None):
+        i = self.emp_index.get(emp_id)
+        j = self.subject_index.get(subject)
+        if i is None or j is None:
+            return False
+
+        column = self.sorted_columns[j]
+        old = self.matrix[i, j]
+        if not math.isnan(old):
+            column = np.delete(column, np.searchsorted(column, old))
+            self.histograms[j, self._bucket(old, j)] -= 1
+            self.pass_counts[j] -= int(self._passes(old, j))
+        self.sorted_columns[j] = np.insert(column, np.searchsorted(column, score), score)
+        self.matrix[i, j] = score
+
+        if total_marks is not None and float(total_marks) != self.totals[j]:
+            self.totals[j] = float(total_marks)
+            self._rebuild_distribution(j)
+        else:
+            self.histograms[j, self._bucket(score, j)] += 1
+            self.pass_counts[j] += int(self._passes(score, j))
+        self._payload = None
+        return True
+
+    def _subject_stats(self, j):
+        values = self.sorted_columns[j]
+        count = len(values)
+        total = self.totals[j]
+        edges = np.linspace(0, total, self.buckets + 1)
+        quantiles = _quantiles(values, PERCENTILES)
+        return {
+            'name': self.subjects[j],
+            'total_marks': _round(total),
+            'count': count,
+            'missing': len(self.interns) - count,
+            'mean': _round(values.mean()) if count else None,
+            'median': _round(quantiles[PERCENTILES.index(50)]) if count else None,
+            'std': _round(values.std()) if count else None,
+            'min': _round(values[0]) if count else None,
+            'max': _round(values[-1]) if count else None,
+            'percentiles': {f"p{q}": _round(v) if v is not None else None for q, v in zip(PERCENTILES, quantiles)},
+            'histogram': {
+                'edges': [_round(e) for e in edges],
+                'counts': self.histograms[j].tolist()
+            },
+            'pass_mark': _round(total * settings.ANALYTICS_PASS_RATIO),
+            'pass_rate': _round(self.pass_counts[j] / count) if count else None
+        }
+
+    def _intern_ranks(self):
+        rows = [{'EmpID': emp_id, 'Name': name, 'subjects': {}} for emp_id, name in self.interns]
+        for j, subject in enumerate(self.subjects):
+            sorted_vals = self.sorted_columns[j]
+            n = len(sorted_vals)
+            column = self.matrix[:, j]
+            present = np.flatnonzero(~np.isnan(column))
+            at_or_below = np.searchsorted(sorted_vals, column[present], side='right')
+            # Ties share the best rank: count of strictly greater scores plus one.
+            ranks = n - at_or_below + 1
+            percentiles = at_or_below / n * 100 if n else at_or_below
+            for idx, rank, pct in zip(present.tolist(), ranks.tolist(), percentiles.tolist()):
+                rows[idx]['subjects'][subject] = {
+                    'score': _round(column[idx]),
+                    'rank': int(rank),
+                    'percentile': round(pct, 2)
+                }
+        return rows
+
+    def to_dict(self):
+        if self._payload is None:
+            self._payload = {
+                'version': self.version,
+                'intern_count': len(self.interns),
+                'subjects': [self._subject_stats(j) for j in range(len(self.subjects))],
+                'interns': self._intern_ranks()
+            }
+        return self._payload
+
+
+def build_batch_analytics(version, interns, scores, catalog):
+    subjects = catalog.subjects
+    scores_map = {s['EmpID']: catalog.scores_by_name(s.get('scores')) for s in scores}
+
+    names = [s['name'] for s in subjects]
+    matrix = np.full((len(interns), len(names)), np.nan)
+    for i, intern in enumerate(interns):
+        intern_scores = scores_map.get(intern['EmpID'], {})
+        for j, name in enumerate(names):
+            val = intern_scores.get(name)
+            if isinstance(val, (int, float)):
+                matrix[i, j] = val
+    return BatchAnalytics(version, [(i['EmpID'], i.get('Name')) for i in interns], subjects, matrix)
+
+
+async def get_batch_analytics(manager_id, batch_id):
+    # Keyed on the batch revision in MongoDB, so a write handled by any worker is noticed here.
+    version = await current_revision(manager_id, batch_id)
+    entry = analytics_cache.get((manager_id, batch_id))
+    if entry is not None and entry.version == version:
+        return entry
+
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    interns, scores, catalog = await asyncio.gather(
+        interns_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'Name': 1}).to_list(),
+        scores_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'scores': 1}).to_list(),
+        load_catalog(manager_id, batch_id)
+    )
+    entry = await run_in_threadpool(build_batch_analytics, version, interns, scores, catalog)
+    analytics_cache.set((manager_id, batch_id), entry)
+    return entry
+
+
+def apply_score_updates(manager_id, batch_id, updates, version):
+    key = (manager_id, batch_id)
+    analytics = analytics_cache.peek(key)
+    if analytics is None:
+        return
+    # Only patch in place when no other write landed since the entry was built.
+    if analytics.version == version - 1 and all(
+        analytics.apply_score(emp_id, subject, float(score), total_marks)
+        for emp_id, subject, score, total_marks in updates
+    ):
+        analytics.version = version
+    else:
+        analytics_cache.pop(key)
+
+
+def apply_score_update(manager_id, batch_id, emp_id, subject, score, total_marks, version):
+    apply_score_updates(manager_id, batch_id, [(emp_id, subject, score, total_marks)], version)
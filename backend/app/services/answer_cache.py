@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from app.core.cache import LRUCache, invalidation_listeners
+from app.core.config import settings
+from app.core.metrics import chat_answers
+from app.core.revisions import current_revision
+from app.services.llm import stream_completion
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('memory_hit', 'disk_hit', 'coalesced', 'miss')
+
+memory_tier = LRUCache(settings.CHAT_CACHE_MAX_ENTRIES, settings.CHAT_CACHE_TTL_SECONDS)
+in_flight = {}
+
+
+def normalize_query(query):
+    text = re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', query).casefold()).strip()
+    return text.rstrip('?!. ')
+
+
+class DiskTier:
+    # SQLite file shared by every worker on the host; all access goes through one thread.
+    def __init__(self, path, max_entries, ttl_seconds):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-cache')
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS answers (manager_id TEXT, batch_id TEXT, revision INTEGER, query TEXT, '
+                'answer TEXT, created_at REAL, PRIMARY KEY (manager_id, batch_id, revision, query))'
+            )
+            self.conn = conn
+        return self.conn
+
+    def _get(self, key):
+        row = self._connect().execute(
+            'SELECT answer, created_at FROM answers WHERE manager_id = ? AND batch_id = ? AND revision = ? AND query = ?', key
+        ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl_seconds:
+            return None
+        return row[0]
+
+    def _set(self, key, answer):
+        conn = self._connect()
+        with conn:
+            # Answers for older revisions of the batch can never be served again.
+            conn.execute('DELETE FROM answers WHERE manager_id = ? AND batch_id = ? AND revision < ?', key[:3])
+            conn.execute('INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)', (*key, answer, time.time()))
+            excess = conn.execute('SELECT COUNT(*) FROM answers').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM answers WHERE rowid IN (SELECT rowid FROM answers ORDER BY created_at LIMIT ?)', (excess,))
+
+    def _forget(self, manager_id, batch_id):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM answers WHERE manager_id = ? AND batch_id = ?', (manager_id, batch_id))
+
+    def _size(self):
+        return self._connect().execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+
+    async def _run(self, fn, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        except sqlite3.Error as e:
+            # The disk tier is best effort; a locked or corrupt file only costs a cache miss.
+            logger.warning("Chat answer disk cache unavailable: %s", e)
+            return None
+
+    async def get(self, key):
+        return await self._run(self._get, key)
+
+    async def set(self, key, answer):
+        await self._run(self._set, key, answer)
+
+    async def size(self):
+        return await self._run(self._size)
+
+    def forget(self, manager_id, batch_id):
+        self.executor.submit(self._forget, manager_id, batch_id)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+disk_tier = DiskTier(settings.CHAT_CACHE_PATH, settings.CHAT_CACHE_DISK_MAX_ENTRIES, settings.CHAT_CACHE_TTL_SECONDS) if settings.CHAT_CACHE_PATH else None
+
+
+def forget_batch(manager_id, batch_id):
+    for key in [k for k in memory_tier.entries if k[:2] == (manager_id, batch_id)]:
+        memory_tier.pop(key)
+    if disk_tier is not None:
+        disk_tier.forget(manager_id, batch_id)
+
+
+invalidation_listeners.append(forget_batch)
+
+
+class Flight:
+    # One upstream completion; every identical request replays its tokens as they arrive.
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self._wakeup = asyncio.Event()
+
+    def _notify(self):
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def push(self, token):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error=None):
+        self.error = error
+        self.done = True
+        self._notify()
+
+    async def follow(self):
+        index = 0
+        while True:
+            while index < len(self.tokens):
+                index += 1
+                yield self.tokens[index - 1]
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._wakeup.wait()
+
+
+async def _fly(key, flight, build_messages):
+    try:
+        async for token in stream_completion(await build_messages()):
+            flight.push(token)
+        answer = ''.join(flight.tokens)
+        memory_tier.set(key, answer)
+        flight.finish()
+    except asyncio.CancelledError:
+        flight.finish(asyncio.CancelledError())
+        raise
+    except Exception as e:
+        flight.finish(e)
+        return
+    finally:
+        in_flight.pop(key, None)
+    if disk_tier is not None:
+        await disk_tier.set(key, answer)
+
+
+async def _replay(answer):
+    yield answer
+
+
+async def cached_answer(manager_id, batch_id, query, build_messages):
+    # Returns (outcome, token iterator). Keys carry the batch revision, so any write to the batch
+    # makes earlier answers unreachable even when it happened in another worker.
+    key = (manager_id, batch_id, await current_revision(manager_id, batch_id), normalize_query(query))
+    answer = memory_tier.get(key)
+    outcome = 'memory_hit'
+    if answer is None and disk_tier is not None:
+        answer = await disk_tier.get(key)
+        outcome = 'disk_hit'
+        if answer is not None:
+            memory_tier.set(key, answer)
+    if answer is not None:
+        chat_answers.inc(outcome=outcome)
+        return outcome, _replay(answer)
+
+    flight = in_flight.get(key)
+    if flight is not None:
+        outcome = 'coalesced'
+    else:
+        outcome = 'miss'
+        flight = in_flight[key] = Flight()
+        flight.task = asyncio.create_task(_fly(key, flight, build_messages))
+    chat_answers.inc(outcome=outcome)
+    return outcome, flight.follow()
+
+
+async def stats():
+    counts = {outcome: chat_answers.values.get((outcome,), 0) for outcome in OUTCOMES}
+    total = sum(counts.values())
+    return {
+        **counts,
+        'hit_rate': round((total - counts['miss']) / total, 4) if total else 0.0,
+        'in_flight': len(in_flight),
+        'memory_tier': memory_tier.stats(),
+        'disk_entries': await disk_tier.size() if disk_tier is not None else None
+    }
+
+
+async def shutdown():
+    tasks = [flight.task for flight in in_flight.values() if flight.task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if disk_tier is not None:
+        disk_tier.close()
@@ -0,0 +1,59 @@
+from pymongo import UpdateOne
+from app.core.database import scores_collection, subjects_collection
+from app.services.migrations import SCHEMA_VERSION, migrate_batch, new_subject_id
+
+
+class SubjectCatalog:
+    def __init__(self, subjects, exists=True):
+        self.subjects = subjects
+        self.exists = exists
+        self.by_id = {s['id']: s for s in subjects}
+        self.by_name = {s['name']: s for s in subjects}
+
+    def subject_id(self, name):
+        subject = self.by_name.get(name)
+        return subject['id'] if subject else None
+
+    def scores_by_name(self, scores):
+        # Scores under ids of deleted subjects are left in place and simply not surfaced.
+        return {self.by_id[sid]['name']: value for sid, value in (scores or {}).items() if sid in self.by_id}
+
+
+async def load_catalog(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    doc = await subjects_collection.find_one(batch_filter, {'_id': 0, 'list': 1, 'schema_version': 1, 'migrating': 1})
+    if doc is None:
+        # v1 batches could hold scores without ever writing a subjects document.
+        legacy = await scores_collection.find_one({**batch_filter, 'schema_version': {'$ne': SCHEMA_VERSION}}, {'_id': 1})
+        if legacy is None:
+            return SubjectCatalog([], exists=False)
+    if doc is None or doc.get('schema_version') != SCHEMA_VERSION or doc.get('migrating'):
+        await migrate_batch(manager_id, batch_id)
+        doc = await subjects_collection.find_one(batch_filter, {'_id': 0, 'list': 1})
+    return SubjectCatalog(doc.get('list', []))
+
+
+# Adds missing subjects and applies changed totals; `totals` maps name -> total_marks or None.
+async def ensure_subjects(manager_id, batch_id, totals, rev, catalog=None):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    catalog = catalog or await load_catalog(manager_id, batch_id)
+    ops = []
+    if not catalog.exists:
+        ops.append(UpdateOne(batch_filter, {'$setOnInsert': {'list': [], 'schema_version': SCHEMA_VERSION}}, upsert=True))
+    for name, total in totals.items():
+        subject = catalog.by_name.get(name)
+        if subject is None:
+            # The name guard keeps concurrent requests from adding the same subject twice.
+            ops.append(UpdateOne(
+                {**batch_filter, 'list.name': {'$ne': name}},
+                {'$push': {'list': {'id': new_subject_id(), 'name': name, 'total_marks': int(total) if total is not None else 100}}, '$set': {'rev': rev}}
+            ))
+        elif total is not None and subject['total_marks'] != int(total):
+            ops.append(UpdateOne(
+                {**batch_filter, 'list.id': subject['id']},
+                {'$set': {'list.$.total_marks': int(total), 'rev': rev}}
+            ))
+    if not ops:
+        return catalog, False
+    await subjects_collection.bulk_write(ops, ordered=True)
+    return await load_catalog(manager_id, batch_id), True
@@ -0,0 +1,176 @@
+import csv
+import io
+import zipfile
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import interns_collection
+
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_pipeline(manager_id, batch_id):
+    return [
+        {'$match': {'manager_id': manager_id, 'batch_id': batch_id}},
+        {'$lookup': {
+            'from': 'scores',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [
+                {'$match': {'manager_id': manager_id, 'batch_id': batch_id}},
+                {'$project': {'_id': 0, 'scores': 1}}
+            ],
+            'as': 'score_docs'
+        }},
+        {'$project': {
+            '_id': 0, 'Name': 1, 'EmpID': 1, 'Email': 1,
+            'scores': {'$ifNull': [{'$arrayElemAt': ['$score_docs.scores', 0]}, {}]}
+        }}
+    ]
+
+
+def export_columns(subjects_list):
+    subjects = [(s['id'], f"{s['name']} (Total: {s['total_marks']})") for s in subjects_list]
+    return ['Name', 'EmpID', 'Email'] + [header for _, header in subjects], subjects
+
+
+async def row_chunks(manager_id, batch_id, subjects, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    cursor = await interns_collection.aggregate(export_pipeline(manager_id, batch_id), batchSize=chunk_size)
+    chunk = []
+    async for doc in cursor:
+        intern_scores = doc.get('scores', {})
+        chunk.append([doc.get('Name'), doc.get('EmpID'), doc.get('Email')] + [intern_scores.get(subject_id, 0) for subject_id, _ in subjects])
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_csv(manager_id, batch_id, subjects_list):
+    header, subjects = export_columns(subjects_list)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode('utf-8-sig')
+    async for chunk in row_chunks(manager_id, batch_id, subjects):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+
+
+class ByteSink:
+    # Write-only and unseekable: zipfile emits data descriptors and pyarrow writes
+    # forward only, so whatever has been written so far can be sent straight away.
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _excel_writer():
+    from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+    from openpyxl.writer.excel import ExcelWriter
+
+    class StreamedSheetWriter(ExcelWriter):
+        # The sheet's zip entry was written while rows streamed; it is only registered here.
+        def write_worksheet(self, ws):
+            ws._drawing = SpreadsheetDrawing()
+            ws._drawing.charts = ws._charts
+            ws._drawing.images = ws._images
+            if not ws.closed:
+                ws.close()
+            ws._rels = ws._writer._rels
+            self.manifest.append(ws)
+
+    return StreamedSheetWriter
+
+
+async def stream_xlsx(manager_id, batch_id, subjects_list):
+    from openpyxl import Workbook
+    from openpyxl.worksheet._writer import WorksheetWriter
+    header, subjects = export_columns(subjects_list)
+    sink = ByteSink()
+    archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Performance Grid')
+    ws._id = 1
+    sheet = archive.open(ws.path[1:], 'w', force_zip64=True)
+    # The write-only sheet serializes rows into its zip entry instead of openpyxl's temp file.
+    ws._writer = WorksheetWriter(ws, out=sheet)
+    ws._writer.write_top()
+
+    def append_rows(rows):
+        for row in rows:
+            ws.append(row)
+        return sink.drain()
+
+    def finish():
+        ws.close()
+        sheet.close()
+        _excel_writer()(wb, archive).save()
+        return sink.drain()
+
+    ws.append(header)
+    async for chunk in row_chunks(manager_id, batch_id, subjects):
+        # The deflater holds back small outputs, so some chunks add nothing to send yet.
+        data = await run_in_threadpool(append_rows, chunk)
+        if data:
+            yield data
+    yield await run_in_threadpool(finish)
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def stream_parquet(manager_id, batch_id, subjects_list):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    header, subjects = export_columns(subjects_list)
+    schema = pa.schema(
+        [(col, pa.string()) for col in header[:3]] +
+        [(col, pa.float64()) for col in header[3:]]
+    )
+    sink = ByteSink()
+    # Each chunk becomes one row group; the footer follows the last one.
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write_chunk(chunk):
+        columns = list(zip(*chunk))
+        batch = pa.record_batch(
+            [pa.array([None if v is None else str(v) for v in col], pa.string()) for col in columns[:3]] +
+            [pa.array([float(v) for v in col], pa.float64()) for col in columns[3:]],
+            schema=schema
+        )
+        writer.write_batch(batch)
+        return sink.drain()
+
+    def finish():
+        writer.close()
+        return sink.drain()
+
+    async for chunk in row_chunks(manager_id, batch_id, subjects):
+        yield await run_in_threadpool(write_chunk, chunk)
+    yield await run_in_threadpool(finish)
@@ -0,0 +1,251 @@
+import base64
+import json
+import re
+from app.core.config import settings
+from app.core.database import ROW_PROJECTION, interns_collection, scores_collection
+from app.services.catalog import load_catalog
+
+SORT_FIELDS = {'name': 'Name', 'Name': 'Name', 'EmpID': 'EmpID', 'empid': 'EmpID'}
+SCORE_SORT_PREFIX = 'score:'
+# Fields every row keeps regardless of the requested projection; the cursor needs them.
+ALWAYS_FIELDS = ['EmpID', 'Name']
+
+
+class GridQueryError(ValueError):
+    pass
+
+
+class GridQuery:
+    def __init__(self, kind, manager_id, batch_id, limit=None, cursor=None, sort=None, order='asc', q=None, fields=None):
+        self.kind = kind
+        self.manager_id = manager_id
+        self.batch_id = batch_id
+        self.limit = min(max(limit or settings.GRID_PAGE_DEFAULT_LIMIT, 1), settings.GRID_PAGE_MAX_LIMIT)
+        self.sort = sort or 'name'
+        if order not in ('asc', 'desc'):
+            raise GridQueryError("order must be 'asc' or 'desc'")
+        self.direction = 1 if order == 'asc' else -1
+        self.order = order
+        self.q = q
+        self.fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+
+        if self.sort.startswith(SCORE_SORT_PREFIX):
+            self.score_subject = self.sort[len(SCORE_SORT_PREFIX):]
+            if not self.score_subject:
+                raise GridQueryError("score sort needs a subject, e.g. sort=score:SQL")
+            self.sort_field = '_sort'
+        elif self.sort in SORT_FIELDS:
+            self.score_subject = None
+            self.sort_field = SORT_FIELDS[self.sort]
+        else:
+            raise GridQueryError("sort must be 'name', 'EmpID' or 'score:<subject>'")
+        self.after = decode_cursor(cursor, self.sort, self.order) if cursor else None
+
+
+def encode_cursor(sort, order, value, emp_id):
+    raw = json.dumps({'s': sort, 'o': order, 'v': value, 'e': emp_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise GridQueryError("Invalid cursor")
+    if data.get('s') != sort or data.get('o') != order:
+        raise GridQueryError("Cursor was issued for a different sort order")
+    return data.get('v'), data.get('e')
+
+
+def _lookup(collection, as_field, project, manager_id, batch_id):
+    return {'$lookup': {
+        'from': collection,
+        'localField': 'EmpID',
+        'foreignField': 'EmpID',
+        'pipeline': [
+            {'$match': {'manager_id': manager_id, 'batch_id': batch_id}},
+            {'$project': project}
+        ],
+        'as': as_field
+    }}
+
+
+def _keyset_match(query):
+    value, emp_id = query.after
+    op = '$gt' if query.direction == 1 else '$lt'
+    if query.sort_field == 'EmpID':
+        return {'EmpID': {op: emp_id}}
+    if query.score_subject is None:
+        return {'$or': [
+            {query.sort_field: {op: value}},
+            {query.sort_field: value, 'EmpID': {op: emp_id}}
+        ]}
+    # Missing scores are coerced to null and $expr compares in BSON order, so they page consistently.
+    return {'$expr': {'$or': [
+        {op: ['$_sort', value]},
+        {'$and': [{'$eq': ['$_sort', value]}, {op: ['$EmpID', emp_id]}]}
+    ]}}
+
+
+def _row_stages(query):
+    # Joins and projection for the rows of one page, after the page has been chosen.
+    stages = []
+    if query.kind == 'scores':
+        # Scores are keyed by subject id; fetch_page maps them to names for the page.
+        stages.append({'$addFields': {'_scores': {'$ifNull': [{'$arrayElemAt': ['$_score_docs.scores', 0]}, {}]}}})
+    elif query.kind == 'feedback':
+        stages += [
+            _lookup('feedback', '_feedback_docs', {'_id': 0, 'k': {'$ifNull': ['$column', 'General']}, 'v': '$text'}, query.manager_id, query.batch_id),
+            {'$addFields': {'feedbacks': {'$arrayToObject': '$_feedback_docs'}}}
+        ]
+
+    if query.fields:
+        project = {'_id': 0, '_sort': 1, '_scores': 1}
+        for field in ALWAYS_FIELDS + query.fields:
+            if '.' not in field and not field.startswith('$') and field not in ROW_PROJECTION:
+                project[field] = 1
+    else:
+        project = {**ROW_PROJECTION, '_score_docs': 0, '_feedback_docs': 0, '_scored': 0}
+    stages.append({'$project': project})
+    return stages
+
+
+def build_pipeline(query, score_field=None):
+    match = {'manager_id': query.manager_id, 'batch_id': query.batch_id}
+    if query.q:
+        pattern = {'$regex': re.escape(query.q), '$options': 'i'}
+        match['$or'] = [{'Name': pattern}, {'EmpID': pattern}, {'Email': pattern}]
+
+    pipeline = [{'$match': match}]
+    sort = {query.sort_field: query.direction, 'EmpID': query.direction} if query.sort_field != 'EmpID' else {'EmpID': query.direction}
+    score_lookup = _lookup('scores', '_score_docs', {'_id': 0, 'scores': 1}, query.manager_id, query.batch_id)
+
+    if query.score_subject is None:
+        # Keyset, sort and limit run before any join, so they are served by the
+        # (manager_id, batch_id, Name, EmpID) index and the joins touch one page.
+        if query.after:
+            pipeline.append({'$match': _keyset_match(query)})
+        pipeline += [{'$sort': sort}, {'$limit': query.limit + 1}]
+        if query.kind == 'scores':
+            pipeline.append(score_lookup)
+    else:
+        # A score sort with a search term joins the matching interns only; without one,
+        # fetch_page sorts on the scores collection instead.
+        pipeline += [
+            score_lookup,
+            {'$addFields': {'_sort': {'$ifNull': [{'$getField': {
+                'field': score_field,
+                'input': {'$ifNull': [{'$arrayElemAt': ['$_score_docs.scores', 0]}, {}]}
+            }}, None]}}}
+        ]
+        if query.after:
+            pipeline.append({'$match': _keyset_match(query)})
+        pipeline += [{'$sort': sort}, {'$limit': query.limit + 1}]
+    return pipeline + _row_stages(query)
+
+
+def scored_pipeline(query, subject_id, after, limit):
+    # Sorted on the scores collection; interns are joined as the sorted stream is read.
+    field = f'scores.{subject_id}'
+    match = {'manager_id': query.manager_id, 'batch_id': query.batch_id, field: {'$ne': None}}
+    if after:
+        value, emp_id = after
+        op = '$gt' if query.direction == 1 else '$lt'
+        match['$or'] = [{field: {op: value}}, {field: value, 'EmpID': {op: emp_id}}]
+    return [
+        {'$match': match},
+        {'$sort': {field: query.direction, 'EmpID': query.direction}},
+        _lookup('interns', '_intern', {'_id': 0}, query.manager_id, query.batch_id),
+        # Score documents without an intern are dropped before the limit, so the page stays full.
+        {'$unwind': '$_intern'},
+        {'$limit': limit},
+        # Shaped like the score lookup of the other pipelines, so the row stages are shared.
+        {'$replaceRoot': {'newRoot': {'$mergeObjects': ['$_intern', {'_sort': f'${field}', '_score_docs': [{'scores': '$scores'}]}]}}}
+    ] + _row_stages(query)
+
+
+def unscored_pipeline(query, subject_id, after, limit):
+    match = {'manager_id': query.manager_id, 'batch_id': query.batch_id}
+    if after:
+        match['EmpID'] = {'$gt' if query.direction == 1 else '$lt': after[1]}
+    pipeline = [{'$match': match}, {'$sort': {'EmpID': query.direction}}]
+    if subject_id:
+        # Anti-join: each intern read in EmpID order probes the unique (batch, EmpID) index on
+        # scores, and reading stops once the page is full.
+        pipeline += [
+            {'$lookup': {
+                'from': 'scores',
+                'localField': 'EmpID',
+                'foreignField': 'EmpID',
+                'pipeline': [
+                    {'$match': {'manager_id': query.manager_id, 'batch_id': query.batch_id, f'scores.{subject_id}': {'$ne': None}}},
+                    {'$project': {'_id': 1}}
+                ],
+                'as': '_scored'
+            }},
+            {'$match': {'_scored': {'$size': 0}}}
+        ]
+    pipeline += [{'$limit': limit}, {'$addFields': {'_sort': {'$literal': None}}}]
+    if query.kind == 'scores':
+        pipeline.append(_lookup('scores', '_score_docs', {'_id': 0, 'scores': 1}, query.manager_id, query.batch_id))
+    return pipeline + _row_stages(query)
+
+
+async def score_sorted_rows(query, subject_id):
+    # Interns without this score sort as null: ahead of the scored rows ascending, after them
+    # descending, ordered by EmpID. The cursor's value tells which of the two it stopped in.
+    segments = ['unscored', 'scored'] if query.direction == 1 else ['scored', 'unscored']
+    if query.after:
+        segments = segments[segments.index('unscored' if query.after[0] is None else 'scored'):]
+    rows = []
+    for i, segment in enumerate(segments):
+        after = query.after if i == 0 else None
+        limit = query.limit + 1 - len(rows)
+        if segment == 'scored':
+            if subject_id is None:
+                continue
+            collection, pipeline = scores_collection, scored_pipeline(query, subject_id, after, limit)
+        else:
+            collection, pipeline = interns_collection, unscored_pipeline(query, subject_id, after, limit)
+        rows += await (await collection.aggregate(pipeline)).to_list()
+        if len(rows) > query.limit:
+            break
+    return rows
+
+
+async def fetch_page(query):
+    catalog = None
+    if query.kind == 'scores' or query.score_subject:
+        catalog = await load_catalog(query.manager_id, query.batch_id)
+    # An unknown subject sorts every row as missing rather than failing.
+    score_field = (catalog.subject_id(query.score_subject) or query.score_subject) if query.score_subject else None
+    if query.score_subject and not query.q:
+        rows = await score_sorted_rows(query, catalog.subject_id(query.score_subject))
+    else:
+        cursor = await interns_collection.aggregate(build_pipeline(query, score_field))
+        rows = await cursor.to_list()
+    has_more = len(rows) > query.limit
+    rows = rows[:query.limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        value = last.get('_sort') if query.score_subject else last.get(query.sort_field)
+        next_cursor = encode_cursor(query.sort, query.order, value, last['EmpID'])
+    for row in rows:
+        row.pop('_sort', None)
+        if query.kind == 'scores':
+            scores = catalog.scores_by_name(row.pop('_scores', None))
+            if query.fields:
+                scores = {name: value for name, value in scores.items() if name in query.fields}
+            row.update(scores)
+    return {'items': rows, 'next_cursor': next_cursor, 'limit': query.limit}
+
+
+async def paginated_grid(kind, manager_id, batch_id, limit, cursor, sort, order, q, fields):
+    return await fetch_page(GridQuery(kind, manager_id, batch_id, limit, cursor, sort, order, q, fields))
+
+
+def wants_page(*params):
+    return any(p is not None for p in params)
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import invalidate_batch
+from app.core.config import settings
+from app.core.database import import_jobs_collection
+from app.services.ingest import REQUIRED_BIO, IngestSummary, stored_hashes, sync_subjects, write_chunk
+
+logger = logging.getLogger(__name__)
+
+SPOOL_READ_SIZE = 1024 * 1024
+SPOOL_SUFFIX = '.xlsx'
+ACTIVE_STATUSES = ['queued', 'running']
+# Jobs record the process running them, so a restart fails only its own orphans, not other workers' jobs.
+HOSTNAME = socket.gethostname()
+WORKER_ID = f"{HOSTNAME}:{os.getpid()}"
+
+executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix="excel-import")
+job_slots = asyncio.Semaphore(settings.IMPORT_WORKERS)
+running_tasks = {}
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+# Blocking openpyxl read-only reader; only ever called on the import executor.
+class SheetReader:
+    def __init__(self, path):
+        from openpyxl import load_workbook
+        self.workbook = load_workbook(path, read_only=True, data_only=True)
+        sheet = self.workbook.active
+        self.total_rows = max((sheet.max_row or 1) - 1, 0)
+        self.rows = sheet.iter_rows(values_only=True)
+        header = next(self.rows, ())
+        self.header = [str(col).strip() if col is not None else None for col in header]
+        self.row_number = 1
+
+    def read_chunk(self, size):
+        chunk = []
+        for values in self.rows:
+            self.row_number += 1
+            if all(v is None for v in values):
+                continue
+            chunk.append((self.row_number, {col: val for col, val in zip(self.header, values) if col}))
+            if len(chunk) >= size:
+                break
+        return chunk
+
+    def close(self):
+        self.workbook.close()
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+async def spool_upload(upload, job_id):
+    os.makedirs(settings.IMPORT_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_SPOOL_DIR, f"{job_id}{SPOOL_SUFFIX}")
+    with open(path, 'wb') as fh:
+        while True:
+            data = await upload.read(SPOOL_READ_SIZE)
+            if not data:
+                break
+            await run_in_threadpool(fh.write, data)
+    return path
+
+
+async def create_job(manager_id, batch_id, upload, chunk_size=None):
+    job_id = str(ObjectId())
+    path = await spool_upload(upload, job_id)
+    job = {
+        'job_id': job_id,
+        'manager_id': manager_id,
+        'batch_id': batch_id,
+        'filename': upload.filename,
+        'status': 'queued',
+        'rows_total': None,
+        'rows_processed': 0,
+        'summary': IngestSummary().to_dict(),
+        'error': None,
+        'cancel_requested': False,
+        'worker': WORKER_ID,
+        'created_at': _now(),
+        'updated_at': _now(),
+        'finished_at': None
+    }
+    await import_jobs_collection.insert_one(dict(job))
+    task = asyncio.create_task(run_job(job_id, path, manager_id, batch_id, chunk_size or settings.UPLOAD_BULK_CHUNK_SIZE))
+    running_tasks[job_id] = task
+    task.add_done_callback(lambda _: running_tasks.pop(job_id, None))
+    return job
+
+
+def _stored_summary(summary):
+    data = summary.to_dict()
+    data['error_count'] = len(data['errors'])
+    data['errors'] = data['errors'][:settings.IMPORT_MAX_STORED_ERRORS]
+    return data
+
+
+async def _update_job(job_id, fields):
+    fields['updated_at'] = _now()
+    return await import_jobs_collection.find_one_and_update(
+        {'job_id': job_id},
+        {'$set': fields},
+        projection={'_id': 0, 'cancel_requested': 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_job(job_id, path, manager_id, batch_id, chunk_size):
+    loop = asyncio.get_running_loop()
+    summary = IngestSummary()
+    reader = None
+    try:
+        async with job_slots:
+            job = await _update_job(job_id, {'status': 'running'})
+            if job and job.get('cancel_requested'):
+                raise ImportCancelled()
+
+            reader = await loop.run_in_executor(executor, SheetReader, path)
+            if not all(col in reader.header for col in REQUIRED_BIO):
+                raise ValueError(f"Excel must at least contain: {REQUIRED_BIO}")
+            await _update_job(job_id, {'rows_total': reader.total_rows})
+
+            subject_columns = await sync_subjects(manager_id, batch_id, [col for col in reader.header if col])
+            stored = await stored_hashes(manager_id, batch_id)
+            invalidate_batch(manager_id, batch_id)
+            while True:
+                chunk = await loop.run_in_executor(executor, reader.read_chunk, chunk_size)
+                if not chunk:
+                    break
+                await write_chunk(chunk, manager_id, batch_id, subject_columns, summary, stored)
+                invalidate_batch(manager_id, batch_id)
+                job = await _update_job(job_id, {'rows_processed': summary.rows, 'summary': _stored_summary(summary)})
+                if job and job.get('cancel_requested'):
+                    raise ImportCancelled()
+
+            summary.finish_diff(stored)
+
+        await _update_job(job_id, {'status': 'completed', 'rows_processed': summary.rows, 'summary': _stored_summary(summary), 'finished_at': _now()})
+    except (ImportCancelled, asyncio.CancelledError):
+        await _update_job(job_id, {'status': 'cancelled', 'rows_processed': summary.rows, 'summary': _stored_summary(summary), 'finished_at': _now()})
+    except Exception as e:
+        await _update_job(job_id, {'status': 'failed', 'error': str(e), 'rows_processed': summary.rows, 'summary': _stored_summary(summary), 'finished_at': _now()})
+    finally:
+        if reader:
+            await loop.run_in_executor(executor, reader.close)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def get_job(job_id):
+    return await import_jobs_collection.find_one({'job_id': job_id}, {'_id': 0})
+
+
+async def list_jobs(manager_id, batch_id=None, limit=20):
+    query = {'manager_id': manager_id}
+    if batch_id:
+        query['batch_id'] = batch_id
+    return await import_jobs_collection.find(query, {'_id': 0}).sort('created_at', -1).limit(limit).to_list()
+
+
+async def cancel_job(job_id):
+    job = await import_jobs_collection.find_one_and_update(
+        {'job_id': job_id, 'status': {'$in': ACTIVE_STATUSES}},
+        {'$set': {'cancel_requested': True, 'updated_at': _now()}},
+        projection={'_id': 0},
+        return_document=ReturnDocument.AFTER
+    )
+    return job
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _orphaned(job, stale_before):
+    host, _, pid = (job.get('worker') or '').rpartition(':')
+    if host == HOSTNAME and pid.isdigit():
+        # Our own pid can only be a previous process's: this one has not started any job yet.
+        return int(pid) == os.getpid() or not _pid_alive(int(pid))
+    # Jobs from other hosts (or from before workers were recorded) are judged by their last progress update.
+    return (job.get('updated_at') or '') < stale_before
+
+
+async def reconcile_jobs():
+    # Runs at startup: jobs left queued or running by a process that died are failed, and their
+    # spool files, like any spool file no active job owns, are removed.
+    stale_before = datetime.fromtimestamp(time.time() - settings.IMPORT_STALE_JOB_SECONDS).isoformat()
+    jobs = await import_jobs_collection.find(
+        {'status': {'$in': ACTIVE_STATUSES}}, {'_id': 0, 'job_id': 1, 'worker': 1, 'updated_at': 1}
+    ).to_list()
+    orphaned = [job['job_id'] for job in jobs if _orphaned(job, stale_before)]
+    if orphaned:
+        await import_jobs_collection.update_many(
+            {'job_id': {'$in': orphaned}, 'status': {'$in': ACTIVE_STATUSES}},
+            {'$set': {'status': 'failed', 'error': 'Interrupted by a server restart', 'finished_at': _now(), 'updated_at': _now()}}
+        )
+        logger.warning("Marked %d interrupted import jobs as failed", len(orphaned))
+    active = {job['job_id'] for job in jobs} - set(orphaned)
+    spooled = await run_in_threadpool(_spool_files)
+    finished = set(await import_jobs_collection.distinct(
+        'job_id', {'job_id': {'$in': list(spooled)}, 'status': {'$nin': ACTIVE_STATUSES}}
+    )) if spooled else set()
+    await run_in_threadpool(_clear_spool, spooled, active, finished, time.time() - settings.IMPORT_STALE_JOB_SECONDS)
+
+
+def _spool_files():
+    if not os.path.isdir(settings.IMPORT_SPOOL_DIR):
+        return {}
+    return {
+        name[:-len(SPOOL_SUFFIX)]: os.path.join(settings.IMPORT_SPOOL_DIR, name)
+        for name in os.listdir(settings.IMPORT_SPOOL_DIR) if name.endswith(SPOOL_SUFFIX)
+    }
+
+
+def _clear_spool(spooled, active, finished, stale_before):
+    for job_id, path in spooled.items():
+        if job_id in active:
+            continue
+        try:
+            # A file with no job yet may still be spooling on another worker, so only stale ones go.
+            if job_id in finished or os.path.getmtime(path) < stale_before:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+async def shutdown():
+    tasks = list(running_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import math
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import interns_collection, scores_collection
+from app.core.revisions import batch_revision
+from app.services.catalog import SCHEMA_VERSION, load_catalog, ensure_subjects
+from app.services.live import publish, sync_event
+
+REQUIRED_BIO = ['Name', 'Email', 'EmpID']
+RESERVED_COLUMNS = {'manager_id', 'batch_id'}
+MAX_REPORTED_MISSING = 100
+
+
+class IngestSummary:
+    def __init__(self):
+        self.rows = 0
+        self.interns = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        self.scores = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        self.errors = []
+        self.diff = {'added': 0, 'changed': 0, 'unchanged': 0, 'missing': 0, 'missing_emp_ids': []}
+        self.seen_emp_ids = set()
+        # EmpID -> first valid row carrying it, so a repeated EmpID is classified and written once.
+        self.emp_rows = {}
+
+    def add_result(self, counts, result):
+        counts['inserted'] += result['nUpserted']
+        counts['updated'] += result['nModified']
+        counts['unchanged'] += result['nMatched'] - result['nModified']
+
+    def finish_diff(self, stored):
+        missing = sorted(set(stored) - self.seen_emp_ids)
+        self.diff['missing'] = len(missing)
+        self.diff['missing_emp_ids'] = missing[:MAX_REPORTED_MISSING]
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'interns': self.interns,
+            'scores': self.scores,
+            'diff': self.diff,
+            'errors': self.errors
+        }
+
+
+def parse_subject_column(col):
+    stripped = str(col).strip()
+    clean_name = stripped.split('(')[0].strip()
+    total = 100
+    if '(' in stripped and 'Total' in stripped:
+        try: total = int(stripped.split(':')[-1].replace(')', '').strip())
+        except ValueError: total = 100
+    return clean_name, total
+
+
+def subject_column_totals(columns):
+    subject_columns = {}
+    totals = {}
+    for col in columns:
+        stripped = str(col).strip()
+        if stripped in REQUIRED_BIO or stripped in RESERVED_COLUMNS:
+            continue
+        clean_name, total = parse_subject_column(col)
+        subject_columns[col] = clean_name
+        totals.setdefault(clean_name, total)
+    return subject_columns, totals
+
+
+async def sync_subjects(manager_id, batch_id, columns):
+    subject_columns, totals = subject_column_totals(columns)
+    catalog = await load_catalog(manager_id, batch_id)
+    # Uploads only add subjects; totals of existing subjects are left as the manager set them.
+    missing = {name: total for name, total in totals.items() if name not in catalog.by_name}
+    if missing or not catalog.exists:
+        async with batch_revision(manager_id, batch_id) as rev:
+            catalog, _ = await ensure_subjects(manager_id, batch_id, missing, rev, catalog)
+        publish(manager_id, batch_id, [sync_event(rev)])
+    return {col: catalog.subject_id(name) for col, name in subject_columns.items()}
+
+
+def is_missing(val):
+    return val is None or (isinstance(val, float) and math.isnan(val)) or str(val).strip() == ''
+
+
+def score_value(val):
+    if val is None or not (isinstance(val, (int, float)) or hasattr(val, '__int__')):
+        return None
+    try:
+        val = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(val) else val
+
+
+def row_hashes(chunk, subject_columns):
+    # One vectorized pass per chunk: (EmpID, bio hash, score-vector hash) for every row.
+    # The score hash is None when the row carries no scores, since nothing is written then.
+    import pandas as pd
+    frame = pd.DataFrame.from_records([row for _, row in chunk])
+
+    def text(col):
+        return frame[col].astype(str).str.strip() if col in frame else pd.Series('', index=frame.index)
+
+    emp_ids = text('EmpID')
+    bio_hashes = pd.util.hash_pandas_object(pd.DataFrame({'Name': text('Name'), 'Email': text('Email')}), index=False)
+    columns = {sid: col for col, sid in subject_columns.items()}
+    score_hashes = [None] * len(frame)
+    if columns:
+        subject_ids = sorted(columns)
+        scores = pd.DataFrame({
+            sid: pd.to_numeric(frame[columns[sid]], errors='coerce') if columns[sid] in frame else float('nan')
+            for sid in subject_ids
+        }, index=frame.index).astype('float64')
+        # Column names are not part of hash_pandas_object, so the subject layout is hashed separately.
+        layout = hashlib.sha1(','.join(subject_ids).encode()).hexdigest()[:8]
+        hashed = pd.util.hash_pandas_object(scores, index=False)
+        present = scores.notna().any(axis=1)
+        score_hashes = [f'{layout}-{h:016x}' if p else None for h, p in zip(hashed.tolist(), present.tolist())]
+    return [(emp_id, f'{h:016x}', s) for emp_id, h, s in zip(emp_ids.tolist(), bio_hashes.tolist(), score_hashes)]
+
+
+async def stored_hashes(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    cursor = await interns_collection.aggregate([
+        {'$match': batch_filter},
+        {'$lookup': {
+            'from': 'scores',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [{'$match': batch_filter}, {'$project': {'_id': 0, 'scores_hash': 1}}],
+            'as': 'score_docs'
+        }},
+        {'$project': {'_id': 0, 'EmpID': 1, 'bio_hash': 1, 'scores_hash': {'$arrayElemAt': ['$score_docs.scores_hash', 0]}}}
+    ])
+    return {doc['EmpID']: (doc.get('bio_hash'), doc.get('scores_hash')) async for doc in cursor}
+
+
+def missing_bio(row):
+    return [col for col in REQUIRED_BIO if is_missing(row.get(col))]
+
+
+def build_row_ops(row, manager_id, batch_id, subject_columns, rev, bio_hash=None, scores_hash=None):
+    missing = missing_bio(row)
+    if missing:
+        raise ValueError(f"Missing required values: {missing}")
+
+    emp_id = str(row['EmpID']).strip()
+    key = {'EmpID': emp_id, 'manager_id': manager_id, 'batch_id': batch_id}
+    intern_bio = {
+        'Name': str(row['Name']).strip(),
+        'Email': str(row['Email']).strip(),
+        'bio_hash': bio_hash,
+        'rev': rev,
+        **key
+    }
+    intern_op = UpdateOne(key, {'$set': intern_bio}, upsert=True)
+
+    scores_to_save = {}
+    for col, subject_id in subject_columns.items():
+        val = score_value(row.get(col))
+        if val is not None:
+            scores_to_save[f"scores.{subject_id}"] = val
+    score_op = UpdateOne(key, {'$set': {**scores_to_save, 'scores_hash': scores_hash, 'schema_version': SCHEMA_VERSION, 'rev': rev}}, upsert=True) if scores_to_save else None
+    return intern_op, score_op
+
+
+async def _bulk_write(collection, ops, row_numbers, counts, summary):
+    if not ops:
+        return
+    try:
+        result = await collection.bulk_write(ops, ordered=False)
+        summary.add_result(counts, result.bulk_api_result)
+    except BulkWriteError as e:
+        summary.add_result(counts, e.details)
+        for err in e.details.get('writeErrors', []):
+            summary.errors.append({'row': row_numbers[err['index']], 'error': err.get('errmsg', 'Write failed')})
+
+
+def classify_row(summary, previous, bio_hash, scores_hash):
+    # Returns whether the bio and the scores still need writing.
+    if previous is None:
+        summary.diff['added'] += 1
+        return True, True
+    bio_same, scores_same = previous[0] == bio_hash, previous[1] == scores_hash
+    summary.diff['unchanged' if bio_same and scores_same else 'changed'] += 1
+    if bio_same:
+        summary.interns['unchanged'] += 1
+    if scores_same and scores_hash is not None:
+        summary.scores['unchanged'] += 1
+    return not bio_same, not scores_same
+
+
+async def write_chunk(chunk, manager_id, batch_id, subject_columns, summary, stored=None):
+    hashes = await run_in_threadpool(row_hashes, chunk, subject_columns)
+    pending = []
+    for (row_number, row), (emp_id, bio_hash, scores_hash) in zip(chunk, hashes):
+        summary.rows += 1
+        if not is_missing(row.get('EmpID')):
+            summary.seen_emp_ids.add(emp_id)
+        missing = missing_bio(row)
+        if missing:
+            summary.errors.append({'row': row_number, 'error': f"Missing required values: {missing}"})
+            continue
+        if emp_id in summary.emp_rows:
+            summary.errors.append({'row': row_number, 'error': f"Duplicate EmpID {emp_id}; row {summary.emp_rows[emp_id]} is used"})
+            continue
+        summary.emp_rows[emp_id] = row_number
+        write_bio, write_scores = classify_row(summary, stored.get(emp_id), bio_hash, scores_hash) if stored is not None else (True, True)
+        if write_bio or write_scores:
+            pending.append((row_number, row, bio_hash, scores_hash, write_bio, write_scores))
+    # Re-uploading an unchanged chunk neither takes a revision nor wakes live clients.
+    if not pending:
+        return
+
+    async with batch_revision(manager_id, batch_id) as rev:
+        intern_ops, intern_rows = [], []
+        score_ops, score_rows = [], []
+        for row_number, row, bio_hash, scores_hash, write_bio, write_scores in pending:
+            intern_op, score_op = build_row_ops(row, manager_id, batch_id, subject_columns, rev, bio_hash, scores_hash)
+            if write_bio:
+                intern_ops.append(intern_op)
+                intern_rows.append(row_number)
+            if write_scores and score_op:
+                score_ops.append(score_op)
+                score_rows.append(row_number)
+
+        await asyncio.gather(
+            _bulk_write(interns_collection, intern_ops, intern_rows, summary.interns, summary),
+            _bulk_write(scores_collection, score_ops, score_rows, summary.scores, summary)
+        )
+    publish(manager_id, batch_id, [sync_event(rev)])
+
+
+async def ingest_rows(rows, manager_id, batch_id, subject_columns, chunk_size=None):
+    chunk_size = chunk_size or settings.UPLOAD_BULK_CHUNK_SIZE
+    summary = IngestSummary()
+    stored = await stored_hashes(manager_id, batch_id)
+    chunk = []
+    for row_number, row in rows:
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            await write_chunk(chunk, manager_id, batch_id, subject_columns, summary, stored)
+            chunk = []
+    if chunk:
+        await write_chunk(chunk, manager_id, batch_id, subject_columns, summary, stored)
+    summary.finish_diff(stored)
+    return summary
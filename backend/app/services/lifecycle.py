@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne
+from pymongo.errors import BulkWriteError
+from app.core.cache import invalidate_batch
+from app.core.database import (
+    BATCH_DATA_KEYS, archive_collections, batches_collection, db, feedback_collection, feedback_columns_collection,
+    interns_collection, run_in_transaction, scores_collection, summaries_collection, tombstones_collection
+)
+from app.core.revisions import add_tombstones, batch_revision
+from app.services.catalog import ensure_subjects, load_catalog
+from app.services.live import publish, sync_event
+
+# Content hashes are dropped from moved rows; the next upload into the target batch rewrites them once.
+HASH_FIELDS = ('bio_hash', 'scores_hash')
+DUPLICATE_KEY = 11000
+
+
+class BatchNotFoundError(LookupError):
+    pass
+
+
+class BatchStateError(ValueError):
+    pass
+
+
+async def get_batch(manager_id, batch_id):
+    batch = await batches_collection.find_one({'manager_id': manager_id, 'batch_id': batch_id}, {'_id': 0})
+    if batch is None:
+        raise BatchNotFoundError(f"Batch {batch_id} not found")
+    return batch
+
+
+async def active_batch(manager_id, batch_id):
+    batch = await get_batch(manager_id, batch_id)
+    if batch.get('archived'):
+        raise BatchStateError(f"Batch {batch_id} is archived; restore it first")
+    return batch
+
+
+def copy_pipeline(manager_id, batch_id, name, into, overrides=None, when_matched='replace'):
+    # Copies one collection's documents for a batch into `into`, matched on the batch key of `name`.
+    stages = [{'$match': {'manager_id': manager_id, 'batch_id': batch_id}}, {'$project': {'_id': 0}}]
+    if overrides:
+        stages.append({'$set': {field: {'$literal': value} for field, value in overrides.items()}})
+    return stages + [{'$merge': {'into': into, 'on': BATCH_DATA_KEYS[name], 'whenMatched': when_matched, 'whenNotMatched': 'insert'}}]
+
+
+async def _merge(collection, pipeline):
+    cursor = await collection.aggregate(pipeline)
+    await cursor.to_list()
+
+
+def _notify(manager_id, revisions):
+    for batch_id, rev in revisions.items():
+        invalidate_batch(manager_id, batch_id)
+        publish(manager_id, batch_id, [sync_event(rev)])
+
+
+async def clone_batch(manager_id, batch_id, name=None):
+    source = await active_batch(manager_id, batch_id)
+    # Migrates a v1 catalog first, so the new cohort starts on the current schema.
+    await load_catalog(manager_id, batch_id)
+    new_id = str(ObjectId())
+    name = name or f"{source.get('name')} (copy)"
+    await asyncio.gather(*(
+        _merge(db[collection], copy_pipeline(manager_id, batch_id, collection, collection, {'batch_id': new_id, 'rev': 0}))
+        for collection in ('subjects', 'feedback_columns')
+    ))
+    # The batch is listed only once its catalog is in place.
+    await batches_collection.insert_one({'batch_id': new_id, 'manager_id': manager_id, 'name': name, 'cloned_from': batch_id})
+    return {'batch_id': new_id, 'name': name, 'cloned_from': batch_id}
+
+
+def _relocate(doc, batch_id, rev, **fields):
+    doc = {key: value for key, value in doc.items() if key not in HASH_FIELDS}
+    return {**doc, 'batch_id': batch_id, 'rev': rev, **fields}
+
+
+async def move_interns(manager_id, batch_id, target_batch_id, emp_ids):
+    if batch_id == target_batch_id:
+        raise BatchStateError("Source and target batch are the same")
+    await asyncio.gather(active_batch(manager_id, batch_id), active_batch(manager_id, target_batch_id))
+    # Catalogs load (and migrate v1 batches) before any score is read.
+    source_catalog, target_catalog = await asyncio.gather(load_catalog(manager_id, batch_id), load_catalog(manager_id, target_batch_id))
+
+    emp_ids = list(dict.fromkeys(emp_ids))
+    interns, taken = await asyncio.gather(
+        interns_collection.find({'manager_id': manager_id, 'batch_id': batch_id, 'EmpID': {'$in': emp_ids}}, {'_id': 0}).to_list(),
+        interns_collection.distinct('EmpID', {'manager_id': manager_id, 'batch_id': target_batch_id, 'EmpID': {'$in': emp_ids}})
+    )
+    moved = [doc['EmpID'] for doc in interns]
+    found = set(moved)
+    missing = [emp_id for emp_id in emp_ids if emp_id not in found]
+    conflicts = sorted(found.intersection(taken))
+    if conflicts:
+        raise BatchStateError(f"{len(conflicts)} interns already exist in the target batch: {', '.join(conflicts[:20])}")
+    if not moved:
+        return {'moved': 0, 'missing': missing, 'target_batch_id': target_batch_id}
+
+    moved_filter = {'manager_id': manager_id, 'batch_id': batch_id, 'EmpID': {'$in': moved}}
+    scores, feedback = await asyncio.gather(
+        scores_collection.find(moved_filter, {'_id': 0}).to_list(),
+        feedback_collection.find(moved_filter, {'_id': 0}).to_list()
+    )
+    async with batch_revision(manager_id, batch_id) as source_rev, batch_revision(manager_id, target_batch_id) as target_rev:
+        # Subjects the target lacks are added with their source totals; the target's own totals are kept.
+        names = {source_catalog.by_id[sid]['name'] for doc in scores for sid in doc.get('scores') or {} if sid in source_catalog.by_id}
+        totals = {name: None if name in target_catalog.by_name else source_catalog.by_name[name]['total_marks'] for name in names}
+        target_catalog, _ = await ensure_subjects(manager_id, target_batch_id, totals, target_rev, target_catalog)
+        columns = sorted({doc['column'] for doc in feedback})
+
+        def remap(scores_by_id):
+            # Scores under deleted source subjects are left behind.
+            return {
+                target_catalog.subject_id(source_catalog.by_id[sid]['name']): value
+                for sid, value in (scores_by_id or {}).items() if sid in source_catalog.by_id
+            }
+
+        async def write(session):
+            plan = [
+                (interns_collection, [_relocate(doc, target_batch_id, target_rev) for doc in interns]),
+                (scores_collection, [_relocate(doc, target_batch_id, target_rev, scores=remap(doc.get('scores'))) for doc in scores]),
+                (feedback_collection, [_relocate(doc, target_batch_id, target_rev) for doc in feedback])
+            ]
+            for collection, docs in plan:
+                # Ordered, so a duplicate in the target stops before the source rows are removed.
+                await collection.bulk_write([InsertOne(doc) for doc in docs] + [DeleteMany(moved_filter)], ordered=True, session=session)
+            if columns:
+                await feedback_columns_collection.update_one(
+                    {'manager_id': manager_id, 'batch_id': target_batch_id},
+                    {'$addToSet': {'list': {'$each': columns}}, '$set': {'rev': target_rev}},
+                    upsert=True, session=session
+                )
+            await add_tombstones(manager_id, batch_id, source_rev, 'interns', moved, session=session)
+
+        try:
+            await run_in_transaction(write)
+        except BulkWriteError as e:
+            if any(error.get('code') == DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+                raise BatchStateError("An intern being moved was added to the target batch meanwhile")
+            raise
+    _notify(manager_id, {batch_id: source_rev, target_batch_id: target_rev})
+    return {'moved': len(moved), 'missing': missing, 'target_batch_id': target_batch_id}
+
+
+async def archive_batch(manager_id, batch_id):
+    await active_batch(manager_id, batch_id)
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    async with batch_revision(manager_id, batch_id) as rev:
+        # $merge cannot run inside a transaction, so the copy comes first; it is idempotent, so an
+        # interrupted archive can just be repeated.
+        await asyncio.gather(*(
+            _merge(db[name], copy_pipeline(manager_id, batch_id, name, cold.name)) for name, cold in archive_collections.items()
+        ))
+        # Only rows whose archived copy has the same key and revision are removed. A write that lands
+        # after the copy changes the row's rev (or creates a new row), so that row stays hot instead of
+        # being lost, and restore keeps it over the older copy.
+        copies = await asyncio.gather(*(
+            cold.find(batch_filter, {'_id': 0, 'rev': 1, **{field: 1 for field in BATCH_DATA_KEYS[name]}}).to_list()
+            for name, cold in archive_collections.items()
+        ))
+        deletes = {
+            name: [DeleteOne({**{field: doc.get(field) for field in BATCH_DATA_KEYS[name]}, 'rev': doc.get('rev')}) for doc in docs]
+            for name, docs in zip(archive_collections, copies)
+        }
+
+        async def purge(session):
+            counts = {}
+            for name, ops in deletes.items():
+                counts[name] = (await db[name].bulk_write(ops, ordered=False, session=session)).deleted_count if ops else 0
+            await tombstones_collection.delete_many(batch_filter, session=session)
+            await summaries_collection.delete_one(batch_filter, session=session)
+            await batches_collection.update_one(batch_filter, {'$set': {'archived': True, 'archived_at': datetime.now().isoformat()}}, session=session)
+            return counts
+
+        counts = await run_in_transaction(purge)
+    _notify(manager_id, {batch_id: rev})
+    return {'batch_id': batch_id, 'archived': counts}
+
+
+async def restore_batch(manager_id, batch_id):
+    batch = await get_batch(manager_id, batch_id)
+    if not batch.get('archived'):
+        raise BatchStateError(f"Batch {batch_id} is not archived")
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    async with batch_revision(manager_id, batch_id) as rev:
+        # Restored rows carry this revision, so clients polling with `since` pick them up. Rows written
+        # to the batch while it was archived are kept over their archived copies.
+        await asyncio.gather(*(
+            _merge(cold, copy_pipeline(manager_id, batch_id, name, name, {'rev': rev}, when_matched='keepExisting'))
+            for name, cold in archive_collections.items()
+        ))
+
+        async def purge(session):
+            counts = {}
+            for name, cold in archive_collections.items():
+                counts[name] = (await cold.delete_many(batch_filter, session=session)).deleted_count
+            await batches_collection.update_one(batch_filter, {'$unset': {'archived': "", 'archived_at': ""}}, session=session)
+            return counts
+
+        counts = await run_in_transaction(purge)
+    _notify(manager_id, {batch_id: rev})
+    return {'batch_id': batch_id, 'restored': counts}
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from pymongo.errors import OperationFailure, PyMongoError
+from app.core.config import settings
+from app.core.database import db
+from app.services.catalog import load_catalog
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ['interns', 'scores', 'feedback', 'subjects', 'feedback_columns', 'tombstones']
+# Raised by servers that are not replica set members, where $changeStream is unavailable.
+CHANGE_STREAM_UNSUPPORTED = {40573, 136}
+
+
+def score_event(emp_id, subject, score, rev):
+    return {'type': 'score', 'EmpID': emp_id, 'subject': subject, 'score': score, 'rev': rev}
+
+
+def feedback_event(emp_id, column, text, rev):
+    return {'type': 'feedback', 'EmpID': emp_id, 'column': column, 'text': text, 'rev': rev}
+
+
+def intern_event(doc, rev):
+    return {'type': 'intern', 'EmpID': doc['EmpID'], 'Name': doc.get('Name'), 'Email': doc.get('Email'), 'rev': rev}
+
+
+def deleted_event(kind, key, rev):
+    return {'type': 'deleted', 'kind': kind, 'key': key, 'rev': rev}
+
+
+def list_event(kind, items, rev):
+    return {'type': kind, 'list': items, 'rev': rev}
+
+
+def sync_event(rev):
+    # Coarse changes (imports, renames) tell clients to pull /api/scores?since= instead of
+    # pushing every affected cell.
+    return {'type': 'sync', 'rev': rev}
+
+
+def change_events(change, subject_names):
+    doc = change.get('fullDocument')
+    if not doc:
+        return []
+    coll = change['ns']['coll']
+    rev = doc.get('rev')
+    updated = None
+    if change['operationType'] == 'update':
+        updated = change.get('updateDescription', {}).get('updatedFields', {})
+
+    if coll == 'scores':
+        scores = doc.get('scores', {})
+        if updated is None or 'scores' in updated:
+            subject_ids = list(scores)
+        else:
+            subject_ids = [field.split('.', 1)[1] for field in updated if field.startswith('scores.')]
+        return [
+            score_event(doc['EmpID'], subject_names[sid], scores.get(sid), rev)
+            for sid in subject_ids if sid in subject_names
+        ]
+    if coll == 'feedback':
+        return [feedback_event(doc['EmpID'], doc.get('column', 'General'), doc.get('text'), rev)]
+    if coll == 'interns':
+        return [intern_event(doc, rev)]
+    if coll in ('subjects', 'feedback_columns'):
+        return [list_event(coll, doc.get('list', []), rev)]
+    if coll == 'tombstones':
+        return [deleted_event(doc['kind'], doc['key'], rev)]
+    return []
+
+
+class Subscriber:
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog instead of blocking the fan-out, and tell it to
+            # catch up through the delta endpoint from the last revision it applied.
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'lagged'})
+
+
+class BatchChannel:
+    def __init__(self, hub, manager_id, batch_id):
+        self.hub = hub
+        self.manager_id = manager_id
+        self.batch_id = batch_id
+        self.subscribers = set()
+        self.streaming = False
+        self.resume_token = None
+        self.subject_names = {}
+        self.watcher = None
+
+    def broadcast(self, events):
+        for event in events:
+            for subscriber in list(self.subscribers):
+                subscriber.offer(event)
+
+    def start(self):
+        if self.watcher is None and self.hub.change_streams:
+            self.watcher = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+            try:
+                await self.watcher
+            except asyncio.CancelledError:
+                pass
+            self.watcher = None
+        self.streaming = False
+
+    async def watch(self):
+        pipeline = [{'$match': {
+            'operationType': {'$in': ['insert', 'update', 'replace']},
+            'ns.coll': {'$in': WATCHED_COLLECTIONS},
+            'fullDocument.manager_id': self.manager_id,
+            'fullDocument.batch_id': self.batch_id
+        }}]
+        while self.subscribers:
+            try:
+                catalog = await load_catalog(self.manager_id, self.batch_id)
+                self.subject_names = {sid: s['name'] for sid, s in catalog.by_id.items()}
+                async with await db.watch(pipeline, full_document='updateLookup', resume_after=self.resume_token) as stream:
+                    self.streaming = True
+                    async for change in stream:
+                        self.resume_token = stream.resume_token
+                        if change['ns']['coll'] == 'subjects' and change.get('fullDocument'):
+                            self.subject_names = {s['id']: s['name'] for s in change['fullDocument'].get('list', [])}
+                        self.broadcast(change_events(change, self.subject_names))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams unavailable (%s); live updates use the in-process bus", e)
+                    self.hub.change_streams = False
+                    self.streaming = False
+                    return
+                logger.warning("Change stream for %s/%s failed: %s", self.manager_id, self.batch_id, e)
+                self.resume_token = None
+            except PyMongoError as e:
+                logger.warning("Change stream for %s/%s failed: %s", self.manager_id, self.batch_id, e)
+            # Writes published while the stream is down still reach clients through the bus.
+            self.streaming = False
+            await asyncio.sleep(settings.LIVE_RETRY_SECONDS)
+
+
+class LiveHub:
+    def __init__(self):
+        self.channels = {}
+        self.change_streams = settings.LIVE_CHANGE_STREAMS
+
+    def subscribe(self, manager_id, batch_id):
+        key = (manager_id, batch_id)
+        channel = self.channels.get(key)
+        if channel is None:
+            channel = self.channels[key] = BatchChannel(self, manager_id, batch_id)
+        subscriber = Subscriber(settings.LIVE_QUEUE_SIZE)
+        channel.subscribers.add(subscriber)
+        channel.start()
+        return subscriber
+
+    async def unsubscribe(self, manager_id, batch_id, subscriber):
+        key = (manager_id, batch_id)
+        channel = self.channels.get(key)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            del self.channels[key]
+            await channel.stop()
+
+    def publish(self, manager_id, batch_id, events):
+        channel = self.channels.get((manager_id, batch_id))
+        if channel is not None and not channel.streaming:
+            channel.broadcast(events)
+
+    def stats(self):
+        return {
+            'change_streams': self.change_streams,
+            'channels': [
+                {
+                    'manager_id': channel.manager_id,
+                    'batch_id': channel.batch_id,
+                    'subscribers': len(channel.subscribers),
+                    'streaming': channel.streaming,
+                    'dropped_events': sum(s.dropped for s in channel.subscribers)
+                }
+                for channel in self.channels.values()
+            ]
+        }
+
+    async def shutdown(self):
+        channels = list(self.channels.values())
+        self.channels.clear()
+        await asyncio.gather(*(channel.stop() for channel in channels))
+
+
+hub = LiveHub()
+
+
+def publish(manager_id, batch_id, events):
+    hub.publish(manager_id, batch_id, events)
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from app.core.config import settings
+from app.core.metrics import llm_first_token, record_llm_call
+
+_client = None
+_limiter = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+
+class LLMBusyError(Exception):
+    pass
+
+
+def get_client():
+    global _client
+    if _client is None:
+        from groq import AsyncGroq
+        _client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=1
+        )
+    return _client
+
+
+@asynccontextmanager
+async def upstream_slot():
+    try:
+        await asyncio.wait_for(_limiter.acquire(), settings.LLM_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise LLMBusyError("Assistant is busy, please retry shortly")
+    try:
+        yield
+    finally:
+        _limiter.release()
+
+
+async def stream_completion(messages):
+    async with upstream_slot():
+        started = time.perf_counter()
+        first_token = True
+        outcome = 'error'
+        try:
+            async with asyncio.timeout(settings.LLM_TIMEOUT_SECONDS):
+                stream = await get_client().chat.completions.create(model=settings.LLM_MODEL, messages=messages, stream=True)
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        if first_token:
+                            llm_first_token.observe(time.perf_counter() - started)
+                            first_token = False
+                        yield token
+            outcome = 'ok'
+        finally:
+            record_llm_call('stream', time.perf_counter() - started, outcome)
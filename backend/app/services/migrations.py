@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import sys
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import scores_collection, subjects_collection
+
+logger = logging.getLogger(__name__)
+
+# v1: subjects as bare strings or {name, total_marks} under `list`/`subjects`, scores keyed by name.
+# v2: subjects as {id, name, total_marks} under `list`, scores keyed by subject id.
+SCHEMA_VERSION = 2
+PENDING = {'$or': [{'schema_version': {'$ne': SCHEMA_VERSION}}, {'migrating': True}]}
+
+
+def new_subject_id():
+    return str(ObjectId())
+
+
+def legacy_subjects(doc):
+    subjects = []
+    seen = set()
+    raw_list = (doc.get('list') or doc.get('subjects') or []) if doc else []
+    for item in raw_list:
+        if isinstance(item, dict):
+            name, total = str(item.get('name')), item.get('total_marks', 100)
+        else:
+            name, total = str(item), 100
+        if name in seen:
+            continue
+        seen.add(name)
+        subjects.append({'id': item.get('id') if isinstance(item, dict) and item.get('id') else new_subject_id(), 'name': name, 'total_marks': total})
+    return subjects
+
+
+def flatten_legacy_scores(scores, prefix=''):
+    # v1 wrote `scores.<name>`, so a name with dots ended up as nested documents.
+    flat = {}
+    for key, value in (scores or {}).items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten_legacy_scores(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+
+async def _claim_subjects(batch_filter):
+    doc = await subjects_collection.find_one(batch_filter)
+    if doc and doc.get('schema_version') == SCHEMA_VERSION:
+        return doc
+    try:
+        # Only one migrator converts the list, so concurrent callers agree on subject ids.
+        await subjects_collection.update_one(
+            {**batch_filter, 'schema_version': {'$ne': SCHEMA_VERSION}},
+            {'$set': {'list': legacy_subjects(doc), 'schema_version': SCHEMA_VERSION, 'migrating': True}, '$unset': {'subjects': ""}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+    return await subjects_collection.find_one(batch_filter)
+
+
+async def migrate_batch(manager_id, batch_id, batch_size=None):
+    batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    doc = await _claim_subjects(batch_filter)
+    by_name = {s['name']: s['id'] for s in doc.get('list', [])}
+    known_ids = set(by_name.values())
+    converted = 0
+
+    while True:
+        docs = await scores_collection.find(
+            {**batch_filter, 'schema_version': {'$ne': SCHEMA_VERSION}},
+            {'scores': 1}
+        ).limit(batch_size).to_list()
+        if not docs:
+            break
+
+        legacy = [(score_doc['_id'], flatten_legacy_scores(score_doc.get('scores'))) for score_doc in docs]
+        # Names that only ever appeared as score keys become subjects, so no score is lost. The name
+        # guard keeps a concurrent migrator from adding the same name under another id, and ids are
+        # re-read so both convert scores to whichever id was stored.
+        added = {key: None for _, scores in legacy for key in scores if key not in known_ids and key not in by_name}
+        if added:
+            await subjects_collection.bulk_write([
+                UpdateOne({**batch_filter, 'list.name': {'$ne': name}}, {'$push': {'list': {'id': new_subject_id(), 'name': name, 'total_marks': 100}}})
+                for name in added
+            ], ordered=True)
+            doc = await subjects_collection.find_one(batch_filter, {'_id': 0, 'list': 1})
+            by_name = {s['name']: s['id'] for s in doc.get('list', [])}
+            known_ids = set(by_name.values())
+
+        ops = [
+            UpdateOne(
+                {'_id': doc_id, 'schema_version': {'$ne': SCHEMA_VERSION}},
+                {'$set': {'scores': {key if key in known_ids else by_name[key]: value for key, value in scores.items()}, 'schema_version': SCHEMA_VERSION}}
+            )
+            for doc_id, scores in legacy
+        ]
+        await scores_collection.bulk_write(ops, ordered=False)
+        converted += len(ops)
+
+    await subjects_collection.update_one(batch_filter, {'$unset': {'migrating': ""}})
+    return converted
+
+
+async def pending_batches():
+    subject_docs, score_groups = await asyncio.gather(
+        subjects_collection.find({**PENDING, 'batch_id': {'$exists': True}}, {'_id': 0, 'manager_id': 1, 'batch_id': 1}).to_list(),
+        (await scores_collection.aggregate([
+            {'$match': {'schema_version': {'$ne': SCHEMA_VERSION}, 'batch_id': {'$exists': True}}},
+            {'$group': {'_id': {'manager_id': '$manager_id', 'batch_id': '$batch_id'}, 'documents': {'$sum': 1}}}
+        ])).to_list()
+    )
+    pending = {(d['manager_id'], d['batch_id']): 0 for d in subject_docs}
+    for group in score_groups:
+        pending[(group['_id']['manager_id'], group['_id']['batch_id'])] = group['documents']
+    return pending
+
+
+async def migration_status():
+    pending = await pending_batches()
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'pending_batches': len(pending),
+        'pending_score_documents': sum(pending.values())
+    }
+
+
+async def migrate_all(batch_size=None):
+    pending = await pending_batches()
+    results = []
+    for manager_id, batch_id in pending:
+        converted = await migrate_batch(manager_id, batch_id, batch_size)
+        logger.info("Migrated %s/%s: %d score documents", manager_id, batch_id, converted)
+        results.append({'manager_id': manager_id, 'batch_id': batch_id, 'score_documents': converted})
+    return {'schema_version': SCHEMA_VERSION, 'batches': results}
+
+
+async def _main(command, batch_size):
+    if command == 'run':
+        result = await migrate_all(batch_size)
+    else:
+        result = await migration_status()
+    print(json.dumps(result, indent=2))
+    return 1 if command == 'status' and result['pending_batches'] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command not in ('status', 'run'):
+        sys.exit("usage: python -m app.services.migrations [status|run] [batch_size]")
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    sys.exit(asyncio.run(_main(command, batch_size)))
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import interns_collection
+from app.services.export import ByteSink
+from app.services.report_render import RENDERERS, render_reports
+
+REPORT_BUNDLE_FORMATS = list(RENDERERS)
+# Workbooks are already deflated internally; recompressing them only costs CPU.
+BUNDLE_COMPRESSION = {'html': zipfile.ZIP_DEFLATED, 'xlsx': zipfile.ZIP_STORED}
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Spawned workers never inherit the Mongo client or event loop threads;
+        # they only import the renderer.
+        _pool = ProcessPoolExecutor(max_workers=settings.REPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def report_pipeline(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    return [
+        {'$match': batch_filter},
+        {'$sort': {'EmpID': 1}},
+        {'$lookup': {
+            'from': 'scores',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [{'$match': batch_filter}, {'$project': {'_id': 0, 'scores': 1}}],
+            'as': 'score_docs'
+        }},
+        {'$lookup': {
+            'from': 'feedback',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [{'$match': batch_filter}, {'$project': {'_id': 0, 'column': 1, 'text': 1, 'date': 1}}],
+            'as': 'feedbacks'
+        }},
+        {'$project': {
+            '_id': 0, 'Name': 1, 'EmpID': 1, 'Email': 1, 'feedbacks': 1,
+            'scores': {'$ifNull': [{'$arrayElemAt': ['$score_docs.scores', 0]}, {}]}
+        }}
+    ]
+
+
+async def report_chunks(manager_id, batch_id, catalog, chunk_size=None):
+    chunk_size = chunk_size or settings.REPORT_CHUNK_SIZE
+    cursor = await interns_collection.aggregate(report_pipeline(manager_id, batch_id), batchSize=chunk_size)
+    chunk = []
+    async for doc in cursor:
+        chunk.append({
+            'intern': {'Name': doc.get('Name'), 'EmpID': doc.get('EmpID'), 'Email': doc.get('Email')},
+            'scores': catalog.scores_by_name(doc.get('scores')),
+            'feedbacks': doc.get('feedbacks', [])
+        })
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_bundle(manager_id, batch_id, batch_name, catalog, report_format):
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    sink = ByteSink()
+    archive = zipfile.ZipFile(sink, 'w')
+    compression = BUNDLE_COMPRESSION[report_format]
+    pending = deque()
+
+    def add_files(files):
+        for name, data in files:
+            archive.writestr(name, data, compress_type=compression)
+        return sink.drain()
+
+    async def next_part():
+        return await run_in_threadpool(add_files, await pending.popleft())
+
+    try:
+        # At most REPORT_WORKERS chunks are rendering at once; finished chunks
+        # are written in order and sent before more interns are fetched.
+        async for chunk in report_chunks(manager_id, batch_id, catalog):
+            pending.append(loop.run_in_executor(pool, render_reports, report_format, batch_name, catalog.subjects, chunk))
+            if len(pending) >= settings.REPORT_WORKERS:
+                yield await next_part()
+        while pending:
+            yield await next_part()
+        await run_in_threadpool(archive.close)
+        yield sink.drain()
+    except BrokenProcessPool:
+        # A crashed worker poisons the pool; the next bundle starts a fresh one.
+        if _pool is pool:
+            _pool = None
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def shutdown():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
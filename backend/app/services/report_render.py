@@ -0,0 +1,91 @@
+import html
+import io
+import re
+
+# Runs inside report worker processes: keep this module free of app imports so
+# spawned workers start quickly and never open database connections.
+
+def report_filename(intern, extension):
+    emp_id = re.sub(r'[^A-Za-z0-9_-]+', '_', str(intern.get('EmpID', ''))).strip('_') or 'intern'
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', str(intern.get('Name') or '')).strip('_')
+    return f"{emp_id}_{name}.{extension}" if name else f"{emp_id}.{extension}"
+
+
+def score_rows(subjects, scores):
+    rows = []
+    for subject in subjects:
+        score = scores.get(subject['name'])
+        total = subject.get('total_marks') or 100
+        percent = round(score / total * 100, 1) if isinstance(score, (int, float)) else None
+        rows.append((subject['name'], score, total, percent))
+    return rows
+
+
+def overall_percent(rows):
+    scored = [(score, total) for _, score, total, _ in rows if isinstance(score, (int, float))]
+    if not scored:
+        return None
+    return round(sum(s for s, _ in scored) / sum(t for _, t in scored) * 100, 1)
+
+
+def render_html(batch_name, subjects, report):
+    intern = report['intern']
+    rows = score_rows(subjects, report['scores'])
+    overall = overall_percent(rows)
+    e = lambda v: html.escape('' if v is None else str(v))
+    score_html = ''.join(
+        f"<tr><td>{e(name)}</td><td>{e(score if score is not None else '-')}</td><td>{e(total)}</td>"
+        f"<td>{e(f'{percent}%' if percent is not None else '-')}</td></tr>"
+        for name, score, total, percent in rows
+    )
+    feedback_html = ''.join(
+        f"<li><strong>{e(fb.get('column', 'General'))}</strong>: {e(fb.get('text'))}"
+        f"<span class=\"date\">{e((fb.get('date') or '')[:10])}</span></li>"
+        for fb in report['feedbacks']
+    ) or '<li>No feedback recorded.</li>'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{e(intern.get('Name'))} - {e(batch_name)}</title>
+<style>body{{font-family:system-ui,sans-serif;margin:2rem;color:#1f2937}}table{{border-collapse:collapse;margin:1rem 0}}
+td,th{{border:1px solid #d1d5db;padding:.4rem .8rem;text-align:left}}th{{background:#f3f4f6}}.date{{color:#6b7280;margin-left:.5rem}}</style>
+</head><body>
+<h1>{e(intern.get('Name'))}</h1>
+<p>{e(intern.get('EmpID'))} &middot; {e(intern.get('Email'))} &middot; {e(batch_name)}</p>
+<h2>Scores</h2>
+<table><tr><th>Subject</th><th>Score</th><th>Total</th><th>Percent</th></tr>{score_html}</table>
+<p>Overall: {e(f'{overall}%' if overall is not None else '-')}</p>
+<h2>Feedback</h2>
+<ul>{feedback_html}</ul>
+</body></html>
+""".encode('utf-8')
+
+
+def render_xlsx(batch_name, subjects, report):
+    from openpyxl import Workbook
+    intern = report['intern']
+    rows = score_rows(subjects, report['scores'])
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Report')
+    ws.append(['Name', intern.get('Name')])
+    ws.append(['EmpID', intern.get('EmpID')])
+    ws.append(['Email', intern.get('Email')])
+    ws.append(['Batch', batch_name])
+    ws.append([])
+    ws.append(['Subject', 'Score', 'Total', 'Percent'])
+    for row in rows:
+        ws.append(list(row))
+    ws.append(['Overall', None, None, overall_percent(rows)])
+    feedback = wb.create_sheet('Feedback')
+    feedback.append(['Column', 'Feedback', 'Date'])
+    for fb in report['feedbacks']:
+        feedback.append([fb.get('column', 'General'), fb.get('text'), fb.get('date')])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {'html': render_html, 'xlsx': render_xlsx}
+
+
+def render_reports(report_format, batch_name, subjects, reports):
+    render = RENDERERS[report_format]
+    return [(report_filename(report['intern'], report_format), render(batch_name, subjects, report)) for report in reports]
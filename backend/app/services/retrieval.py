@@ -0,0 +1,243 @@
+import asyncio
+import json
+import math
+import re
+from collections import Counter
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import interns_collection, scores_collection, feedback_collection, batches_collection
+from app.core.revisions import current_revision
+from app.services.analytics import get_batch_analytics
+from app.services.catalog import load_catalog
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 'her', 'his', 'in', 'is',
+    'it', 'me', 'of', 'on', 'or', 'she', 'that', 'the', 'their', 'them', 'they', 'this', 'to', 'was',
+    'were', 'what', 'which', 'who', 'whom', 'with', 'how', 'do', 'does', 'any', 'all', 'show', 'tell',
+}
+# Names are what users usually ask about, so they count more than feedback prose.
+NAME_WEIGHT = 3
+CHARS_PER_TOKEN = 4
+
+retriever_cache = LRUCache(settings.CHAT_INDEX_CACHE_MAX_ENTRIES, settings.CHAT_INDEX_CACHE_TTL_SECONDS)
+
+
+SUFFIXES = ('ing', 'ed', 'es', 's')
+
+
+def _stem(token):
+    for suffix in SUFFIXES:
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [_stem(t) for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if not terms:
+            return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+
+    def add(self, doc_id, tokens):
+        self.remove(doc_id)
+        terms = Counter(tokens)
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def search(self, query_tokens, limit):
+        n = len(self.doc_terms)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1
+        scores = {}
+        for term in set(query_tokens):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                length = self.doc_lengths[doc_id]
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class BatchRetriever:
+    def __init__(self, version, interns, scores, feedbacks):
+        self.version = version
+        self.docs = {}
+        for intern in interns:
+            self.docs[intern['EmpID']] = {'EmpID': intern['EmpID'], 'Name': intern.get('Name', ''), 'scores': {}, 'feedback': {}}
+        for s in scores:
+            if s['EmpID'] in self.docs:
+                self.docs[s['EmpID']]['scores'] = dict(s.get('scores', {}))
+        for f in feedbacks:
+            if f['EmpID'] in self.docs:
+                self.docs[f['EmpID']]['feedback'][f.get('column', 'General')] = f.get('text', '')
+        self.index = BM25Index()
+        for emp_id in self.docs:
+            self._reindex(emp_id)
+
+    def _reindex(self, emp_id):
+        doc = self.docs[emp_id]
+        tokens = tokenize(doc['Name']) * NAME_WEIGHT + tokenize(emp_id) * NAME_WEIGHT
+        for column, text in doc['feedback'].items():
+            tokens += tokenize(column) + tokenize(text)
+        self.index.add(emp_id, tokens)
+
+    def apply_feedback(self, emp_id, column, text):
+        if emp_id not in self.docs:
+            return False
+        self.docs[emp_id]['feedback'][column] = text
+        self._reindex(emp_id)
+        return True
+
+    def apply_score(self, emp_id, subject, score):
+        if emp_id not in self.docs:
+            return False
+        self.docs[emp_id]['scores'][subject] = score
+        return True
+
+    def intern_line(self, emp_id):
+        doc = self.docs[emp_id]
+        feedback = [f"{col}: {text}" for col, text in doc['feedback'].items()]
+        return f"- {doc['Name']} ({emp_id}):\n Scores: {json.dumps(doc['scores'])}\n Feedback: {'; '.join(feedback)}\n\n"
+
+
+async def get_batch_retriever(manager_id, batch_id):
+    # Keyed on the batch revision in MongoDB, so a write handled by any worker is noticed here.
+    version = await current_revision(manager_id, batch_id)
+    entry = retriever_cache.get((manager_id, batch_id))
+    if entry is not None and entry.version == version:
+        return entry
+
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    interns, scores, feedbacks, catalog = await asyncio.gather(
+        interns_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'Name': 1}).to_list(),
+        scores_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'scores': 1}).to_list(),
+        feedback_collection.find(batch_filter, {'_id': 0, 'EmpID': 1, 'column': 1, 'text': 1}).to_list(),
+        load_catalog(manager_id, batch_id)
+    )
+    scores = [{'EmpID': s['EmpID'], 'scores': catalog.scores_by_name(s.get('scores'))} for s in scores]
+    entry = BatchRetriever(version, interns, scores, feedbacks)
+    retriever_cache.set((manager_id, batch_id), entry)
+    return entry
+
+
+def _patch(manager_id, batch_id, version, apply):
+    key = (manager_id, batch_id)
+    retriever = retriever_cache.peek(key)
+    if retriever is None:
+        return
+    if retriever.version == version - 1 and apply(retriever):
+        retriever.version = version
+    else:
+        retriever_cache.pop(key)
+
+
+def apply_feedback_updates(manager_id, batch_id, updates, version):
+    _patch(manager_id, batch_id, version, lambda r: all(r.apply_feedback(*update) for update in updates))
+
+
+def apply_feedback_update(manager_id, batch_id, emp_id, column, text, version):
+    apply_feedback_updates(manager_id, batch_id, [(emp_id, column, text)], version)
+
+
+def apply_score_updates(manager_id, batch_id, updates, version):
+    _patch(manager_id, batch_id, version, lambda r: all(r.apply_score(emp_id, subject, float(score)) for emp_id, subject, score in updates))
+
+
+def apply_score_update(manager_id, batch_id, emp_id, subject, score, version):
+    apply_score_updates(manager_id, batch_id, [(emp_id, subject, score)], version)
+
+
+def _aggregate_lines(analytics):
+    lines = []
+    for stats in analytics['subjects']:
+        if not stats['count']:
+            continue
+        pass_rate = f"{stats['pass_rate'] * 100:.0f}%" if stats['pass_rate'] is not None else "n/a"
+        lines.append(
+            f"- {stats['name']} (Total: {stats['total_marks']:g}): mean {stats['mean']:g}, median {stats['median']:g}, "
+            f"std {stats['std']:g}, range {stats['min']:g}-{stats['max']:g}, pass rate {pass_rate}, scored {stats['count']}\n"
+        )
+    return lines
+
+
+def _subject_extremes(analytics, subjects, k):
+    picked = []
+    for subject in subjects:
+        ranked = [
+            (row['subjects'][subject]['rank'], row['EmpID'])
+            for row in analytics['interns'] if subject in row['subjects']
+        ]
+        ranked.sort()
+        top = [emp_id for _, emp_id in ranked[:k]]
+        bottom = [emp_id for _, emp_id in ranked[-k:][::-1]]
+        # Interleave so a tight budget still shows both ends of the distribution.
+        for pair in zip(top, bottom):
+            picked.extend(pair)
+    return picked
+
+
+async def build_context(manager_id, batch_id, query, token_budget=None):
+    token_budget = token_budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+    retriever, analytics, batch = await asyncio.gather(
+        get_batch_retriever(manager_id, batch_id),
+        get_batch_analytics(manager_id, batch_id),
+        batches_collection.find_one({'batch_id': batch_id}, {'_id': 0, 'name': 1})
+    )
+    analytics = analytics.to_dict()
+    batch_name = batch['name'] if batch else "Unknown Batch"
+
+    query_tokens = tokenize(query)
+    query_terms = set(query_tokens)
+    mentioned = [s['name'] for s in analytics['subjects'] if query_terms & set(tokenize(s['name']))]
+
+    candidates = [emp_id for emp_id, _ in retriever.index.search(query_tokens, settings.CHAT_RETRIEVAL_TOP_K)]
+    extremes_for = mentioned or ([s['name'] for s in analytics['subjects']] if not candidates else [])
+    candidates += _subject_extremes(analytics, extremes_for, settings.CHAT_SUBJECT_EXTREMES)
+
+    context = f"Active Batch: {batch_name}\nInterns in batch: {len(retriever.docs)}\n\nSubject Statistics:\n"
+    context += ''.join(_aggregate_lines(analytics))
+    context += "\nRelevant Intern Profiles:\n"
+    used = estimate_tokens(context)
+
+    included = set()
+    for emp_id in candidates:
+        if emp_id in included or emp_id not in retriever.docs:
+            continue
+        line = retriever.intern_line(emp_id)
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            continue
+        context += line
+        used += cost
+        included.add(emp_id)
+    return context
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import json
+import os
+import re
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.core.config import settings
+from app.core.database import batches_collection, interns_collection, feedback_collection
+from app.services.retrieval import tokenize
+
+KINDS = ('all', 'interns', 'feedback')
+WORD_RE = re.compile(r'\w+')
+# $text syntax: quoted phrases, -negated terms, plain words.
+QUERY_TERM_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+class SearchQueryError(ValueError):
+    pass
+
+
+def encode_cursor(query, score, doc_id):
+    raw = json.dumps({'q': query, 's': score, 'i': str(doc_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, query):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        after = (float(data['s']), ObjectId(data['i']))
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise SearchQueryError("Invalid cursor")
+    if data.get('q') != query:
+        raise SearchQueryError("Cursor was issued for a different query")
+    return after
+
+
+def _branch(manager_id, batch_id, query, kind, fields, after, limit):
+    # Each collection contributes at most one page past the cursor, so the merge sorts a bounded set.
+    match = {'manager_id': manager_id, '$text': {'$search': query}}
+    if batch_id:
+        match['batch_id'] = batch_id
+    pipeline = [
+        {'$match': match},
+        {'$project': {**{f: 1 for f in fields}, 'batch_id': 1, 'EmpID': 1, 'kind': {'$literal': kind}, 'score': {'$meta': 'textScore'}}}
+    ]
+    if after:
+        score, doc_id = after
+        pipeline.append({'$match': {'$or': [{'score': {'$lt': score}}, {'score': score, '_id': {'$gt': doc_id}}]}})
+    return pipeline + [{'$sort': {'score': -1, '_id': 1}}, {'$limit': limit + 1}]
+
+
+def search_pipeline(manager_id, query, kind='all', batch_id=None, after=None, limit=20):
+    intern_branch = _branch(manager_id, batch_id, query, 'intern', ['Name', 'Email'], after, limit)
+    feedback_branch = _branch(manager_id, batch_id, query, 'feedback', ['column', 'text'], after, limit)
+    if kind == 'interns':
+        return interns_collection, intern_branch
+    if kind == 'feedback':
+        return feedback_collection, feedback_branch
+    return interns_collection, intern_branch + [
+        {'$unionWith': {'coll': feedback_collection.name, 'pipeline': feedback_branch}},
+        {'$sort': {'score': -1, '_id': 1}},
+        {'$limit': limit + 1}
+    ]
+
+
+def highlight_terms(query):
+    terms = []
+    for negated, phrase, word in QUERY_TERM_RE.findall(query):
+        if negated or (word and word.startswith('-')):
+            continue
+        terms.extend(tokenize(phrase or word))
+    return terms
+
+
+def _word_matches(word, terms):
+    # Approximates the text index's stemming: same stem, or a long shared prefix (communicates / communication).
+    stems = tokenize(word)
+    if not stems:
+        return False
+    stem = stems[0]
+    for term in terms:
+        shortest = min(len(stem), len(term))
+        if stem == term or (shortest >= 5 and len(os.path.commonprefix([stem, term])) >= max(5, shortest - 3)):
+            return True
+    return False
+
+
+def match_spans(text, terms):
+    return [[m.start(), m.end()] for m in WORD_RE.finditer(text) if _word_matches(m.group(), terms)]
+
+
+def snippet(text, spans, width=None):
+    # Long feedback is cut to a window around the first match; spans are shifted to the window.
+    width = width or settings.SEARCH_SNIPPET_CHARS
+    if len(text) <= width:
+        return text, spans
+    first = spans[0][0] if spans else 0
+    start = max(0, min(first - width // 4, len(text) - width))
+    end = start + width
+    prefix = '…' if start else ''
+    window = prefix + text[start:end] + ('…' if end < len(text) else '')
+    shift = len(prefix) - start
+    return window, [[s + shift, e + shift] for s, e in spans if s >= start and e <= end]
+
+
+def _present(doc, terms, batch_names, intern_names):
+    item = {
+        'kind': doc['kind'],
+        'batch_id': doc.get('batch_id'),
+        'batch_name': batch_names.get(doc.get('batch_id')),
+        'EmpID': doc.get('EmpID'),
+        'score': round(doc['score'], 4)
+    }
+    if doc['kind'] == 'intern':
+        item.update({'Name': doc.get('Name'), 'Email': doc.get('Email')})
+        fields = {field: str(doc.get(field) or '') for field in ('Name', 'EmpID', 'Email')}
+        item['highlights'] = {field: spans for field, value in fields.items() if (spans := match_spans(value, terms))}
+    else:
+        text, spans = snippet(str(doc.get('text') or ''), match_spans(str(doc.get('text') or ''), terms))
+        item.update({'Name': intern_names.get((doc.get('batch_id'), doc.get('EmpID'))), 'column': doc.get('column'), 'snippet': text})
+        item['highlights'] = {'snippet': spans} if spans else {}
+    return item
+
+
+async def _batch_names(manager_id, docs):
+    batch_ids = list({doc['batch_id'] for doc in docs if doc.get('batch_id')})
+    if not batch_ids:
+        return {}
+    batches = await batches_collection.find({'manager_id': manager_id, 'batch_id': {'$in': batch_ids}}, {'_id': 0, 'batch_id': 1, 'name': 1}).to_list()
+    return {b['batch_id']: b.get('name') for b in batches}
+
+
+async def _intern_names(manager_id, hits):
+    if not hits:
+        return {}
+    interns = await interns_collection.find(
+        {'manager_id': manager_id, 'batch_id': {'$in': list({h['batch_id'] for h in hits})}, 'EmpID': {'$in': list({h['EmpID'] for h in hits})}},
+        {'_id': 0, 'batch_id': 1, 'EmpID': 1, 'Name': 1}
+    ).to_list()
+    return {(i['batch_id'], i['EmpID']): i.get('Name') for i in interns}
+
+
+async def search(manager_id, query, kind='all', batch_id=None, limit=None, cursor=None):
+    query = query.strip()
+    if not query:
+        raise SearchQueryError("q must not be empty")
+    if kind not in KINDS:
+        raise SearchQueryError("kind must be 'all', 'interns' or 'feedback'")
+    limit = min(max(limit or settings.SEARCH_PAGE_DEFAULT_LIMIT, 1), settings.SEARCH_PAGE_MAX_LIMIT)
+    after = decode_cursor(cursor, query) if cursor else None
+
+    collection, pipeline = search_pipeline(manager_id, query, kind, batch_id, after, limit)
+    docs = await (await collection.aggregate(pipeline)).to_list()
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    # Batch names and the names behind feedback hits are fetched for this page only.
+    batch_names, intern_names = await asyncio.gather(
+        _batch_names(manager_id, docs),
+        _intern_names(manager_id, [doc for doc in docs if doc['kind'] == 'feedback'])
+    )
+
+    terms = highlight_terms(query)
+    next_cursor = encode_cursor(query, docs[-1]['score'], docs[-1]['_id']) if has_more and docs else None
+    return {
+        'query': query,
+        'items': [_present(doc, terms, batch_names, intern_names) for doc in docs],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
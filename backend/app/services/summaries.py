@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from pymongo.errors import PyMongoError
+from app.core.cache import invalidation_listeners
+from app.core.config import settings
+from app.core.database import batches_collection, interns_collection, revisions_collection, summaries_collection
+from app.core.revisions import current_revision
+from app.services.catalog import load_catalog
+
+logger = logging.getLogger(__name__)
+
+pending_refreshes = {}
+dirty_batches = set()
+
+
+def _round(expr, places=2):
+    return {'$round': [expr, places]}
+
+
+def summary_pipeline(manager_id, batch_id, subjects, revision, top_k=None):
+    top_k = top_k or settings.DASHBOARD_TOP_K
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    subject_list = [{'id': s['id'], 'name': s['name'], 'total_marks': s.get('total_marks') or 100} for s in subjects]
+    ids = {'$literal': [s['id'] for s in subject_list]}
+    # Total marks of the subject a score pair belongs to.
+    pair_total = {'$arrayElemAt': [{'$map': {
+        'input': {'$filter': {'input': {'$literal': subject_list}, 'as': 's', 'cond': {'$eq': ['$$s.id', '$$p.k']}}},
+        'as': 's',
+        'in': '$$s.total_marks'
+    }}, 0]}
+    ranked = [{'$match': {'percent': {'$ne': None}}}]
+    ranked_fields = {'$project': {'_id': 0, 'EmpID': 1, 'Name': 1, 'percent': 1}}
+    return [
+        {'$match': batch_filter},
+        {'$lookup': {
+            'from': 'scores',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [{'$match': batch_filter}, {'$project': {'_id': 0, 'scores': 1}}],
+            'as': 'score_docs'
+        }},
+        {'$lookup': {
+            'from': 'feedback',
+            'localField': 'EmpID',
+            'foreignField': 'EmpID',
+            'pipeline': [{'$match': {**batch_filter, 'text': {'$nin': [None, '']}}}, {'$project': {'_id': 1}}],
+            'as': 'feedbacks'
+        }},
+        # Scores under deleted subjects and non-numeric cells are left out of every figure.
+        {'$project': {
+            '_id': 0, 'EmpID': 1, 'Name': 1,
+            'feedback_entries': {'$size': '$feedbacks'},
+            'pairs': {'$map': {
+                'input': {'$filter': {
+                    'input': {'$objectToArray': {'$ifNull': [{'$arrayElemAt': ['$score_docs.scores', 0]}, {}]}},
+                    'as': 'p',
+                    'cond': {'$and': [{'$in': ['$$p.k', ids]}, {'$isNumber': '$$p.v'}]}
+                }},
+                'as': 'p',
+                'in': {'k': '$$p.k', 'v': '$$p.v', 't': pair_total}
+            }}
+        }},
+        {'$set': {'percent': {'$cond': [
+            {'$gt': [{'$size': '$pairs'}, 0]},
+            _round({'$multiply': [100, {'$divide': [{'$sum': '$pairs.v'}, {'$sum': '$pairs.t'}]}]}),
+            None
+        ]}}},
+        {'$facet': {
+            'count': [{'$count': 'n'}],
+            'overall': ranked + [{'$group': {'_id': None, 'mean': {'$avg': '$percent'}}}],
+            'feedback': [{'$group': {
+                '_id': None,
+                'interns': {'$sum': {'$cond': [{'$gt': ['$feedback_entries', 0]}, 1, 0]}},
+                'entries': {'$sum': '$feedback_entries'}
+            }}],
+            'subjects': [{'$unwind': '$pairs'}, {'$group': {'_id': '$pairs.k', 'mean': {'$avg': '$pairs.v'}, 'count': {'$sum': 1}}}],
+            'top': ranked + [{'$sort': {'percent': -1, 'EmpID': 1}}, {'$limit': top_k}, ranked_fields],
+            'bottom': ranked + [{'$sort': {'percent': 1, 'EmpID': 1}}, {'$limit': top_k}, ranked_fields]
+        }},
+        {'$project': {
+            '_id': 0,
+            'manager_id': {'$literal': manager_id},
+            'batch_id': {'$literal': batch_id},
+            'revision': {'$literal': revision},
+            'updated_at': '$$NOW',
+            'headcount': {'$ifNull': [{'$arrayElemAt': ['$count.n', 0]}, 0]},
+            'average_percent': _round({'$arrayElemAt': ['$overall.mean', 0]}),
+            'subjects': {'$map': {'input': {'$literal': subject_list}, 'as': 's', 'in': {'$let': {
+                'vars': {'stat': {'$arrayElemAt': [{'$filter': {'input': '$subjects', 'cond': {'$eq': ['$$this._id', '$$s.id']}}}, 0]}},
+                'in': {
+                    'id': '$$s.id',
+                    'name': '$$s.name',
+                    'total_marks': '$$s.total_marks',
+                    'count': {'$ifNull': ['$$stat.count', 0]},
+                    'mean': _round('$$stat.mean'),
+                    'mean_percent': _round({'$multiply': [100, {'$divide': ['$$stat.mean', '$$s.total_marks']}]})
+                }
+            }}}},
+            'top': 1,
+            'bottom': 1,
+            'feedback': {'$let': {
+                'vars': {'fb': {'$arrayElemAt': ['$feedback', 0]}, 'n': {'$ifNull': [{'$arrayElemAt': ['$count.n', 0]}, 0]}},
+                'in': {
+                    'interns': {'$ifNull': ['$$fb.interns', 0]},
+                    'entries': {'$ifNull': ['$$fb.entries', 0]},
+                    'coverage': {'$cond': [{'$gt': ['$$n', 0]}, _round({'$divide': [{'$ifNull': ['$$fb.interns', 0]}, '$$n']}, 4), None]}
+                }
+            }}
+        }},
+        # A refresh that read an older revision never overwrites a newer summary from another worker.
+        {'$merge': {
+            'into': summaries_collection.name,
+            'on': ['manager_id', 'batch_id'],
+            'whenMatched': [{'$replaceWith': {'$cond': [
+                {'$gte': ['$$new.revision', '$revision']}, {'$mergeObjects': ['$$ROOT', '$$new']}, '$$ROOT'
+            ]}}],
+            'whenNotMatched': 'insert'
+        }}
+    ]
+
+
+async def refresh_summary(manager_id, batch_id):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    # Archiving drops the summary and then notifies; that refresh must not rebuild it. Restoring
+    # notifies again, which builds it afresh.
+    if await batches_collection.find_one({**batch_filter, 'archived': True}, {'_id': 1}):
+        await summaries_collection.delete_one(batch_filter)
+        return
+    # The revision is read first, so the summary covers at least the writes it is stamped with.
+    revision, catalog = await asyncio.gather(current_revision(manager_id, batch_id), load_catalog(manager_id, batch_id))
+    cursor = await interns_collection.aggregate(summary_pipeline(manager_id, batch_id, catalog.subjects, revision))
+    await cursor.to_list()
+
+
+async def _refresh_later(key):
+    try:
+        while True:
+            await asyncio.sleep(settings.DASHBOARD_REFRESH_DEBOUNCE_SECONDS)
+            dirty_batches.discard(key)
+            try:
+                await refresh_summary(*key)
+            except PyMongoError as e:
+                # The dashboard notices the stale revision and schedules another refresh.
+                logger.warning("Batch summary refresh failed for %s/%s: %s", *key, e)
+            if key not in dirty_batches:
+                break
+    finally:
+        pending_refreshes.pop(key, None)
+
+
+def schedule_refresh(manager_id, batch_id):
+    # Debounced: a burst of writes to one batch costs a single pipeline run.
+    key = (manager_id, batch_id)
+    if key in pending_refreshes:
+        dirty_batches.add(key)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    pending_refreshes[key] = loop.create_task(_refresh_later(key))
+
+
+invalidation_listeners.append(schedule_refresh)
+
+
+async def load_dashboard(manager_id):
+    manager_filter = {'manager_id': manager_id}
+    batches, summaries, revisions = await asyncio.gather(
+        batches_collection.find({**manager_filter, 'archived': {'$ne': True}}, {'_id': 0}).sort('batch_id', 1).to_list(),
+        summaries_collection.find(manager_filter, {'_id': 0, 'manager_id': 0}).to_list(),
+        revisions_collection.find(manager_filter, {'_id': 0, 'batch_id': 1, 'rev': 1}).to_list()
+    )
+    summaries = {s['batch_id']: s for s in summaries}
+    revisions = {r['batch_id']: r['rev'] for r in revisions}
+
+    # Batches never summarized (new, or older than the dashboard) are built once, inline.
+    missing = [b['batch_id'] for b in batches if b['batch_id'] not in summaries]
+    if missing:
+        await asyncio.gather(*(refresh_summary(manager_id, batch_id) for batch_id in missing))
+        built = await summaries_collection.find({**manager_filter, 'batch_id': {'$in': missing}}, {'_id': 0, 'manager_id': 0}).to_list()
+        summaries.update({s['batch_id']: s for s in built})
+
+    rows = []
+    for batch in batches:
+        summary = summaries.get(batch['batch_id'], {})
+        stale = summary.get('revision', 0) < revisions.get(batch['batch_id'], 0)
+        if stale:
+            schedule_refresh(manager_id, batch['batch_id'])
+        rows.append({**summary, 'batch_id': batch['batch_id'], 'name': batch.get('name'), 'stale': stale})
+    return {
+        'batches': rows,
+        'totals': {'batches': len(rows), 'interns': sum(row.get('headcount', 0) for row in rows)}
+    }
+
+
+async def shutdown():
+    tasks = list(pending_refreshes.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
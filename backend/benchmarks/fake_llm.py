@@ -0,0 +1,82 @@
+"""Local stand-in for the Groq chat completions API.
+
+Usage:
+    python -m benchmarks.fake_llm --port 8001 --token-delay-ms 20
+    GROQ_BASE_URL=http://localhost:8001 GROQ_API_KEY=fake python run.py
+
+Serves /openai/v1/chat/completions in both streaming (SSE) and
+non-streaming modes with a configurable per-token delay, so /api/chat can
+be exercised and load-tested without a real API key.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake LLM")
+app.state.token_delay = 0.02
+app.state.tokens = 40
+
+
+def answer_tokens(messages):
+    query = messages[-1]['content'].rsplit('Query:', 1)[-1].strip() if messages else ''
+    words = f"Based on the batch data, here is what I found about: {query}.".split()
+    filler = ["Intern", "performance", "looks", "steady", "across", "subjects."]
+    while len(words) < app.state.tokens:
+        words.extend(filler)
+    return [w + ' ' for w in words[:app.state.tokens]]
+
+
+def chunk_payload(completion_id, model, delta, finish_reason=None):
+    return {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+    }
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get('model', 'fake-model')
+    tokens = answer_tokens(body.get('messages', []))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    if not body.get('stream'):
+        await asyncio.sleep(app.state.token_delay * len(tokens))
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(tokens), 'total_tokens': len(tokens)}
+        }
+
+    async def events():
+        yield f"data: {json.dumps(chunk_payload(completion_id, model, {'role': 'assistant', 'content': ''}))}\n\n"
+        for token in tokens:
+            await asyncio.sleep(app.state.token_delay)
+            yield f"data: {json.dumps(chunk_payload(completion_id, model, {'content': token}))}\n\n"
+        yield f"data: {json.dumps(chunk_payload(completion_id, model, {}, 'stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--token-delay-ms', type=float, default=20)
+    parser.add_argument('--tokens', type=int, default=40)
+    args = parser.parse_args()
+    app.state.token_delay = args.token_delay_ms / 1000
+    app.state.tokens = args.tokens
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,122 @@
+"""Concurrent-request load test against a running API server.
+
+Usage:
+    python -m benchmarks.load_test --base-url http://localhost:5000 \\
+        --manager-id <id> --batch-id <id> --concurrency 50 --requests 1000
+
+Run it once against the previous commit and once against the current one to
+compare throughput. Each endpoint is driven in turn and a JSON summary is
+printed so the two runs can be diffed. For a seeded, end-to-end run that also
+covers uploads, exports, writes and chat, use `benchmarks.suite`.
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+
+
+def build_requests(manager_id, batch_id, emp_id):
+    params = {'manager_id': manager_id, 'batch_id': batch_id}
+    reqs = {
+        'scores': ('GET', '/api/scores', params),
+        'feedback-grid': ('GET', '/api/feedback-grid', params),
+        'subjects': ('GET', '/api/subjects', params),
+        'interns': ('GET', '/api/interns', params),
+    }
+    if emp_id:
+        reqs['report'] = ('GET', f'/api/reports/{emp_id}', params)
+    return reqs
+
+
+def parse_server_timing(header):
+    # `db;dur=12.3;desc="4 queries"` -> (4, 12.3); None when the server did not report it.
+    for metric in (header or '').split(','):
+        parts = [p.strip() for p in metric.split(';')]
+        if parts[0] != 'db':
+            continue
+        fields = dict(p.split('=', 1) for p in parts[1:] if '=' in p)
+        try:
+            return int(fields.get('desc', '0').strip('"').split()[0]), float(fields.get('dur', 0))
+        except (ValueError, IndexError):
+            return None
+    return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(len(sorted_values) * pct / 100)) - 1))]
+
+
+def summarize(total, errors, elapsed, latencies, round_trips, db_ms):
+    latencies.sort()
+    summary = {
+        'requests': total,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+    if round_trips:
+        round_trips.sort()
+        summary['mongo_round_trips_mean'] = round(sum(round_trips) / len(round_trips), 2)
+        summary['mongo_round_trips_p95'] = percentile(round_trips, 95)
+        summary['mongo_ms_mean'] = round(sum(db_ms) / len(db_ms), 2)
+    return summary
+
+
+async def drive(client, make_request, total, concurrency):
+    # make_request(i) returns the keyword arguments for client.request, so each
+    # call can carry its own body (uploads, cell updates, chat queries).
+    latencies = []
+    round_trips = []
+    db_ms = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                res = await client.request(**make_request(i))
+                if res.status_code >= 400:
+                    errors += 1
+                timing = parse_server_timing(res.headers.get('server-timing'))
+                if timing:
+                    round_trips.append(timing[0])
+                    db_ms.append(timing[1])
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(total, errors, time.perf_counter() - start, latencies, round_trips, db_ms)
+
+
+def fixed_request(method, path, params):
+    return lambda i: {'method': method, 'url': path, 'params': params}
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        results = {}
+        for name, (method, path, params) in build_requests(args.manager_id, args.batch_id, args.emp_id).items():
+            results[name] = await drive(client, fixed_request(method, path, params), args.requests, args.concurrency)
+    print(json.dumps({'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-request throughput test")
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--manager-id', required=True)
+    parser.add_argument('--batch-id', required=True)
+    parser.add_argument('--emp-id', default=None)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
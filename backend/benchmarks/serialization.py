@@ -0,0 +1,89 @@
+"""Serialization benchmark for the large grid payloads.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --interns 5000 --subjects 12 --repeats 5
+
+Builds score and feedback grids shaped like /api/scores and
+/api/feedback-grid from the synthetic data generator, then times the old
+response path (jsonable_encoder + stdlib JSON) against each variant that
+app.core.responses can negotiate: JSON or MessagePack, row or columnar
+layout, uncompressed, gzip or brotli. The report lists body size and median
+encode time per variant. MessagePack and brotli rows appear only when those
+packages are installed.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from fastapi.encoders import jsonable_encoder
+from app.core import responses
+from benchmarks.synthetic import make_batch
+
+
+def build_grids(interns, subjects, seed_value):
+    docs = make_batch(random.Random(seed_value), 'bench-manager', 'bench-batch', interns, subjects)
+    by_id = {s['id']: s['name'] for s in docs['subjects'][0]['list']}
+    scores = {doc['EmpID']: {by_id[sid]: value for sid, value in doc['scores'].items()} for doc in docs['scores']}
+    feedback = {}
+    for doc in docs['feedback']:
+        feedback.setdefault(doc['EmpID'], {})[doc['column']] = doc['text']
+    return {
+        'scores': [{**intern, **scores.get(intern['EmpID'], {})} for intern in docs['interns']],
+        'feedback-grid': [{**intern, 'feedbacks': feedback.get(intern['EmpID'], {})} for intern in docs['interns']]
+    }
+
+
+def baseline_body(data):
+    # What FastAPI's default JSONResponse did before the response layer.
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, round(statistics.median(samples) * 1000, 2)
+
+
+def variants():
+    media_types = [responses.JSON_MEDIA_TYPE] + ([responses.MSGPACK_MEDIA_TYPE] if responses.msgpack else [])
+    codings = [None, 'gzip'] + (['br'] if responses.brotli else [])
+    for media_type in media_types:
+        for layout in ('rows', 'columnar'):
+            for coding in codings:
+                yield media_type, layout, coding
+
+
+def measure(data, repeats):
+    body, encode_ms = timed(lambda: baseline_body(data), repeats)
+    results = [{'variant': 'baseline json', 'bytes': len(body), 'encode_ms': encode_ms}]
+    for variant in variants():
+        (body, _), encode_ms = timed(lambda: responses.encode_body(data, variant), repeats)
+        media_type, layout, coding = variant
+        name = f"{'msgpack' if media_type == responses.MSGPACK_MEDIA_TYPE else 'json'} {layout} {coding or 'identity'}"
+        results.append({'variant': name, 'bytes': len(body), 'encode_ms': encode_ms})
+    base = results[0]
+    for row in results[1:]:
+        row['bytes_vs_baseline'] = f"{(row['bytes'] / base['bytes'] - 1) * 100:+.1f}%"
+        row['time_vs_baseline'] = f"{(row['encode_ms'] / base['encode_ms'] - 1) * 100:+.1f}%"
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid payload serialization benchmark")
+    parser.add_argument('--interns', type=int, default=5000)
+    parser.add_argument('--subjects', type=int, default=12)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    grids = build_grids(args.interns, args.subjects, args.seed)
+    report = {
+        'interns': args.interns,
+        'subjects': args.subjects,
+        'encoders': {'orjson': bool(responses.orjson), 'msgpack': bool(responses.msgpack), 'brotli': bool(responses.brotli)},
+        'grids': {name: measure(data, args.repeats) for name, data in grids.items()}
+    }
+    print(json.dumps(report, indent=2))
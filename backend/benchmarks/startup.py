@@ -0,0 +1,130 @@
+"""Cold-start benchmark: import time, time to ready and first-request latency.
+
+Usage (from backend/):
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --serve --workers 2 --manager-id <id> --batch-id <id>
+
+The import phase imports app.main in fresh interpreters and records which
+heavy libraries came along with it. With --serve the production entry point
+(serve.py) is started against MONGO_URI, the time until /api/health answers
+is measured, the first request to each endpoint is compared with the warm
+median, and the time SIGTERM takes to drain and exit is recorded.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+HEAVY_MODULES = ['pandas', 'openpyxl', 'groq', 'numpy', 'pyarrow']
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+
+def measure_imports(runs):
+    samples = []
+    loaded = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', IMPORT_PROBE % HEAVY_MODULES], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        loaded = result['loaded']
+    return {
+        'runs': runs,
+        'median_ms': round(statistics.median(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'heavy_modules_loaded': loaded
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(base_url, proc, timeout):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            sys.exit(f"serve.py exited with code {proc.returncode} before becoming ready")
+        try:
+            if httpx.get(f'{base_url}/api/health', timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    sys.exit(f"serve.py was not ready after {timeout}s")
+
+
+def first_vs_warm(client, path, params, repeats):
+    timings = []
+    for _ in range(repeats + 1):
+        started = time.perf_counter()
+        client.get(path, params=params)
+        timings.append(time.perf_counter() - started)
+    return {
+        'first_ms': round(timings[0] * 1000, 1),
+        'warm_median_ms': round(statistics.median(timings[1:]) * 1000, 1)
+    }
+
+
+def measure_serve(args):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port), '--workers', str(args.workers), '--log-level', 'warning'],
+        env=os.environ.copy()
+    )
+    try:
+        ready = wait_until_ready(base_url, proc, args.timeout)
+        result = {'workers': args.workers, 'ready_ms': round(ready * 1000, 1), 'endpoints': {}}
+        if args.manager_id and args.batch_id:
+            params = {'manager_id': args.manager_id, 'batch_id': args.batch_id}
+            endpoints = {
+                'subjects': ('/api/subjects', params),
+                'scores': ('/api/scores', params),
+                'feedback-grid': ('/api/feedback-grid', params),
+                'export-csv': ('/api/export-scores', {**params, 'format': 'csv'}),
+            }
+            # A fresh connection per request spreads the calls across workers.
+            with httpx.Client(base_url=base_url, timeout=120, limits=httpx.Limits(max_keepalive_connections=0)) as client:
+                for name, (path, query) in endpoints.items():
+                    result['endpoints'][name] = first_vs_warm(client, path, query, args.repeats)
+    finally:
+        stop_started = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    result['shutdown_ms'] = round((time.perf_counter() - stop_started) * 1000, 1)
+    result['total_s'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--serve', action='store_true')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--manager-id', default=None)
+    parser.add_argument('--batch-id', default=None)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+    report = {'import': measure_imports(args.runs)}
+    if args.serve:
+        report['serve'] = measure_serve(args)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,302 @@
+"""Seeded end-to-end benchmark of the key endpoints.
+
+Usage (from backend/):
+    # App in-process against a throwaway mongod whose data lives on tmpfs
+    python -m benchmarks.suite --mongo ephemeral --scale medium --output bench.json
+
+    # App in-process against an existing server (uses the ld_benchmark database)
+    python -m benchmarks.suite --mongo-uri mongodb://localhost:27017 --output bench.json
+
+    # A running API started with DATABASE_NAME=ld_benchmark and
+    # GROQ_BASE_URL=http://127.0.0.1:8001 (the suite serves the fake LLM there)
+    python -m benchmarks.suite --base-url http://localhost:5000 --mongo-uri mongodb://localhost:27017
+
+    # Compare with an earlier run; exits 1 if any p95 got more than 20% slower
+    python -m benchmarks.suite --mongo ephemeral --baseline bench-main.json --fail-over 20
+
+The database is reseeded from --seed on every run, chat goes to the fake LLM
+from benchmarks.fake_llm, and the JSON report carries throughput,
+p50/p95/p99 latency and Mongo round trips per request (read from the
+Server-Timing header) for each scenario, plus the commit it was run on.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+import httpx
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
+from benchmarks.load_test import drive, fixed_request
+from benchmarks.synthetic import BENCHMARK_PASSWORD, seed, write_workbook
+
+SCALES = {
+    'small': {'managers': 1, 'batches': 1, 'interns': 300, 'subjects': 8, 'workbook_rows': 1000},
+    'medium': {'managers': 1, 'batches': 2, 'interns': 3000, 'subjects': 12, 'workbook_rows': 5000},
+    'large': {'managers': 2, 'batches': 3, 'interns': 10000, 'subjects': 16, 'workbook_rows': 20000},
+}
+LIGHT_SCENARIOS = ['login', 'scores', 'scores-page', 'feedback-grid', 'report', 'dashboard', 'search', 'update-score']
+HEAVY_SCENARIOS = ['upload', 'export', 'chat', 'chat-uncached']
+COMPARED_FIELDS = ['throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'mongo_round_trips_mean']
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+UPLOAD_BATCH_ID = 'bench-upload'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_mongo(uri, timeout=30):
+    client = AsyncMongoClient(uri, serverSelectionTimeoutMS=1000)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                await client.admin.command('ping')
+                return
+            except PyMongoError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+    finally:
+        await client.close()
+
+
+@asynccontextmanager
+async def ephemeral_mongod():
+    binary = shutil.which('mongod')
+    if binary is None:
+        sys.exit("mongod was not found on PATH; pass --mongo-uri instead")
+    # /dev/shm keeps the data files in memory, so disk speed does not skew results.
+    dbpath = tempfile.mkdtemp(prefix='ld_bench_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    port = free_port()
+    proc = await asyncio.create_subprocess_exec(
+        binary, '--dbpath', dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--quiet',
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    uri = f'mongodb://127.0.0.1:{port}/?directConnection=true'
+    try:
+        await wait_for_mongo(uri)
+        yield uri
+    finally:
+        proc.terminate()
+        await proc.wait()
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+@asynccontextmanager
+async def mongo_target(args):
+    if args.mongo == 'ephemeral':
+        async with ephemeral_mongod() as uri:
+            yield uri
+    else:
+        yield args.mongo_uri
+
+
+@asynccontextmanager
+async def fake_llm_server(port, token_delay_ms, tokens):
+    import uvicorn
+    from benchmarks import fake_llm
+    fake_llm.app.state.token_delay = token_delay_ms / 1000
+    fake_llm.app.state.tokens = tokens
+    server = uvicorn.Server(uvicorn.Config(fake_llm.app, host='127.0.0.1', port=port, log_level='warning'))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+            sys.exit(f"fake LLM could not start on port {port}")
+        await asyncio.sleep(0.05)
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.should_exit = True
+        await task
+
+
+@asynccontextmanager
+async def api_client(args, mongo_uri, llm_url):
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.heavy_concurrency))
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=300) as client:
+            yield client
+        return
+    # Settings are read at import time, so the environment must be in place first.
+    os.environ['MONGO_URI'] = mongo_uri
+    os.environ['DATABASE_NAME'] = args.database
+    if llm_url:
+        os.environ['GROQ_BASE_URL'] = llm_url
+        os.environ['GROQ_API_KEY'] = 'fake'
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=300) as client:
+            yield client
+
+
+def build_scenarios(manifest, workbook):
+    manager_id = manifest['managers'][0]['manager_id']
+    batch_id = manifest['managers'][0]['batch_ids'][0]
+    params = {'manager_id': manager_id, 'batch_id': batch_id}
+    emp_ids = manifest['emp_ids']
+    subjects = manifest['subjects']
+    nonce = uuid.uuid4().hex[:8]
+    calls = itertools.count()
+    queries = [
+        'Who are the top performers in Python?',
+        'Which interns are struggling with SQL?',
+        f'How is {emp_ids[0]} doing overall?',
+        'Summarize the feedback for this batch.'
+    ]
+    return {
+        'login': lambda i: {'method': 'POST', 'url': '/api/login', 'json': {'username': 'BENCH0', 'password': BENCHMARK_PASSWORD}},
+        'scores': fixed_request('GET', '/api/scores', params),
+        'scores-page': fixed_request('GET', '/api/scores', {**params, 'limit': 100, 'sort': 'Name'}),
+        'feedback-grid': fixed_request('GET', '/api/feedback-grid', params),
+        'dashboard': fixed_request('GET', '/api/dashboard', {'manager_id': manager_id}),
+        'search': lambda i: {'method': 'GET', 'url': '/api/search', 'params': {
+            'manager_id': manager_id, 'q': [emp_ids[i % len(emp_ids)], 'communicates', '"edge cases"'][i % 3]
+        }},
+        'report': lambda i: {'method': 'GET', 'url': f'/api/reports/{emp_ids[i % len(emp_ids)]}', 'params': params},
+        'update-score': lambda i: {'method': 'POST', 'url': '/api/update-score', 'json': {
+            **params, 'EmpID': emp_ids[i % len(emp_ids)], 'subject': subjects[i % len(subjects)], 'score': i % 50
+        }},
+        'upload': lambda i: {
+            'method': 'POST', 'url': '/api/upload-interns',
+            'data': {'manager_id': manager_id, 'batch_id': UPLOAD_BATCH_ID},
+            'files': {'file': ('interns.xlsx', workbook, XLSX_MIME)}
+        },
+        'export': fixed_request('GET', '/api/export-scores', {**params, 'format': 'xlsx'}),
+        'chat': lambda i: {'method': 'POST', 'url': '/api/chat', 'json': {**params, 'query': queries[i % len(queries)]}},
+        # A per-run nonce and a call counter (warm-up reuses i) keep every question distinct, so each call misses the answer cache.
+        'chat-uncached': lambda i: {'method': 'POST', 'url': '/api/chat', 'json': {**params, 'query': f'{queries[i % len(queries)]} [{nonce}-{next(calls)}]'}},
+    }
+
+
+def git_commit():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+        return sha + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, fail_over):
+    changes = []
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        change = {'scenario': name}
+        for field in COMPARED_FIELDS:
+            if current.get(field) is not None and before.get(field):
+                change[f'{field}_pct'] = round((current[field] - before[field]) / before[field] * 100, 1)
+        if fail_over is not None and change.get('p95_ms_pct', 0) > fail_over:
+            regressions.append(name)
+        changes.append(change)
+    return {'baseline_commit': baseline.get('meta', {}).get('commit'), 'changes': changes, 'regressions': regressions}
+
+
+async def run(args):
+    scale = {**SCALES[args.scale], **{k: v for k, v in vars(args).items() if k in SCALES[args.scale] and v is not None}}
+    selected = args.scenarios.split(',') if args.scenarios else LIGHT_SCENARIOS + HEAVY_SCENARIOS
+    unknown = set(selected) - set(LIGHT_SCENARIOS + HEAVY_SCENARIOS)
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    async with mongo_target(args) as mongo_uri:
+        seed_client = AsyncMongoClient(mongo_uri)
+        try:
+            started = time.perf_counter()
+            manifest = await seed(
+                seed_client[args.database], scale['managers'], scale['batches'], scale['interns'], scale['subjects'], args.seed
+            )
+            seed_seconds = time.perf_counter() - started
+        finally:
+            await seed_client.close()
+        buffer = io.BytesIO()
+        write_workbook(buffer, scale['workbook_rows'], scale['subjects'], args.seed)
+        workbook = buffer.getvalue()
+
+        async with fake_llm_server(args.fake_llm_port, args.token_delay_ms, args.tokens) as llm_url:
+            async with api_client(args, mongo_uri, llm_url) as client:
+                scenarios = build_scenarios(manifest, workbook)
+                results = {}
+                for name in selected:
+                    heavy = name in HEAVY_SCENARIOS
+                    total = args.heavy_requests if heavy else args.requests
+                    concurrency = args.heavy_concurrency if heavy else args.concurrency
+                    if args.warmup:
+                        await drive(client, scenarios[name], min(args.warmup, total), concurrency)
+                    results[name] = await drive(client, scenarios[name], total, concurrency)
+                    print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+                chat_cache = (await client.get('/api/debug/chat-cache-stats')).json() if any(n.startswith('chat') for n in selected) else None
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'target': args.base_url or 'in-process',
+            'mongo': args.mongo,
+            'scale': {**scale, 'name': args.scale},
+            'seed': args.seed,
+            'seed_seconds': round(seed_seconds, 2),
+            'workbook_bytes': len(workbook),
+            'concurrency': args.concurrency,
+            'heavy_concurrency': args.heavy_concurrency,
+        },
+        'results': results
+    }
+    if chat_cache:
+        report['chat_cache'] = chat_cache
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(results, json.load(f), args.fail_over)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 1 if report.get('comparison', {}).get('regressions') else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seeded end-to-end benchmark suite")
+    parser.add_argument('--base-url', default=None, help="benchmark a running server instead of the in-process app")
+    parser.add_argument('--mongo', choices=['uri', 'ephemeral'], default='uri')
+    parser.add_argument('--mongo-uri', default=os.getenv('BENCHMARK_MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--database', default='ld_benchmark')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--managers', type=int)
+    parser.add_argument('--batches', type=int)
+    parser.add_argument('--interns', type=int)
+    parser.add_argument('--subjects', type=int)
+    parser.add_argument('--workbook-rows', dest='workbook_rows', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', default=None, help="comma-separated subset of: " + ', '.join(LIGHT_SCENARIOS + HEAVY_SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--heavy-requests', type=int, default=10, help="requests for upload, export and chat")
+    parser.add_argument('--heavy-concurrency', type=int, default=2)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--fake-llm-port', type=int, default=8001)
+    parser.add_argument('--token-delay-ms', type=float, default=5)
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--fail-over', type=float, default=None, help="p95 regression percentage that fails the run")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,157 @@
+"""Synthetic managers, batches and Excel workbooks for benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic seed --mongo-uri mongodb://localhost:27017 \\
+        --database ld_benchmark --managers 2 --batches 3 --interns 2000 --subjects 12
+    python -m benchmarks.synthetic workbook --rows 5000 --subjects 12 --out interns.xlsx
+
+The same --seed always produces the same data, so runs on different commits
+measure the same workload. `seed` drops the benchmark collections first;
+never point it at the production database.
+"""
+import argparse
+import asyncio
+import json
+import random
+from openpyxl import Workbook
+from pymongo import AsyncMongoClient
+from werkzeug.security import generate_password_hash
+from app.core.database import ARCHIVE_PREFIX, BATCH_DATA_KEYS
+from app.services.migrations import SCHEMA_VERSION
+
+SUBJECT_NAMES = [
+    'Python', 'SQL', 'Java', 'React', 'Node.js', 'Docker', 'Kubernetes', 'AWS', 'Git', 'Linux',
+    'Data Structures', 'Algorithms', 'System Design', 'Testing', 'Security', 'Networking'
+]
+FIRST_NAMES = ['Aarav', 'Diya', 'Kabir', 'Meera', 'Rohan', 'Ananya', 'Vihaan', 'Isha', 'Arjun', 'Sara', 'Nikhil', 'Priya']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Nair', 'Gupta', 'Reddy', 'Khan', 'Das', 'Patel', 'Menon']
+FEEDBACK_COLUMNS = ['General', 'Week 1', 'Week 2']
+FEEDBACK_PHRASES = [
+    'Strong grasp of fundamentals.', 'Needs more practice with edge cases.', 'Communicates clearly in standups.',
+    'Struggled with the last assignment.', 'Consistently submits on time.', 'Should ask for help earlier.'
+]
+BENCHMARK_COLLECTIONS = [
+    'managers', 'batches', 'interns', 'scores', 'feedback', 'subjects', 'feedback_columns',
+    'import_jobs', 'batch_revisions', 'tombstones', 'batch_summaries'
+] + [ARCHIVE_PREFIX + name for name in BATCH_DATA_KEYS]
+INSERT_CHUNK = 5000
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+def subject_names(count):
+    names = list(SUBJECT_NAMES)
+    while len(names) < count:
+        names.append(f'Module {len(names) + 1}')
+    return names[:count]
+
+
+def intern_row(rng, index):
+    name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+    return {'EmpID': f'EMP{index:06d}', 'Name': name, 'Email': f'{name.lower().replace(" ", ".")}{index}@example.com'}
+
+
+def score_value(rng, total):
+    # Skewed towards passing marks with a tail of low scores and some blanks.
+    if rng.random() < 0.05:
+        return None
+    return round(min(total, max(0, rng.gauss(total * 0.68, total * 0.18))), 1)
+
+
+def make_batch(rng, manager_id, batch_id, interns, subjects):
+    batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+    subject_list = [
+        {'id': f'{rng.getrandbits(96):024x}', 'name': name, 'total_marks': rng.choice([50, 100, 100, 100])}
+        for name in subject_names(subjects)
+    ]
+    docs = {
+        'batches': [{**batch_filter, 'name': f'Batch {batch_id[-4:]}'}],
+        'subjects': [{**batch_filter, 'list': subject_list, 'schema_version': SCHEMA_VERSION, 'rev': 0}],
+        'feedback_columns': [{**batch_filter, 'list': FEEDBACK_COLUMNS, 'rev': 0}],
+        'interns': [],
+        'scores': [],
+        'feedback': []
+    }
+    for i in range(interns):
+        row = intern_row(rng, i)
+        docs['interns'].append({**batch_filter, **row, 'rev': 0})
+        scores = {}
+        for subject in subject_list:
+            value = score_value(rng, subject['total_marks'])
+            if value is not None:
+                scores[subject['id']] = value
+        docs['scores'].append({**batch_filter, 'EmpID': row['EmpID'], 'scores': scores, 'schema_version': SCHEMA_VERSION, 'rev': 0})
+        for column in FEEDBACK_COLUMNS:
+            if rng.random() < 0.6:
+                docs['feedback'].append({
+                    **batch_filter, 'EmpID': row['EmpID'], 'column': column,
+                    'text': rng.choice(FEEDBACK_PHRASES), 'date': '2024-01-01T00:00:00', 'rev': 0
+                })
+    return docs
+
+
+async def seed(db, managers=1, batches=1, interns=1000, subjects=10, seed_value=42):
+    rng = random.Random(seed_value)
+    await asyncio.gather(*(db[name].delete_many({}) for name in BENCHMARK_COLLECTIONS))
+    manifest = {'seed': seed_value, 'managers': []}
+    password = generate_password_hash(BENCHMARK_PASSWORD)
+    for m in range(managers):
+        manager_id = f'bench-manager-{m}'
+        await db.managers.insert_one({'manager_id': manager_id, 'username': f'bench{m}', 'password': password})
+        batch_ids = []
+        for b in range(batches):
+            batch_id = f'bench-{m}-{b}'
+            docs = make_batch(rng, manager_id, batch_id, interns, subjects)
+            for name, items in docs.items():
+                for start in range(0, len(items), INSERT_CHUNK):
+                    await db[name].insert_many(items[start:start + INSERT_CHUNK], ordered=False)
+            batch_ids.append(batch_id)
+        manifest['managers'].append({'manager_id': manager_id, 'batch_ids': batch_ids})
+    manifest['emp_ids'] = [f'EMP{i:06d}' for i in range(interns)]
+    manifest['subjects'] = subject_names(subjects)
+    return manifest
+
+
+def write_workbook(path, rows=5000, subjects=10, seed_value=42):
+    rng = random.Random(seed_value)
+    totals = {name: rng.choice([50, 100, 100, 100]) for name in subject_names(subjects)}
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Interns')
+    ws.append(['EmpID', 'Name', 'Email'] + [f'{name} (Total: {total})' for name, total in totals.items()])
+    for i in range(rows):
+        row = intern_row(rng, i)
+        ws.append([row['EmpID'], row['Name'], row['Email']] + [score_value(rng, total) for total in totals.values()])
+    wb.save(path)
+    return path
+
+
+async def _seed_command(args):
+    client = AsyncMongoClient(args.mongo_uri)
+    try:
+        manifest = await seed(client[args.database], args.managers, args.batches, args.interns, args.subjects, args.seed)
+    finally:
+        await client.close()
+    manifest['emp_ids'] = manifest['emp_ids'][:5]
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic benchmark data")
+    sub = parser.add_subparsers(dest='command', required=True)
+    seed_parser = sub.add_parser('seed')
+    seed_parser.add_argument('--mongo-uri', default='mongodb://localhost:27017')
+    seed_parser.add_argument('--database', default='ld_benchmark')
+    seed_parser.add_argument('--managers', type=int, default=1)
+    seed_parser.add_argument('--batches', type=int, default=1)
+    seed_parser.add_argument('--interns', type=int, default=1000)
+    seed_parser.add_argument('--subjects', type=int, default=10)
+    seed_parser.add_argument('--seed', type=int, default=42)
+    book_parser = sub.add_parser('workbook')
+    book_parser.add_argument('--rows', type=int, default=5000)
+    book_parser.add_argument('--subjects', type=int, default=10)
+    book_parser.add_argument('--seed', type=int, default=42)
+    book_parser.add_argument('--out', default='interns.xlsx')
+    args = parser.parse_args()
+    if args.command == 'seed':
+        asyncio.run(_seed_command(args))
+    else:
+        print(write_workbook(args.out, args.rows, args.subjects, args.seed))
@@ -0,0 +1,33 @@
+import argparse
+import os
+import uvicorn
+from app.core.config import settings
+
+
+def default_workers():
+    # Requests are mostly I/O bound, so one worker per core is enough.
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument('--host', default=settings.HOST)
+    parser.add_argument('--port', type=int, default=settings.PORT)
+    parser.add_argument('--workers', type=int, default=default_workers())
+    parser.add_argument('--log-level', default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+
+    # On SIGTERM/SIGINT uvicorn stops accepting connections, lets in-flight
+    # requests finish for up to GRACEFUL_SHUTDOWN_SECONDS and then runs the
+    # lifespan shutdown (live streams, import jobs, Mongo client) in each worker.
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        timeout_keep_alive=settings.KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+    )
@@ -0,0 +1,70 @@
+import os
+import pytest
+
+# The app creates its Mongo client at import, so the test database is chosen before anything imports it.
+os.environ['MONGO_URI'] = os.getenv('TEST_MONGO_URI', 'mongodb://localhost:27017')
+os.environ['DATABASE_NAME'] = os.getenv('TEST_DATABASE_NAME', 'ld_platform_test')
+os.environ.setdefault('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000')
+os.environ.setdefault('LIVE_CHANGE_STREAMS', 'false')
+
+from pymongo.errors import PyMongoError
+from app.core.cache import grid_cache
+from app.core.database import client, db
+from app.core.indexes import ensure_indexes
+from app.services.analytics import analytics_cache
+from app.services.migrations import SCHEMA_VERSION
+from app.services.retrieval import retriever_cache
+
+MANAGER_ID = 'manager-1'
+BATCH_ID = 'batch-1'
+
+
+@pytest.fixture(scope='session')
+def anyio_backend():
+    # One event loop for the whole run: the app's Mongo client is module-global.
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session')
+async def mongo():
+    try:
+        await client.admin.command('ping')
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB is not reachable at {os.environ['MONGO_URI']}: {e}")
+    await ensure_indexes()
+    return db
+
+
+@pytest.fixture
+async def database(mongo):
+    for name in await mongo.list_collection_names():
+        if not name.startswith('system.'):
+            await mongo[name].delete_many({})
+    for cache in (grid_cache, analytics_cache, retriever_cache):
+        cache.clear()
+    return mongo
+
+
+@pytest.fixture
+def seed(database):
+    # Writes a v2 batch: `scores` maps EmpID -> {subject name: score}; interns without an entry have no score document.
+    async def seed_batch(emp_ids, scores=None, subjects=('SQL',), manager_id=MANAGER_ID, batch_id=BATCH_ID, rev=1):
+        batch_filter = {'manager_id': manager_id, 'batch_id': batch_id}
+        ids = {name: f'sub-{i}' for i, name in enumerate(subjects)}
+        await database.batches.insert_one({**batch_filter, 'name': batch_id})
+        await database.batch_revisions.update_one(batch_filter, {'$set': {'rev': rev}}, upsert=True)
+        await database.subjects.insert_one({
+            **batch_filter, 'schema_version': SCHEMA_VERSION, 'rev': rev,
+            'list': [{'id': sid, 'name': name, 'total_marks': 100} for name, sid in ids.items()]
+        })
+        await database.interns.insert_many([
+            {**batch_filter, 'EmpID': emp_id, 'Name': f'Intern {emp_id}', 'Email': f'{emp_id.lower()}@example.com', 'rev': rev}
+            for emp_id in emp_ids
+        ])
+        if scores:
+            await database.scores.insert_many([
+                {**batch_filter, 'EmpID': emp_id, 'scores': {ids[name]: value for name, value in row.items()}, 'schema_version': SCHEMA_VERSION, 'rev': rev}
+                for emp_id, row in scores.items()
+            ])
+        return ids
+    return seed_batch
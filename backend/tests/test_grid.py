@@ -0,0 +1,83 @@
+import pytest
+from app.services.grid import GridQuery, GridQueryError, decode_cursor, encode_cursor, paginated_grid
+from conftest import BATCH_ID, MANAGER_ID
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('score:SQL', 'desc', 87.5, 'E007')
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'score:SQL', 'desc') == (87.5, 'E007')
+
+
+def test_cursor_keeps_the_unscored_segment():
+    assert decode_cursor(encode_cursor('score:SQL', 'asc', None, 'E002'), 'score:SQL', 'asc') == (None, 'E002')
+
+
+@pytest.mark.parametrize('sort, order', [('name', 'asc'), ('score:SQL', 'desc')])
+def test_cursor_rejects_another_sort_order(sort, order):
+    cursor = encode_cursor('score:SQL', 'asc', 50, 'E001')
+    with pytest.raises(GridQueryError):
+        decode_cursor(cursor, sort, order)
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(GridQueryError):
+        decode_cursor('not-a-cursor!', 'name', 'asc')
+
+
+@pytest.mark.parametrize('kwargs', [{'order': 'up'}, {'sort': 'Email'}, {'sort': 'score:'}])
+def test_query_validation(kwargs):
+    with pytest.raises(GridQueryError):
+        GridQuery('scores', MANAGER_ID, BATCH_ID, **kwargs)
+
+
+async def collect(sort, order, limit):
+    pages, cursor = [], None
+    while True:
+        page = await paginated_grid('scores', MANAGER_ID, BATCH_ID, limit, cursor, sort, order, None, None)
+        pages.append(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+async def test_score_sort_pages_across_segments(seed, order):
+    emp_ids = [f'E{i:03}' for i in range(1, 8)]
+    # E002 and E005 have no SQL score; E006 has no score document at all.
+    await seed(emp_ids, {'E001': {'SQL': 70}, 'E002': {'Python': 90}, 'E003': {'SQL': 70}, 'E004': {'SQL': 95},
+                         'E005': {'Python': 60}, 'E007': {'SQL': 40}}, subjects=('SQL', 'Python'))
+
+    pages = await collect('score:SQL', order, 2)
+    rows = [row for page in pages for row in page]
+
+    scored = ['E007', 'E001', 'E003', 'E004']
+    unscored = ['E002', 'E005', 'E006']
+    expected = unscored + scored if order == 'asc' else scored[::-1] + unscored[::-1]
+    assert [row['EmpID'] for row in rows] == expected
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert next(row for row in rows if row['EmpID'] == 'E002')['Python'] == 90
+    assert 'SQL' not in next(row for row in rows if row['EmpID'] == 'E006')
+
+
+@pytest.mark.anyio
+async def test_name_sort_pages(seed):
+    await seed(['E003', 'E001', 'E002'], {'E001': {'SQL': 10}})
+    pages = await collect('name', 'asc', 2)
+    assert [[row['EmpID'] for row in page] for page in pages] == [['E001', 'E002'], ['E003']]
+    assert pages[0][0]['SQL'] == 10
+
+
+@pytest.mark.anyio
+async def test_score_sort_skips_score_documents_without_an_intern(seed, database):
+    ids = await seed(['E001', 'E002', 'E003'], {'E001': {'SQL': 10}, 'E002': {'SQL': 20}, 'E003': {'SQL': 30}})
+    # Left behind by a deleted intern; they sort between the live rows.
+    await database.scores.insert_many([
+        {'manager_id': MANAGER_ID, 'batch_id': BATCH_ID, 'EmpID': emp_id, 'scores': {ids['SQL']: score}, 'rev': 1}
+        for emp_id, score in (('X001', 15), ('X002', 25))
+    ])
+
+    pages = await collect('score:SQL', 'asc', 2)
+    assert [[row['EmpID'] for row in page] for page in pages] == [['E001', 'E002'], ['E003']]
+    assert all(set(row) == {'manager_id', 'batch_id', 'EmpID', 'Name', 'Email', 'SQL'} for page in pages for row in page)
@@ -0,0 +1,55 @@
+import pytest
+from app.core.revisions import batch_revision
+from app.services import lifecycle
+from app.services.lifecycle import BatchStateError, archive_batch, restore_batch
+from conftest import BATCH_ID, MANAGER_ID
+
+pytestmark = pytest.mark.anyio
+BATCH_FILTER = {'manager_id': MANAGER_ID, 'batch_id': BATCH_ID}
+
+
+async def count(collection):
+    return await collection.count_documents(BATCH_FILTER)
+
+
+async def test_archive_and_restore_round_trip(seed, database):
+    await seed(['E001', 'E002'], {'E001': {'SQL': 50}, 'E002': {'SQL': 70}})
+
+    archived = await archive_batch(MANAGER_ID, BATCH_ID)
+    assert archived['archived']['interns'] == 2 and archived['archived']['scores'] == 2
+    assert await count(database.interns) == 0 and await count(database.archived_interns) == 2
+    assert (await database.batches.find_one(BATCH_FILTER))['archived'] is True
+    with pytest.raises(BatchStateError):
+        await archive_batch(MANAGER_ID, BATCH_ID)
+
+    restored = await restore_batch(MANAGER_ID, BATCH_ID)
+    assert restored['restored']['scores'] == 2
+    assert await count(database.scores) == 2 and await count(database.archived_scores) == 0
+    # Restored rows carry the restore revision, so `since` pollers pick them up.
+    assert {d['rev'] async for d in database.scores.find(BATCH_FILTER)} == {3}
+    assert 'archived' not in await database.batches.find_one(BATCH_FILTER)
+
+
+async def test_archive_keeps_rows_written_after_the_copy(seed, database, monkeypatch):
+    ids = await seed(['E001', 'E002'], {'E001': {'SQL': 50}, 'E002': {'SQL': 70}})
+    run_in_transaction = lifecycle.run_in_transaction
+
+    async def write_then_purge(callback):
+        # Lands between the archive copy and the purge, as a concurrent edit would.
+        async with batch_revision(MANAGER_ID, BATCH_ID) as rev:
+            await database.scores.update_one({**BATCH_FILTER, 'EmpID': 'E002'}, {'$set': {f"scores.{ids['SQL']}": 99, 'rev': rev}})
+            await database.interns.insert_one({**BATCH_FILTER, 'EmpID': 'E003', 'Name': 'Late', 'rev': rev})
+        return await run_in_transaction(callback)
+
+    monkeypatch.setattr(lifecycle, 'run_in_transaction', write_then_purge)
+    archived = await archive_batch(MANAGER_ID, BATCH_ID)
+    monkeypatch.undo()
+
+    assert archived['archived'] == {'interns': 2, 'scores': 1, 'feedback': 0, 'subjects': 1, 'feedback_columns': 0}
+    assert [d['EmpID'] async for d in database.scores.find(BATCH_FILTER)] == ['E002']
+    assert [d['EmpID'] async for d in database.interns.find(BATCH_FILTER)] == ['E003']
+
+    await restore_batch(MANAGER_ID, BATCH_ID)
+    scores = {d['EmpID']: d['scores'][ids['SQL']] async for d in database.scores.find(BATCH_FILTER)}
+    assert scores == {'E001': 50, 'E002': 99}
+    assert await count(database.interns) == 3
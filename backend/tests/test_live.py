@@ -0,0 +1,57 @@
+import pytest
+from app.core.config import settings
+from app.services.live import LiveHub, Subscriber, score_event
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_subscriber_queues_until_full():
+    subscriber = Subscriber(3)
+    for rev in (1, 2, 3):
+        subscriber.offer(score_event('E001', 'SQL', rev, rev))
+    assert [event['rev'] for event in drain(subscriber)] == [1, 2, 3]
+    assert subscriber.dropped == 0
+
+
+def test_full_subscriber_gets_lagged():
+    subscriber = Subscriber(2)
+    for rev in (1, 2, 3):
+        subscriber.offer(score_event('E001', 'SQL', rev, rev))
+    assert drain(subscriber) == [{'type': 'lagged'}]
+    assert subscriber.dropped == 2
+
+    subscriber.offer(score_event('E001', 'SQL', 4, 4))
+    assert [event.get('rev') for event in drain(subscriber)] == [4]
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    monkeypatch.setattr(settings, 'LIVE_QUEUE_SIZE', 2)
+    hub = LiveHub()
+    hub.change_streams = False
+    return hub
+
+
+@pytest.mark.anyio
+async def test_slow_subscriber_does_not_hold_back_others(hub):
+    slow = hub.subscribe('m', 'b')
+    fast = hub.subscribe('m', 'b')
+    other_batch = hub.subscribe('m', 'other')
+
+    for rev in (1, 2, 3):
+        hub.publish('m', 'b', [score_event('E001', 'SQL', rev, rev)])
+        assert drain(fast)[-1]['rev'] == rev
+
+    assert drain(slow) == [{'type': 'lagged'}]
+    assert drain(other_batch) == []
+    hub.publish('m', 'b', [score_event('E001', 'SQL', 4, 4)])
+    assert [channel['dropped_events'] for channel in hub.stats()['channels']] == [2, 0]
+
+    await hub.unsubscribe('m', 'b', slow)
+    await hub.unsubscribe('m', 'b', fast)
+    assert [channel['batch_id'] for channel in hub.stats()['channels']] == ['other']
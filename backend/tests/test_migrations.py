@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services import migrations
+from app.services.catalog import load_catalog
+from app.services.migrations import SCHEMA_VERSION, flatten_legacy_scores, legacy_subjects, migrate_batch, migration_status
+from conftest import BATCH_ID, MANAGER_ID
+
+BATCH_FILTER = {'manager_id': MANAGER_ID, 'batch_id': BATCH_ID}
+
+
+def test_legacy_subjects_normalizes_shapes():
+    subjects = legacy_subjects({'subjects': ['SQL', {'name': 'Python', 'total_marks': 50}, 'SQL', {'id': 'kept', 'name': 'Git'}]})
+    assert [(s['name'], s['total_marks']) for s in subjects] == [('SQL', 100), ('Python', 50), ('Git', 100)]
+    assert subjects[2]['id'] == 'kept'
+    assert len({s['id'] for s in subjects}) == 3
+
+
+def test_flatten_legacy_scores_rejoins_dotted_names():
+    assert flatten_legacy_scores({'SQL': 80, 'Node': {'js': 70, 'js 2': {'0': 60}}}) == {'SQL': 80, 'Node.js': 70, 'Node.js 2.0': 60}
+
+
+@pytest.mark.anyio
+async def test_migrate_batch_converts_legacy_documents(database):
+    await database.subjects.insert_one({**BATCH_FILTER, 'subjects': ['SQL', {'name': 'Node.js', 'total_marks': 50}]})
+    await database.scores.insert_many([
+        {**BATCH_FILTER, 'EmpID': 'E001', 'scores': {'SQL': 80, 'Node': {'js': 40}}},
+        # Git only ever appeared as a score key.
+        {**BATCH_FILTER, 'EmpID': 'E002', 'scores': {'Git': 90}},
+    ])
+    assert (await migration_status())['pending_score_documents'] == 2
+
+    assert await migrate_batch(MANAGER_ID, BATCH_ID, batch_size=1) == 2
+
+    catalog = await load_catalog(MANAGER_ID, BATCH_ID)
+    assert [(s['name'], s['total_marks']) for s in catalog.subjects] == [('SQL', 100), ('Node.js', 50), ('Git', 100)]
+    docs = {d['EmpID']: d async for d in database.scores.find(BATCH_FILTER)}
+    assert catalog.scores_by_name(docs['E001']['scores']) == {'SQL': 80, 'Node.js': 40}
+    assert catalog.scores_by_name(docs['E002']['scores']) == {'Git': 90}
+    assert {d['schema_version'] for d in docs.values()} == {SCHEMA_VERSION}
+    subjects_doc = await database.subjects.find_one(BATCH_FILTER)
+    assert 'subjects' not in subjects_doc and 'migrating' not in subjects_doc
+    assert await migration_status() == {'schema_version': SCHEMA_VERSION, 'pending_batches': 0, 'pending_score_documents': 0}
+
+
+@pytest.mark.anyio
+async def test_load_catalog_migrates_scores_without_a_subjects_document(database):
+    await database.scores.insert_one({**BATCH_FILTER, 'EmpID': 'E001', 'scores': {'SQL': 75}})
+    catalog = await load_catalog(MANAGER_ID, BATCH_ID)
+    assert [s['name'] for s in catalog.subjects] == ['SQL']
+    doc = await database.scores.find_one(BATCH_FILTER)
+    assert catalog.scores_by_name(doc['scores']) == {'SQL': 75}
+
+
+class HeldReads:
+    # Holds each of two migrators after its first read of legacy scores until both have read them.
+    def __init__(self, collection):
+        self.collection = collection
+        self.barrier = asyncio.Barrier(2)
+        self.held = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find(self, *args, **kwargs):
+        cursor = self.collection.find(*args, **kwargs)
+        to_list = cursor.to_list
+
+        async def held_to_list(*list_args, **list_kwargs):
+            docs = await to_list(*list_args, **list_kwargs)
+            if self.held < 2:
+                self.held += 1
+                await asyncio.wait_for(self.barrier.wait(), 5)
+            return docs
+        cursor.to_list = held_to_list
+        return cursor
+
+
+@pytest.mark.anyio
+async def test_concurrent_migrations_agree_on_new_subject_ids(database, monkeypatch):
+    await database.subjects.insert_one({**BATCH_FILTER, 'subjects': ['SQL']})
+    await database.scores.insert_many([
+        {**BATCH_FILTER, 'EmpID': f'E00{i}', 'scores': {'SQL': 50 + i, 'Git': 60 + i}} for i in range(1, 4)
+    ])
+    monkeypatch.setattr(migrations, 'scores_collection', HeldReads(migrations.scores_collection))
+
+    await asyncio.gather(migrate_batch(MANAGER_ID, BATCH_ID), migrate_batch(MANAGER_ID, BATCH_ID))
+
+    subjects = (await database.subjects.find_one(BATCH_FILTER))['list']
+    assert [s['name'] for s in subjects] == ['SQL', 'Git']
+    catalog = await load_catalog(MANAGER_ID, BATCH_ID)
+    rows = {d['EmpID']: catalog.scores_by_name(d['scores']) async for d in database.scores.find(BATCH_FILTER)}
+    assert rows == {f'E00{i}': {'SQL': 50 + i, 'Git': 60 + i} for i in range(1, 4)}
@@ -0,0 +1,109 @@
+import importlib.util
+import os
+from datetime import datetime
+import pytest
+from pymongo import AsyncMongoClient
+from app.api.endpoints.scores import load_scores_delta
+from app.core import revisions
+from app.core.config import settings
+from app.core.revisions import (
+    UnknownRevisionError, add_tombstones, batch_revision, check_since, current_revision, tombstones_since
+)
+from conftest import BATCH_ID, MANAGER_ID
+
+pytestmark = pytest.mark.anyio
+BATCH_FILTER = {'manager_id': MANAGER_ID, 'batch_id': BATCH_ID}
+
+
+async def test_revisions_count_up_per_batch(database):
+    async with batch_revision(MANAGER_ID, BATCH_ID) as first:
+        pass
+    async with batch_revision(MANAGER_ID, BATCH_ID) as second:
+        pass
+    async with batch_revision(MANAGER_ID, 'batch-2') as other:
+        pass
+    assert (first, second, other) == (1, 2, 1)
+    assert await current_revision(MANAGER_ID, BATCH_ID) == 2
+
+
+async def test_current_revision_stays_below_an_open_write(database):
+    async with batch_revision(MANAGER_ID, BATCH_ID) as rev:
+        async with batch_revision(MANAGER_ID, BATCH_ID):
+            pass
+        assert await current_revision(MANAGER_ID, BATCH_ID) == rev - 1
+    assert await current_revision(MANAGER_ID, BATCH_ID) == rev + 1
+
+
+@pytest.fixture
+async def other_worker(database):
+    # Another worker process: a fresh copy of the revisions module on its own client, so it shares
+    # nothing with this process but the database.
+    client = AsyncMongoClient(os.environ['MONGO_URI'], serverSelectionTimeoutMS=2000)
+    spec = importlib.util.spec_from_file_location('app.core.other_worker_revisions', revisions.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.revisions_collection = client[settings.DATABASE_NAME].batch_revisions
+    yield module
+    await client.close()
+
+
+async def test_revision_held_by_another_worker_is_not_passed(seed, database, other_worker):
+    ids = await seed(['E001', 'E002'], {'E001': {'SQL': 10}, 'E002': {'SQL': 20}}, rev=4)
+
+    async with other_worker.batch_revision(MANAGER_ID, BATCH_ID) as held:
+        async with batch_revision(MANAGER_ID, BATCH_ID) as rev:
+            await database.scores.update_one({**BATCH_FILTER, 'EmpID': 'E001'}, {'$set': {f"scores.{ids['SQL']}": 11, 'rev': rev}})
+        assert (held, rev) == (5, 6)
+
+        # Worker B's rev 5 has not landed, so readers stay at 4 even though 6 has committed.
+        assert await current_revision(MANAGER_ID, BATCH_ID) == 4
+        delta = await load_scores_delta(MANAGER_ID, BATCH_ID, 4)
+        assert delta['revision'] == 4 and [row['EmpID'] for row in delta['rows']] == ['E001']
+
+        await database.scores.update_one({**BATCH_FILTER, 'EmpID': 'E002'}, {'$set': {f"scores.{ids['SQL']}": 21, 'rev': held}})
+
+    # Polling again from 4 picks up worker B's write.
+    delta = await load_scores_delta(MANAGER_ID, BATCH_ID, delta['revision'])
+    assert delta['revision'] == 6 and [row['EmpID'] for row in delta['rows']] == ['E001', 'E002']
+
+
+async def test_abandoned_pending_revision_times_out(database):
+    await database.batch_revisions.insert_one({**BATCH_FILTER, 'rev': 3, 'pending': [{'rev': 2, 'at': datetime(2000, 1, 1)}]})
+    assert await current_revision(MANAGER_ID, BATCH_ID) == 3
+    async with batch_revision(MANAGER_ID, BATCH_ID) as rev:
+        assert rev == 4
+        assert [entry['rev'] for entry in (await database.batch_revisions.find_one(BATCH_FILTER))['pending']] == [4]
+    assert (await database.batch_revisions.find_one(BATCH_FILTER))['pending'] == []
+
+
+@pytest.mark.parametrize('since', [-1, 5])
+async def test_unknown_since_is_rejected(seed, since):
+    await seed(['E001'], rev=3)
+    with pytest.raises(UnknownRevisionError):
+        await check_since(MANAGER_ID, BATCH_ID, since)
+
+
+async def test_tombstones_since_dedupes_keys(database):
+    await add_tombstones(MANAGER_ID, BATCH_ID, 2, 'intern', ['E001', 'E002'])
+    await add_tombstones(MANAGER_ID, BATCH_ID, 3, 'intern', ['E001'])
+    await add_tombstones(MANAGER_ID, BATCH_ID, 3, 'subject', ['SQL'])
+    assert await tombstones_since(MANAGER_ID, BATCH_ID, 1) == {'intern': ['E001', 'E002'], 'subject': ['SQL']}
+    assert await tombstones_since(MANAGER_ID, BATCH_ID, 2) == {'intern': ['E001'], 'subject': ['SQL']}
+    assert await tombstones_since(MANAGER_ID, BATCH_ID, 3) == {}
+
+
+async def test_delta_returns_rows_and_deletions_after_since(seed, database):
+    ids = await seed(['E001', 'E002', 'E003'], {'E001': {'SQL': 50}, 'E002': {'SQL': 60}})
+    async with batch_revision(MANAGER_ID, BATCH_ID) as rev:
+        await database.scores.update_one({**BATCH_FILTER, 'EmpID': 'E002'}, {'$set': {f"scores.{ids['SQL']}": 65, 'rev': rev}})
+        await database.interns.delete_one({**BATCH_FILTER, 'EmpID': 'E003'})
+        await add_tombstones(MANAGER_ID, BATCH_ID, rev, 'intern', ['E003'])
+
+    delta = await load_scores_delta(MANAGER_ID, BATCH_ID, 1)
+    assert delta['revision'] == rev == 2
+    assert delta['rows'] == [{'manager_id': MANAGER_ID, 'batch_id': BATCH_ID, 'EmpID': 'E002', 'Name': 'Intern E002', 'Email': 'e002@example.com', 'SQL': 65}]
+    assert delta['deleted'] == {'intern': ['E003']}
+    assert delta['subjects'] is None
+
+    empty = await load_scores_delta(MANAGER_ID, BATCH_ID, rev)
+    assert (empty['rows'], empty['deleted']) == ([], {})
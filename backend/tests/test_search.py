@@ -0,0 +1,54 @@
+import pytest
+from bson import ObjectId
+from app.services.search import SearchQueryError, decode_cursor, encode_cursor, highlight_terms, match_spans, search, snippet
+from conftest import BATCH_ID, MANAGER_ID
+
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    cursor = encode_cursor('teamwork', 1.25, doc_id)
+    assert decode_cursor(cursor, 'teamwork') == (1.25, doc_id)
+
+
+def test_cursor_is_bound_to_its_query():
+    cursor = encode_cursor('teamwork', 1.25, ObjectId())
+    with pytest.raises(SearchQueryError):
+        decode_cursor(cursor, 'sql')
+
+
+@pytest.mark.parametrize('cursor', ['garbage', encode_cursor('sql', 'high', ObjectId()), encode_cursor('sql', 1.0, 'not-an-id')])
+def test_cursor_rejects_malformed(cursor):
+    with pytest.raises(SearchQueryError):
+        decode_cursor(cursor, 'sql')
+
+
+def test_highlight_terms_skip_negations():
+    assert highlight_terms('sql -python "code review" -"late"') == highlight_terms('sql code review')
+
+
+def test_snippet_windows_long_text():
+    text = 'filler ' * 60 + 'excellent teamwork' + ' filler' * 60
+    window, spans = snippet(text, match_spans(text, highlight_terms('teamwork')), width=80)
+    assert window.startswith('…') and window.endswith('…')
+    assert [window[s:e] for s, e in spans] == ['teamwork']
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('kind', ['feedback', 'all'])
+async def test_search_pages_through_tied_scores(seed, database, kind):
+    emp_ids = [f'E{i:03}' for i in range(1, 6)]
+    await seed(emp_ids)
+    # Identical text scores identically, so only the _id tiebreak orders these hits.
+    await database.feedback.insert_many([
+        {'manager_id': MANAGER_ID, 'batch_id': BATCH_ID, 'EmpID': emp_id, 'column': 'General', 'text': 'Strong teamwork', 'rev': 1}
+        for emp_id in emp_ids
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page = await search(MANAGER_ID, 'teamwork', kind, limit=2, cursor=cursor)
+        seen += [item['EmpID'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == emp_ids